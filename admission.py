@@ -0,0 +1,234 @@
+import math
+import time
+import sqlite3
+import threading
+import contextlib
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from metrics import REGISTRY
+
+# Admission control for the chat endpoints.
+#
+# TokenBucketLimiter gives every client key (a session, an IP address) a
+# bucket of `burst` tokens that refills at `rate` tokens per second; a
+# request takes one token, or is refused with the time until the next one.
+# ConcurrencyLimiter caps how many requests run at once. Up to max_queue more
+# may wait, for at most queue_timeout seconds, for a slot; anything beyond
+# that is refused immediately. Refusals raise Overloaded, which app.py turns
+# into 429 (rate limited) or 503 (overloaded) with a Retry-After header.
+# Refusing early keeps latency bounded under overload: a request either
+# starts within queue_timeout or fails fast, instead of joining an unbounded
+# backlog.
+#
+# Both keep their state in memory, per process. The SQLite variants share it
+# between the worker processes of one host through a file, like
+# sessions.SQLiteSessionStore: buckets are updated in one IMMEDIATE
+# transaction each, and concurrency slots are rows with a lease, so slots of
+# a crashed worker free themselves. Waiting is still per process there; it
+# polls for a free slot.
+
+SHED = REGISTRY.counter("bairo_shed_total", "Chat requests refused by admission control", ("reason",))
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"{reason}, retry after {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+        SHED.inc(reason)
+
+    @property
+    def status(self) -> int:
+        return 429 if self.reason == "rate_limited" else 503
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucketLimiter:
+    def __init__(self, rate: float, burst: float, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key: str) -> float:
+        """Take a token for key; return 0.0, or the seconds until one is available if the bucket is empty."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+            self._buckets[key] = (tokens - 1 if not wait else tokens, now)
+            # Least recently seen keys go first; a key that comes back starts full
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def purge(self) -> int:
+        """Drop buckets that have refilled completely; they are the same as missing ones."""
+        cutoff = time.monotonic() - self.burst / self.rate
+        with self._lock:
+            stale = [key for key, (_, updated) in self._buckets.items() if updated < cutoff]
+            for key in stale:
+                del self._buckets[key]
+        return len(stale)
+
+    def check(self, key: str) -> None:
+        """Take a token for key or raise Overloaded("rate_limited")."""
+        wait = self.take(key)
+        if wait:
+            raise Overloaded("rate_limited", wait)
+
+
+class SQLiteTokenBucketLimiter(TokenBucketLimiter):
+    def __init__(self, path: str, rate: float, burst: float, name: str = "default"):
+        super().__init__(rate, burst)
+        if not name.isidentifier():
+            raise ValueError(f"Invalid limiter name: {name!r}")
+        self.path = path
+        self.table = f"buckets_{name}"
+        self._local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} "
+                         "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str) -> float:
+        conn = self.connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(f"SELECT tokens, updated FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (self.burst, now)
+            tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+            conn.execute(f"INSERT OR REPLACE INTO {self.table} (key, tokens, updated) VALUES (?, ?, ?)",
+                         (key, tokens - 1 if not wait else tokens, now))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def purge(self) -> int:
+        cutoff = time.time() - self.burst / self.rate
+        return self.connection().execute(f"DELETE FROM {self.table} WHERE updated < ?", (cutoff,)).rowcount
+
+
+class ConcurrencyLimiter:
+    def __init__(self, limit: int, max_queue: int = 0, queue_timeout: float = 1.0):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> Optional[int]:
+        """
+        Take a slot, waiting in the queue if there is room in it; raise
+        Overloaded("overloaded") otherwise. Pass the return value to release().
+        """
+        with self._cond:
+            if self.active < self.limit and not self.waiting:
+                self.active += 1
+                return None
+            if self.waiting >= self.max_queue:
+                raise Overloaded("overloaded", self.queue_timeout)
+            self.waiting += 1
+            try:
+                if not self._cond.wait_for(lambda: self.active < self.limit, self.queue_timeout):
+                    raise Overloaded("overloaded", self.queue_timeout)
+                self.active += 1
+                return None
+            finally:
+                self.waiting -= 1
+
+    def release(self, slot: Optional[int] = None) -> None:
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Hold a slot for the duration of the block."""
+        slot = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(slot)
+
+    def stats(self) -> Dict:
+        return {"active": self.active, "waiting": self.waiting, "limit": self.limit, "max_queue": self.max_queue}
+
+
+class SQLiteConcurrencyLimiter(ConcurrencyLimiter):
+    def __init__(self, path: str, limit: int, max_queue: int = 0, queue_timeout: float = 1.0,
+                 lease: float = 300.0, poll_interval: float = 0.02):
+        super().__init__(limit, max_queue, queue_timeout)
+        self.path = path
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS slots (id INTEGER PRIMARY KEY AUTOINCREMENT, expires REAL NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    def _try_acquire(self) -> Optional[int]:
+        conn = self.connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM slots WHERE expires < ?", (now,))
+            slot = None
+            if conn.execute("SELECT COUNT(*) FROM slots").fetchone()[0] < self.limit:
+                slot = conn.execute("INSERT INTO slots (expires) VALUES (?)", (now + self.lease,)).lastrowid
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return slot
+
+    def acquire(self) -> Optional[int]:
+        slot = self._try_acquire()
+        if slot is None:
+            with self._cond:
+                if self.waiting >= self.max_queue:
+                    raise Overloaded("overloaded", self.queue_timeout)
+                self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while slot is None:
+                    if time.monotonic() + self.poll_interval > deadline:
+                        raise Overloaded("overloaded", self.queue_timeout)
+                    time.sleep(self.poll_interval)
+                    slot = self._try_acquire()
+            finally:
+                with self._cond:
+                    self.waiting -= 1
+        with self._cond:
+            self.active += 1
+        return slot
+
+    def release(self, slot: Optional[int] = None) -> None:
+        self.connection().execute("DELETE FROM slots WHERE id = ?", (slot,))
+        with self._cond:
+            self.active -= 1
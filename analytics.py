@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import argparse
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from courses import catalog, find_courses
+from inquiry_store import InquiryStore
+from db import EnquiryRepository
+
+# Demand statistics over the whole inquiry history.
+#
+# Reads all three stores as streams: inquiry_database.json (+ journal),
+# enquiry_data.db and the legacy user_data/inquiry_*.txt files. Course tags
+# are regenerated from the stored course text with the courses.py catalog,
+# then counted per course, category, status and day. Records are shipped
+# to a process pool in fixed-size chunks with a bounded number in flight,
+# so memory stays flat however long the history is.
+#
+# Progress and running totals are saved to a checkpoint after every chunk.
+# A later run only reads records added since (unless --full), and results
+# are written column-wise: one JSON file per dimension with "key" and
+# "count" arrays.
+
+DIMENSIONS = ("course", "category", "status", "day")
+CHUNK_SIZE = 2000
+GENERAL = "General Course Inquiry"
+
+Row = Tuple[str, str, str]  # (course text, status, timestamp)
+
+
+# ----- sources -----
+
+def parse_inquiry_text(text: str) -> Dict:
+    """Parse one legacy user_data/inquiry_*.txt file."""
+    fields = {}
+    for line in text.splitlines():
+        key, sep, value = line.partition(": ")
+        if sep:
+            fields[key.strip()] = value.strip()
+    return {
+        "name": fields.get("Name", ""),
+        "mobile": fields.get("Mobile", ""),
+        "email": fields.get("Email", ""),
+        "status": fields.get("Status", ""),
+        "course": fields.get("Course Interest", ""),
+        "timestamp": fields.get("Date", ""),
+    }
+
+
+def iter_text_files(directory: str, after: str = "") -> Iterator[Tuple[str, Dict]]:
+    """Yield (filename, record) for inquiry files whose name sorts after `after`."""
+    if not os.path.isdir(directory):
+        return
+    # app.py no longer writes these files, so the set is fixed; only the names
+    # are held in memory, sorted so the checkpoint position is monotonic
+    names = sorted(name for name in os.listdir(directory) if name.startswith("inquiry_") and name > after)
+    for name in names:
+        with open(os.path.join(directory, name), "r", encoding="utf-8", errors="replace") as f:
+            yield name, parse_inquiry_text(f.read())
+
+
+def iter_json_store(path: str, skip: int = 0) -> Iterator[Tuple[int, Dict]]:
+    """Yield (position, record) from the JSON inquiry store, skipping the first `skip`."""
+    if not os.path.exists(path) and not os.path.exists(path + ".log"):
+        return
+    for position, record in enumerate(InquiryStore(path), 1):
+        if position > skip:
+            yield position, record
+
+
+def iter_sqlite_store(path: str, after_id: int = 0) -> Iterator[Tuple[int, Dict]]:
+    if not os.path.exists(path):
+        return
+    repository = EnquiryRepository(path)
+    try:
+        for record in repository.iter_records(after_id=after_id):
+            yield record["id"], record
+    finally:
+        repository.close()
+
+
+def to_row(record: Dict) -> Row:
+    course = record.get("course") or ", ".join(record.get("courses") or [])
+    return course, record.get("status") or "", record.get("timestamp") or ""
+
+
+def iter_chunks(sources: Dict[str, Iterator], chunk_size: int) -> Iterator[Tuple[str, object, List[Row]]]:
+    """Group each source into (source, position of last record, rows) chunks."""
+    for name, records in sources.items():
+        rows, position = [], None
+        for position, record in records:
+            rows.append(to_row(record))
+            if len(rows) >= chunk_size:
+                yield name, position, rows
+                rows = []
+        if rows:
+            yield name, position, rows
+
+
+# ----- counting (runs in worker processes) -----
+
+def count_rows(rows: List[Row]) -> Dict[str, Counter]:
+    counts = {dimension: Counter() for dimension in DIMENSIONS}
+    course_category = catalog().course_category
+    for course_text, status, timestamp in rows:
+        tags = find_courses(course_text) or [GENERAL]
+        counts["course"].update(tags)
+        counts["category"].update({course_category.get(tag, "general") for tag in tags})
+        counts["status"][status.strip().title() or "Unknown"] += 1
+        counts["day"][timestamp[:10] or "unknown"] += 1
+    return counts
+
+
+# ----- checkpoint and output -----
+
+def load_checkpoint(path: str) -> Dict:
+    if path and os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {"positions": {}, "inquiries": 0, "counts": {dimension: {} for dimension in DIMENSIONS}}
+
+
+def save_json(path: str, data) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def write_columns(out_dir: str, counts: Dict[str, Dict[str, int]]) -> None:
+    os.makedirs(out_dir, exist_ok=True)
+    for dimension, values in counts.items():
+        if dimension == "day":
+            keys = sorted(values)
+        else:
+            keys = sorted(values, key=lambda key: (-values[key], key))
+        save_json(os.path.join(out_dir, f"{dimension}.json"),
+                  {"key": keys, "count": [values[key] for key in keys]})
+
+
+def run(json_path: str, sqlite_path: str, text_dir: str, out_dir: str,
+        checkpoint_path: Optional[str] = None, workers: int = 0,
+        chunk_size: int = CHUNK_SIZE, full: bool = False) -> Dict:
+    """Count all new inquiries, update the checkpoint and write the column files."""
+    state = load_checkpoint(None if full else checkpoint_path)
+    positions = state["positions"]
+    totals = {dimension: Counter(state["counts"].get(dimension, {})) for dimension in DIMENSIONS}
+
+    sources = {
+        "json": iter_json_store(json_path, positions.get("json", 0)),
+        "sqlite": iter_sqlite_store(sqlite_path, positions.get("sqlite", 0)),
+        "text": iter_text_files(text_dir, positions.get("text", "")),
+    }
+
+    def merge(source: str, position, counts: Dict[str, Counter]) -> None:
+        for dimension in DIMENSIONS:
+            totals[dimension].update(counts[dimension])
+        state["inquiries"] += sum(counts["day"].values())
+        positions[source] = position
+        if checkpoint_path:
+            state["counts"] = {dimension: dict(totals[dimension]) for dimension in DIMENSIONS}
+            save_json(checkpoint_path, state)
+
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            pending = deque()
+            for source, position, rows in iter_chunks(sources, chunk_size):
+                pending.append((source, position, pool.submit(count_rows, rows)))
+                if len(pending) >= workers * 2:
+                    source, position, future = pending.popleft()
+                    merge(source, position, future.result())
+            while pending:
+                source, position, future = pending.popleft()
+                merge(source, position, future.result())
+    else:
+        for source, position, rows in iter_chunks(sources, chunk_size):
+            merge(source, position, count_rows(rows))
+
+    state["counts"] = {dimension: dict(totals[dimension]) for dimension in DIMENSIONS}
+    if checkpoint_path:
+        save_json(checkpoint_path, state)
+    write_columns(out_dir, state["counts"])
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inquiry demand statistics across all stores")
+    parser.add_argument("--json", default="inquiry_database.json", help="JSON inquiry store")
+    parser.add_argument("--sqlite", default="enquiry_data.db", help="SQLite inquiry database")
+    parser.add_argument("--text-dir", default="user_data", help="directory of legacy inquiry_*.txt files")
+    parser.add_argument("--out", default="analytics", help="output directory for column files")
+    parser.add_argument("--checkpoint", default="analytics_checkpoint.json")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--full", action="store_true", help="ignore the checkpoint and recount everything")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    before = 0 if args.full else load_checkpoint(args.checkpoint)["inquiries"]
+    state = run(args.json, args.sqlite, args.text_dir, args.out, args.checkpoint,
+                args.workers, args.chunk_size, args.full)
+    elapsed = time.perf_counter() - started
+    print(f"Processed {state['inquiries'] - before} new inquiries ({state['inquiries']} total) "
+          f"in {elapsed:.2f}s; results in {args.out}/")
+
+
+if __name__ == "__main__":
+    main()
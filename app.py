@@ -1,157 +1,361 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
-import re
+from flask import (Flask, Response, abort, render_template, render_template_string, request, jsonify,
+                   stream_with_context)
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
+import json
+import time
+import threading
+import secrets
+import hashlib
 from datetime import datetime
+from contextlib import closing
 
-app = Flask(__name__)
+from storage import get_repository, get_writer
+from flow import advance, GREETING_TRIGGER
+# The validators are not used here; they are re-exported for test_app.py and
+# older code that imports them from app
+from validation import validate_mobile_number, validate_email
+from sessions import SessionStore, SQLiteSessionStore, SpillingSessionStore, sign_session_id, unsign_session_id
+from session_state import ChatState
+from http_cache import RenderedPage, StaticFiles
+import courses
+from metrics import REGISTRY, CONVERSIONS, STORAGE_WRITE_SECONDS
+from admission import (Overloaded, TokenBucketLimiter, SQLiteTokenBucketLimiter,
+                       ConcurrencyLimiter, SQLiteConcurrencyLimiter)
 
-# Create directory for storing user data
-os.makedirs('user_data', exist_ok=True)
+__all__ = ['app', 'validate_mobile_number', 'validate_email']
 
-# Validation functions
-def validate_mobile_number(mobile):
-    # Check if it's exactly 10 digits and contains only numbers
-    if re.match(r'^\d{10}$', mobile):
-        return True
-    return False
+app = Flask(__name__, static_folder=None)
 
-def validate_email(email):
-    # Basic email validation pattern
-    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if re.match(email_pattern, email):
-        return True
-    return False
+# The index page is rendered once per change of its template and, like the
+# files under static/, kept with gzip (and brotli) variants and a strong ETag
+# (see http_cache.py), so a repeat visit is answered with a 304. Static files
+# may be cached by browsers for BAIRO_STATIC_MAX_AGE seconds.
+STATIC_MAX_AGE = int(os.getenv('BAIRO_STATIC_MAX_AGE', 3600))
+index_page = RenderedPage(os.path.join(app.root_path, 'templates', 'index.html'), render_template_string)
+static_files = StaticFiles(os.path.join(app.root_path, 'static'), f'public, max-age={STATIC_MAX_AGE}')
+
+# Inquiries go to the SQLite backend, whose indexes serve the admin queries.
+# New ones are queued and written in the background (see write_behind.py).
+ADMIN_PAGE_SIZE = 50
+repository = get_repository('sqlite')
+writer = get_writer('sqlite')
+
+# Conversation state lives on the server, keyed by a signed session id cookie,
+# as one compact ChatState per session (see session_state.py). Set
+# SESSION_STORE=sqlite (and a shared SESSION_SECRET) to share sessions
+# between several workers. Otherwise sessions idle for SESSION_SPILL_AFTER
+# seconds are moved out of memory to SESSION_SPILL_DB until they are used
+# again; SESSION_SPILL_AFTER=0 keeps them all in memory.
+SESSION_COOKIE = 'bairo_session'
+SESSION_SECRET = os.getenv('SESSION_SECRET') or secrets.token_hex(32)
+SESSION_TTL = 30 * 60
+SESSION_SPILL_AFTER = float(os.getenv('SESSION_SPILL_AFTER', 5 * 60))
+PURGE_INTERVAL = 60
+
+def new_chat_session():
+    return ChatState()
+
+if os.getenv('SESSION_STORE') == 'sqlite':
+    sessions = SQLiteSessionStore(os.getenv('SESSION_DB', 'sessions.db'), new_chat_session, ttl=SESSION_TTL,
+                                  codec=ChatState)
+elif SESSION_SPILL_AFTER > 0:
+    sessions = SpillingSessionStore(os.getenv('SESSION_SPILL_DB', 'sessions-spill.db'), ChatState,
+                                    ttl=SESSION_TTL, spill_after=SESSION_SPILL_AFTER)
+else:
+    sessions = SessionStore(new_chat_session, ttl=SESSION_TTL)
+last_purge = time.monotonic()
+
+REGISTRY.gauge('bairo_sessions', 'Chat sessions currently held', lambda: len(sessions))
+
+# Admission control (see admission.py). Every chat request that has a session
+# takes a token from the session's bucket; over the limit it gets a 429.
+# Setting BAIRO_IP_RATE adds a bucket per client IP address as well. Behind a
+# load balancer or reverse proxy, also set BAIRO_TRUSTED_PROXIES to the number
+# of proxies in front of the app, so the address is taken from
+# X-Forwarded-For; otherwise every client shares the proxy's bucket. Agent
+# replies, the only expensive ones, also need one of MAX_AGENT_CALLS slots;
+# AGENT_QUEUE more requests may wait up to AGENT_QUEUE_TIMEOUT seconds for
+# one, the rest get a 503 at once. Set ADMISSION_STORE=sqlite to enforce the
+# limits across worker processes.
+CHAT_RATE = float(os.getenv('BAIRO_CHAT_RATE', '1'))
+CHAT_BURST = float(os.getenv('BAIRO_CHAT_BURST', '10'))
+IP_RATE = float(os.getenv('BAIRO_IP_RATE', '0'))
+IP_BURST = float(os.getenv('BAIRO_IP_BURST', '50'))
+TRUSTED_PROXIES = int(os.getenv('BAIRO_TRUSTED_PROXIES', '0'))
+MAX_AGENT_CALLS = int(os.getenv('BAIRO_MAX_AGENT_CALLS', '8'))
+AGENT_QUEUE = int(os.getenv('BAIRO_AGENT_QUEUE', '16'))
+AGENT_QUEUE_TIMEOUT = float(os.getenv('BAIRO_AGENT_QUEUE_TIMEOUT', '2'))
+
+if os.getenv('ADMISSION_STORE') == 'sqlite':
+    admission_db = os.getenv('ADMISSION_DB', 'admission.db')
+    session_limiter = SQLiteTokenBucketLimiter(admission_db, CHAT_RATE, CHAT_BURST, name='session')
+    ip_limiter = SQLiteTokenBucketLimiter(admission_db, IP_RATE, IP_BURST, name='ip') if IP_RATE > 0 else None
+    agent_slots = SQLiteConcurrencyLimiter(admission_db, MAX_AGENT_CALLS, AGENT_QUEUE, AGENT_QUEUE_TIMEOUT)
+else:
+    session_limiter = TokenBucketLimiter(CHAT_RATE, CHAT_BURST)
+    ip_limiter = TokenBucketLimiter(IP_RATE, IP_BURST) if IP_RATE > 0 else None
+    agent_slots = ConcurrencyLimiter(MAX_AGENT_CALLS, AGENT_QUEUE, AGENT_QUEUE_TIMEOUT)
+
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
+REGISTRY.gauge('bairo_agent_calls_active', 'Agent replies in progress in this process', lambda: agent_slots.active)
+REGISTRY.gauge('bairo_agent_calls_waiting', 'Requests waiting for an agent slot in this process', lambda: agent_slots.waiting)
+
+@app.before_request
+def admit():
+    if request.endpoint not in ('chat', 'chat_stream'):
+        return
+    if ip_limiter is not None:
+        ip_limiter.check(request.remote_addr or '')
+    token = request.cookies.get(SESSION_COOKIE) or (request.get_json(silent=True) or {}).get('sessionId', '')
+    session_id = unsign_session_id(token, SESSION_SECRET)
+    if session_id is not None:
+        session_limiter.check(session_id)
+
+@app.errorhandler(Overloaded)
+def shed(error):
+    result = jsonify({'error': str(error), 'retryAfter': int(error.retry_after_header)})
+    result.status_code = error.status
+    result.headers['Retry-After'] = error.retry_after_header
+    return result
 
 # Routes
+def send_cached(cached):
+    status, headers, body = cached.respond(request.headers.get('If-None-Match'),
+                                           request.headers.get('Accept-Encoding'),
+                                           request.headers.get('If-Modified-Since'))
+    return Response(body, status=status, headers=headers)
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return send_cached(index_page.get())
+
+@app.route('/static/<path:filename>', endpoint='static')
+def static_file(filename):
+    cached = static_files.get(filename)
+    if cached is None:
+        abort(404)
+    return send_cached(cached)
+
+@app.route('/courses')
+def course_catalog():
+    # Precomputed JSON of the current catalog; reloaded when courses.json changes
+    return send_cached(courses.catalog().response)
+
+def current_session_id():
+    global last_purge
+    token = request.cookies.get(SESSION_COOKIE) or request.json.get('sessionId', '')
+    session_id = unsign_session_id(token, SESSION_SECRET)
+    
+    if session_id is None or sessions.get(session_id) is None:
+        session_id = sessions.create()
+    
+    # Drop idle sessions now and then
+    if time.monotonic() - last_purge > PURGE_INTERVAL:
+        last_purge = time.monotonic()
+        sessions.purge()
+        session_limiter.purge()
+        if ip_limiter is not None:
+            ip_limiter.purge()
+    return session_id
+
+def set_session_cookie(result, signed_id):
+    result.set_cookie(SESSION_COOKIE, signed_id, max_age=SESSION_TTL, httponly=True, samesite='Lax')
+    return result
 
 @app.route('/chat', methods=['POST'])
 def chat():
     user_message = request.json.get('message', '')
-    current_step = request.json.get('currentStep', 'greeting')
-    user_data = request.json.get('userData', {})
-    
-    response = process_chat(user_message, current_step, user_data)
-    
-    # Save completed inquiries
-    if response.get('next_step') == 'complete' and user_data:
-        save_user_data(user_data)
+    session_id = current_session_id()
+    response = process_chat(user_message, session_id)
     
-    return jsonify(response)
+    signed_id = sign_session_id(session_id, SESSION_SECRET)
+    return set_session_cookie(jsonify(dict(response, sessionId=signed_id)), signed_id)
 
-def save_user_data(user_data):
-    # Create a timestamp-based filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"user_data/inquiry_{timestamp}.txt"
-    
-    # Write user data to file
-    with open(filename, 'w') as f:
-        f.write("CADD Center Course Inquiry\n")
-        f.write("=" * 30 + "\n")
-        f.write(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-        f.write(f"Name: {user_data.get('name', 'N/A')}\n")
-        f.write(f"Mobile: {user_data.get('mobile', 'N/A')}\n")
-        f.write(f"Email: {user_data.get('email', 'N/A')}\n")
-        f.write(f"Status: {user_data.get('status', 'N/A')}\n")
-        f.write(f"Course Interest: {user_data.get('course', 'N/A')}\n")
-
-def process_chat(user_message, current_step, user_data):
-    if current_step == 'greeting':
-        if any(word in user_message.lower() for word in ['course', 'enquire', 'information']):
-            return {
-                'message': "I'd be happy to help you with course information! Please provide the following details:\n\n1. Your Name:",
-                'next_step': 'name'
-            }
-        else:
-            return {
-                'message': "I can help you with course inquiries, fee details, or schedule information. How may I assist you?",
-                'next_step': 'greeting'
-            }
-    
-    elif current_step == 'name':
-        user_data['name'] = user_message
-        return {
-            'message': "2. Your Mobile Number:",
-            'next_step': 'mobile',
-            'userData': user_data
-        }
+# Streaming chat: the same conversation as /chat, answered with Server-Sent
+# Events. Intake steps and canned answers go out as one "message" event in a
+# single flush. Free-form questions at the greeting step, which /chat answers
+# with a help text, go to the main.py agent here: its tokens and tool calls
+# are sent as "token" and "tool"/"tool_done" events as they arrive. Every
+# stream ends with a "done" event carrying next_step and sessionId. When the
+# client disconnects, the generator is closed, which stops the agent run and
+# frees its model call.
+AGENT_HISTORY_MESSAGES = 10
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+agent_lock = threading.Lock()
+agent = None
+
+def chat_agent():
+    # The agent stack is imported on the first question that needs it
+    global agent
+    with agent_lock:
+        if agent is None:
+            import main as bot
+            agent = bot.LazyAgent()
+        return agent
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def event_stream(body, signed_id):
+    result = Response(body, mimetype='text/event-stream', headers=STREAM_HEADERS)
+    return set_session_cookie(result, signed_id)
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    user_message = request.json.get('message', '')
+    session_id = current_session_id()
+    signed_id = sign_session_id(session_id, SESSION_SECRET)
+    session = sessions.get(session_id) or new_chat_session()
     
-    elif current_step == 'mobile':
-        if validate_mobile_number(user_message):
-            user_data['mobile'] = user_message
-            return {
-                'message': "3. Your Email ID:",
-                'next_step': 'email',
-                'userData': user_data
-            }
-        else:
-            return {
-                'message': "Invalid mobile number. Please enter exactly 10 digits.",
-                'next_step': 'mobile',
-                'userData': user_data
-            }
+    if session.step != 'greeting' or GREETING_TRIGGER.search(user_message):
+        response = process_chat(user_message, session_id)
+        return event_stream(sse('message', {'message': response['message']})
+                            + sse('done', {'next_step': response['next_step'], 'sessionId': signed_id}), signed_id)
     
-    elif current_step == 'email':
-        if validate_email(user_message):
-            user_data['email'] = user_message
-            return {
-                'message': "4. What's your current status? (Student/Working Professional/Job Seeker/Other)",
-                'next_step': 'status',
-                'userData': user_data
-            }
-        else:
-            return {
-                'message': "Invalid email format. Please enter a valid email address.",
-                'next_step': 'email',
-                'userData': user_data
-            }
+    import main as bot
+    canned = bot.intent_router.answer(user_message)
+    if canned is not None:
+        return event_stream(sse('message', {'message': canned})
+                            + sse('done', {'next_step': session.step, 'sessionId': signed_id}), signed_id)
     
-    elif current_step == 'status':
-        user_data['status'] = user_message
-        courses_info = (
-            "Which courses are you interested in? We offer:\n\n"
-            "- Mechanical: AutoCAD, CATIA, SolidWorks, NX CAD, Creo, CAM\n"
-            "- Civil: Revit, BIM (Building Information Modeling)\n"
-            "- IT: Python, Java, C, C++, Web Design"
-        )
-        return {
-            'message': courses_info,
-            'next_step': 'course',
-            'userData': user_data
-        }
+    # Raises Overloaded (503) when every slot is taken and the queue is full
+    slot = agent_slots.acquire()
+    try:
+        result = event_stream(stream_with_context(stream_agent_reply(user_message, session_id, session, signed_id)), signed_id)
+    except BaseException:
+        agent_slots.release(slot)
+        raise
+    # Runs when the stream ends or the client goes away
+    result.call_on_close(lambda: agent_slots.release(slot))
+    return result
+
+def stream_agent_reply(user_message, session_id, session, signed_id):
+    import main as bot
+    from history import ConversationHistory
+    history = ConversationHistory(user_info=session.user_data())
+    for role, content in session.history:
+        history.add(role, content)
+    history.add('user', user_message)
+    try:
+        try:
+            with closing(bot.stream_agent(chat_agent().get(), history, {'state': session.step})) as events:
+                for kind, text in events:
+                    yield sse(kind, {'token': text} if kind == 'token' else {'tool': text})
+        except Exception as e:
+            bot.agent_failed(e)
+            reply = bot.rule_answer(user_message)
+            history.add('assistant', reply)
+            yield sse('message', {'message': reply})
+        yield sse('done', {'next_step': session.step, 'sessionId': signed_id})
+    finally:
+        # Also runs when the client goes away mid-stream
+        session.set_history(history.turns, AGENT_HISTORY_MESSAGES)
+        sessions.put(session_id, session)
+
+def save_user_data(user_data):
+    with STORAGE_WRITE_SECONDS.time('save_user_data'):
+        writer.save({
+            'name': user_data.get('name', 'N/A'),
+            'mobile': user_data.get('mobile', 'N/A'),
+            'email': user_data.get('email', 'N/A'),
+            'status': user_data.get('status', 'N/A'),
+            'course': user_data.get('course', 'N/A'),
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        })
+
+def format_inquiry(inquiry):
+    # Same layout as the per-inquiry text files the admin page used to read
+    return (
+        "CADD Center Course Inquiry\n"
+        + "=" * 30 + "\n"
+        + f"Date: {inquiry['timestamp']}\n\n"
+        + f"Name: {inquiry['name']}\n"
+        + f"Mobile: {inquiry['mobile']}\n"
+        + f"Email: {inquiry['email']}\n"
+        + f"Status: {inquiry['status']}\n"
+        + f"Course Interest: {', '.join(inquiry['courses'])}\n"
+    )
+
+def process_chat(user_message, session_id):
+    # Load the session, advance the conversation and store it again
+    session = sessions.get(session_id) or new_chat_session()
+    response = advance_chat(user_message, session.step, session.user_data())
+    session.step = response['next_step']
+    session.set_user_data(response.pop('userData'))
     
-    elif current_step == 'course':
-        user_data['course'] = user_message
-        thank_you_message = (
-            "Thank you for providing your details! Our team will contact you soon with more information about the courses you're interested in.\n\n"
-            "For immediate assistance or more details, you can visit our center or call us at 7845821665.\n\n"
-            "Thank you for your inquiry! Have a great day!"
-        )
-        return {
-            'message': thank_you_message,
-            'next_step': 'complete',
-            'userData': user_data
-        }
+    # Save completed inquiries
+    if session.step == 'complete' and session.user_data():
+        save_user_data(session.user_data())
+        CONVERSIONS.inc('web')
     
+    sessions.put(session_id, session)
+    return response
+
+def advance_chat(user_message, current_step, user_data):
+    # The intake steps, prompts and validators are defined in flow.py
+    turn = advance(current_step, user_message, user_data)
+    return {
+        'message': turn.message,
+        'next_step': turn.next_step,
+        'userData': turn.user_data
+    }
+
+def query_inquiries():
+    # Read the admin filters and cursor from the query string
+    args = request.args
+    cursor = args.get('cursor', type=int)
+    limit = min(args.get('limit', ADMIN_PAGE_SIZE, type=int), 500)
+    return repository.query(
+        start=args.get('from'),
+        end=args.get('to'),
+        course=args.get('course'),
+        status=args.get('status'),
+        cursor=cursor,
+        limit=limit,
+    )
+
+def inquiries_etag():
+    # Inquiries are append-only, so the newest id plus the query identifies a
+    # page. There is no Last-Modified: timestamps have 1 s resolution and
+    # imports may write older ones, so they cannot tell two versions apart.
+    key = f"{repository.version()}:{request.query_string.decode()}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+@app.route('/admin/api/inquiries')
+def admin_inquiries():
+    etag = inquiries_etag()
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
     else:
-        return {
-            'message': "How else can I assist you today?",
-            'next_step': 'greeting',
-            'userData': {}
-        }
+        inquiries, next_cursor = query_inquiries()
+        response = jsonify({'inquiries': inquiries, 'next_cursor': next_cursor})
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+@app.route('/metrics')
+def metrics():
+    # Prometheus text exposition format
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/api/memory')
+def admin_memory():
+    # Bytes held by chat sessions: in total, per session, and spilled to disk
+    return jsonify(sessions.footprint())
 
 @app.route('/admin')
 def admin():
     # Simple admin page to view inquiries (you may want to add authentication)
-    inquiries = []
-    for filename in os.listdir('user_data'):
-        if filename.startswith('inquiry_'):
-            with open(os.path.join('user_data', filename), 'r') as f:
-                inquiries.append(f.read())
-    
-    return render_template('admin.html', inquiries=inquiries)
+    inquiries, next_cursor = query_inquiries()
+    return render_template(
+        'admin.html',
+        inquiries=[format_inquiry(inquiry) for inquiry in inquiries],
+        next_cursor=next_cursor,
+        filters=request.args,
+    )
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
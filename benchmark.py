@@ -0,0 +1,315 @@
+import io
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import tempfile
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from fake_llm import FakeLLMServer
+
+# Load tests for the bot's request paths.
+#
+#   flow            flow.advance over the scripted intake conversation
+#   storage-json    save through the write-behind queue of the JSON store
+#                   (the main.py default backend)
+#   storage-sqlite  a direct insert into the SQLite repository, with no
+#                   write-behind queue in front (EnquiryRepository.save)
+#   web             app.py POST /chat through the Flask test client
+#   agent           main.main() with a scripted user, against fake_llm.py
+#
+# Each scenario replays `conversations` scripted conversations, `concurrency`
+# at a time, and reports p50/p95/p99 latency per request and requests per
+# second, plus the number of requests answered with an error status (such as
+# a 429 from admission control). Everything runs offline in a temporary
+# directory. With --save-baseline the results are stored; later runs are
+# compared with the stored baseline and the exit status is 1 if p95 latency
+# or throughput has regressed by more than --tolerance.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(ROOT, "benchmark_baseline.json")
+# p95 changes smaller than this are timer noise, whatever the ratio
+MIN_REGRESSION_MS = 1.0
+
+# Asked before the intake starts; matches no intent, so it reaches the agent
+AGENT_QUESTION = "Do you offer weekend batches for working people?"
+
+
+def intake_script(index: int) -> List[str]:
+    """Messages for one complete intake, with a mobile number and email unique to index."""
+    return [
+        "Hi, I want to enquire about courses",
+        f"Load Test {index}",
+        f"9{index:09d}",
+        f"user{index}@example.com",
+        "Working Professional",
+        "Python and AutoCAD",
+    ]
+
+
+def percentile(samples: List[float], p: float) -> float:
+    """Nearest-rank percentile of samples (0 < p <= 100)."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+# ----- scenarios -----
+# Each returns a function that runs conversation `index` and returns the
+# latency of each request in it. A function may have an `errors` list of
+# failed responses, which is reported as the scenario's error count.
+
+def flow_scenario(options) -> Callable[[int], List[float]]:
+    from flow import advance
+
+    def conversation(index: int) -> List[float]:
+        latencies, step, user_data = [], "greeting", {}
+        for message in intake_script(index):
+            started = time.perf_counter()
+            turn = advance(step, message, user_data)
+            latencies.append(time.perf_counter() - started)
+            step, user_data = turn.next_step, turn.user_data
+        return latencies
+    return conversation
+
+
+def json_storage_scenario(options) -> Callable[[int], List[float]]:
+    from storage import get_writer
+    repository = get_writer("json", "inquiry_database.json")
+
+    def conversation(index: int) -> List[float]:
+        name, _, mobile, email, status, course = intake_script(index)
+        record = {"name": name, "mobile": mobile, "email": email, "status": status,
+                  "courses": [course], "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")}
+        started = time.perf_counter()
+        repository.save(record)
+        return [time.perf_counter() - started]
+    return conversation
+
+
+def sqlite_storage_scenario(options) -> Callable[[int], List[float]]:
+    from storage import get_repository
+    repository = get_repository("sqlite", "enquiry_data.db")
+
+    def conversation(index: int) -> List[float]:
+        name, _, mobile, email, status, course = intake_script(index)
+        record = {"name": name, "mobile": mobile, "email": email, "status": status,
+                  "courses": [course], "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")}
+        started = time.perf_counter()
+        repository.save(record)
+        return [time.perf_counter() - started]
+    return conversation
+
+
+def web_scenario(options) -> Callable[[int], List[float]]:
+    import app as web
+    from storage import get_repository, get_writer
+    # app.py binds its stores at import, which may have been in an earlier run()'s directory
+    web.repository, web.writer = get_repository("sqlite"), get_writer("sqlite")
+
+    errors = []
+
+    def conversation(index: int) -> List[float]:
+        client = web.app.test_client()
+        latencies = []
+        for message in intake_script(index):
+            started = time.perf_counter()
+            response = client.post("/chat", json={"message": message})
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                # The rest of the intake would be out of step
+                errors.append(response.status_code)
+                break
+        return latencies
+    conversation.errors = errors
+    return conversation
+
+
+def agent_scenario(options) -> Callable[[int], List[float]]:
+    os.environ["OPENAI_API_BASE"] = options.llm_url
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    import main as bot
+    from renderer import Renderer
+    from response_cache import ResponseCache
+    from storage import get_repository
+    # main.py binds its store at import, which may have been in an earlier run()'s directory
+    bot.inquiry_store = get_repository("json", bot.INQUIRY_DB_FILE)
+    # Measure the model path, not the response cache
+    bot.response_cache = ResponseCache(max_entries=0)
+
+    def conversation(index: int) -> List[float]:
+        messages = iter([AGENT_QUESTION] + intake_script(index))
+        latencies, last = [], [None]
+
+        def input_fn(prompt: str = "") -> str:
+            # Time from handing the bot a message until it asks for the next one
+            now = time.perf_counter()
+            if last[0] is not None:
+                latencies.append(now - last[0])
+            last[0] = now
+            try:
+                return next(messages)
+            except StopIteration:
+                raise EOFError
+
+        bot.main(Renderer(typing=False, out=io.StringIO()), input_fn)
+        latencies.append(time.perf_counter() - last[0])
+        return latencies
+    return conversation
+
+
+SCENARIOS = {
+    "flow": flow_scenario,
+    "storage-json": json_storage_scenario,
+    "storage-sqlite": sqlite_storage_scenario,
+    "web": web_scenario,
+    "agent": agent_scenario,
+}
+
+
+# ----- running and reporting -----
+
+def run_scenario(name: str, options, first: int = 0) -> Dict:
+    """Run conversations first .. first + conversations, after one untimed warm-up conversation."""
+    conversation = SCENARIOS[name](options)
+    # One untimed conversation first, so imports and connections are warm
+    conversation(first + options.conversations)
+    errors = getattr(conversation, "errors", [])
+    errors.clear()
+    latencies = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(options.concurrency) as pool:
+        for result in pool.map(conversation, range(first, first + options.conversations)):
+            latencies.extend(result)
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "concurrency": options.concurrency,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Return a message for every scenario whose p95 or throughput is worse than baseline by more than tolerance."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or "error" in result or base.get("concurrency") != result["concurrency"]:
+            continue
+        slower = result["p95_ms"] - base["p95_ms"]
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance) and slower > MIN_REGRESSION_MS:
+            regressions.append(f"{name}: p95 {result['p95_ms']} ms vs baseline {base['p95_ms']} ms")
+        if result["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['rps']} req/s vs baseline {base['rps']} req/s")
+    return regressions
+
+
+def print_report(results: Dict[str, Dict]) -> None:
+    print(f"{'scenario':<16}{'requests':>9}{'errors':>8}{'conc':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:<16}  {'failed' if result.get('failed') else 'skipped'}: {result['error']}")
+            continue
+        print(f"{name:<16}{result['requests']:>9}{result.get('errors', 0):>8}{result['concurrency']:>6}{result['p50_ms']:>10}"
+              f"{result['p95_ms']:>10}{result['p99_ms']:>10}{result['rps']:>10}")
+
+
+def run(options) -> Dict[str, Dict]:
+    """
+    Run the selected scenarios, each in its own scratch directory.
+
+    A scenario that cannot import its dependencies is skipped and one that
+    raises is reported as failed; the others still run. Every scenario uses
+    its own range of conversation indexes, so the mobile numbers and emails
+    of one never count as duplicates in another through the stores the
+    scenarios share within this process.
+    """
+    results = {}
+    cwd = os.getcwd()
+    llm = None
+    if "agent" in options.scenarios and not options.llm_url:
+        llm = FakeLLMServer(latency=options.llm_latency, token_delay=options.llm_token_delay).start()
+        options.llm_url = llm.url
+    with tempfile.TemporaryDirectory() as workdir:
+        # The stores use paths relative to the working directory
+        sys.path.insert(0, ROOT)
+        os.chdir(workdir)
+        try:
+            for position, name in enumerate(options.scenarios):
+                os.makedirs(os.path.join(workdir, name))
+                os.chdir(os.path.join(workdir, name))
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        results[name] = run_scenario(name, options, position * (options.conversations + 1))
+                except ImportError as e:
+                    results[name] = {"error": str(e)}
+                except Exception as e:
+                    results[name] = {"error": f"{type(e).__name__}: {e}", "failed": True}
+        finally:
+            # The stores are bound to this run's directory, which is about to go
+            if "storage" in sys.modules:
+                sys.modules["storage"].reset()
+            os.chdir(cwd)
+            sys.path.remove(ROOT)
+            if llm is not None:
+                llm.stop()
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bairo load tests")
+    parser.add_argument("scenarios", nargs="*", metavar="scenario",
+                        help=f"scenarios to run: {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("-n", "--conversations", type=int, default=50)
+    parser.add_argument("-c", "--concurrency", type=int, default=4)
+    parser.add_argument("--llm-url", help="OpenAI-compatible base URL (default: start fake_llm.py)")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--llm-token-delay", type=float, default=0.002)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging a regression")
+    parser.add_argument("--output", help="also write the results as JSON to this file")
+    options = parser.parse_args(argv)
+    options.scenarios = options.scenarios or list(SCENARIOS)
+    unknown = [name for name in options.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(unknown)}")
+
+    results = run(options)
+    print_report(results)
+    failed = any(result.get("failed") for result in results.values())
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if options.save_baseline:
+        baseline = {}
+        if os.path.exists(options.baseline):
+            with open(options.baseline) as f:
+                baseline = json.load(f)
+        baseline.update({name: result for name, result in results.items() if "error" not in result})
+        with open(options.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline saved to {options.baseline}")
+        return 1 if failed else 0
+
+    if os.path.exists(options.baseline):
+        with open(options.baseline) as f:
+            regressions = compare(results, json.load(f), options.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        return 1 if regressions or failed else 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+import os
+import re
+import json
+import asyncio
+import weakref
+import argparse
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import main as bot
+from history import ConversationHistory
+from sessions import SessionStore, SpillingSessionStore
+from session_state import ChatState
+from admission import Overloaded, TokenBucketLimiter
+
+# Asyncio HTTP service that serves many concurrent conversations with the
+# main.py agent from one process.
+#
+#   POST   /sessions                  -> {"session_id": "..."}
+#   POST   /sessions/<id>/messages    {"message": "..."} -> streamed NDJSON:
+#                                     {"token": "..."} per chunk, then {"done": true}
+#   DELETE /sessions/<id>
+#   GET    /health                    -> session and model-call stats
+#   GET    /memory                    -> bytes held by sessions, in total and per session
+#
+# Each session is one compact ChatState (see session_state.py) holding its
+# last HISTORY_MESSAGES turns, and expires after SESSION_TTL seconds without
+# traffic. As in app.py, sessions idle for SESSION_SPILL_AFTER seconds are
+# moved to a SQLite file (CHAT_SESSION_SPILL_DB) until their next message;
+# SESSION_SPILL_AFTER=0 keeps them all in memory. Model calls across all
+# sessions are limited by a semaphore; canned and cached replies do not take
+# a slot. Each session may send MESSAGE_RATE messages per second (bursts of
+# MESSAGE_BURST); faster senders get a 429 with Retry-After. Session store
+# calls that may read or write the spill file run in a worker thread, so a
+# slow disk does not stall the other streams.
+
+SESSION_TTL = 30 * 60
+MAX_SESSIONS = 10000
+MAX_MODEL_CALLS = 16
+PURGE_INTERVAL = 60
+MESSAGE_RATE = 1.0
+MESSAGE_BURST = 10
+HISTORY_MESSAGES = 10
+SESSION_SPILL_AFTER = float(os.getenv("SESSION_SPILL_AFTER", 5 * 60))
+SESSION_SPILL_DB = os.getenv("CHAT_SESSION_SPILL_DB", "chat-sessions-spill.db")
+
+MESSAGES_PATH = re.compile(r"^/sessions/([0-9a-f]{32})/messages$")
+SESSION_PATH = re.compile(r"^/sessions/([0-9a-f]{32})$")
+
+REASONS = {200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request",
+           404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 429: "Too Many Requests"}
+MAX_BODY = 64 * 1024
+
+
+class RequestTooLarge(Exception):
+    """The request body is larger than MAX_BODY."""
+
+
+class ChatServer:
+    def __init__(self, agent=None, max_model_calls: int = MAX_MODEL_CALLS,
+                 session_ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS,
+                 spill_after: float = SESSION_SPILL_AFTER, spill_path: str = SESSION_SPILL_DB):
+        self.agent = agent
+        self._agent_lock = asyncio.Lock()
+        if spill_after > 0:
+            self.sessions = SpillingSessionStore(spill_path, ChatState, ttl=session_ttl,
+                                                 max_sessions=max_sessions, spill_after=spill_after)
+        else:
+            self.sessions = SessionStore(ChatState, ttl=session_ttl, max_sessions=max_sessions)
+        # One lock per session with a message in progress, so its turns run in order
+        self.session_locks = weakref.WeakValueDictionary()
+        self.message_limiter = TokenBucketLimiter(MESSAGE_RATE, MESSAGE_BURST)
+        self.model_calls = asyncio.Semaphore(max_model_calls)
+        self.max_model_calls = max_model_calls
+        self.active_model_calls = 0
+
+    # ----- conversation -----
+
+    async def reply(self, session: ChatState, message: str) -> AsyncIterator[str]:
+        """Yield the bot's reply to message, token by token when it comes from the model."""
+        history = ConversationHistory(user_info=session.user_data())
+        for role, content in session.history:
+            history.add(role, content)
+        history.add("user", message)
+        try:
+            canned = bot.intent_router.answer(message)
+            if canned is not None:
+                history.add("assistant", canned)
+                yield canned
+                return
+
+            agent = await self.get_agent()
+            async with self.model_calls:
+                self.active_model_calls += 1
+                try:
+                    async for token in bot.astream_agent(agent, history, {"state": session.step}):
+                        yield token
+                except Exception as e:
+                    bot.agent_failed(e)
+                    reply = bot.rule_answer(message)
+                    history.add("assistant", reply)
+                    yield reply
+                finally:
+                    self.active_model_calls -= 1
+        finally:
+            session.set_history(history.turns, HISTORY_MESSAGES)
+
+    async def get_agent(self):
+        # Built on the first message that needs it; concurrent first messages wait for one build
+        if self.agent is None:
+            async with self._agent_lock:
+                if self.agent is None:
+                    self.agent = await asyncio.to_thread(bot.build_agent)
+        return self.agent
+
+    def stats(self) -> Dict:
+        return {
+            "sessions": len(self.sessions),
+            "active_model_calls": self.active_model_calls,
+            "max_model_calls": self.max_model_calls,
+            "intents": bot.intent_router.stats(),
+            "response_cache": bot.response_cache.stats(),
+            "model_circuit": bot.BREAKER.stats(),
+        }
+
+    # ----- HTTP -----
+
+    @staticmethod
+    async def read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict, bytes]]:
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise ValueError("malformed request line") from None
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1")
+            if line in ("\r\n", "\n", ""):
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        if length < 0:
+            raise ValueError("negative Content-Length")
+        if length > MAX_BODY:
+            raise RequestTooLarge("body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method, path.split("?", 1)[0], headers, body
+
+    @staticmethod
+    async def send_json(writer: asyncio.StreamWriter, status: int, payload: Optional[Dict] = None,
+                        headers: str = "") -> None:
+        body = json.dumps(payload).encode() if payload is not None else b""
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n{headers}"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n")
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+    async def stream_reply(self, writer: asyncio.StreamWriter, session_id: str, session: ChatState,
+                           message: str) -> None:
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nCache-Control: no-cache\r\n\r\n")
+
+        async def send(event: Dict) -> None:
+            data = json.dumps(event).encode() + b"\n"
+            writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            await writer.drain()
+
+        lock = self.session_locks.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            # The session as the previous message on it left it
+            session = await asyncio.to_thread(self.sessions.get, session_id) or session
+            replies = self.reply(session, message)
+            try:
+                async for token in replies:
+                    await send({"token": token})
+            finally:
+                # Also when the client went away: keep the turns so far
+                await replies.aclose()
+                await asyncio.to_thread(self.sessions.put, session_id, session)
+        await send({"done": True})
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def handle(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter) -> None:
+        if path == "/health" and method == "GET":
+            return await self.send_json(writer, 200, await asyncio.to_thread(self.stats))
+        if path == "/memory" and method == "GET":
+            return await self.send_json(writer, 200, await asyncio.to_thread(self.sessions.footprint))
+        if path == "/sessions" and method == "POST":
+            return await self.send_json(writer, 201, {"session_id": self.sessions.create()})
+
+        match = MESSAGES_PATH.match(path)
+        if match and method == "POST":
+            session = await asyncio.to_thread(self.sessions.get, match.group(1))
+            if session is None:
+                return await self.send_json(writer, 404, {"error": "unknown or expired session"})
+            try:
+                self.message_limiter.check(match.group(1))
+            except Overloaded as e:
+                return await self.send_json(writer, 429, {"error": str(e)},
+                                            f"Retry-After: {e.retry_after_header}\r\n")
+            try:
+                message = json.loads(body or b"{}").get("message", "").strip()
+            except (ValueError, AttributeError):
+                message = ""
+            if not message:
+                return await self.send_json(writer, 400, {"error": "message is required"})
+            return await self.stream_reply(writer, match.group(1), session, message)
+
+        match = SESSION_PATH.match(path)
+        if match and method == "DELETE":
+            await asyncio.to_thread(self.sessions.delete, match.group(1))
+            return await self.send_json(writer, 204)
+
+        await self.send_json(writer, 404, {"error": "not found"})
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except RequestTooLarge:
+                    await self.send_json(writer, 413, {"error": "request too large"})
+                    break
+                except ValueError:
+                    await self.send_json(writer, 400, {"error": "malformed request"})
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                await self.handle(method, path, body, writer)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def purge_sessions(self) -> None:
+        while True:
+            await asyncio.sleep(PURGE_INTERVAL)
+            # Spilling writes to SQLite, so it runs off the event loop
+            await asyncio.to_thread(self.sessions.purge)
+            self.message_limiter.purge()
+
+    async def serve(self, host: str, port: int) -> None:
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        purger = asyncio.create_task(self.purge_sessions())
+        print(f"Bairo chat server listening on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            purger.cancel()
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Multi-session chat server for the Bairo agent")
+    parser.add_argument("--host", default=os.getenv("BAIRO_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("BAIRO_PORT", "8765")))
+    parser.add_argument("--max-model-calls", type=int, default=MAX_MODEL_CALLS)
+    parser.add_argument("--session-ttl", type=float, default=SESSION_TTL)
+    args = parser.parse_args()
+
+    async def start():
+        server = ChatServer(max_model_calls=args.max_model_calls, session_ttl=args.session_ttl)
+        await server.serve(args.host, args.port)
+
+    try:
+        asyncio.run(start())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    run()
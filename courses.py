@@ -0,0 +1,182 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from http_cache import CachedResponse
+
+# Course catalog and course-mention extraction.
+#
+# The catalog lives in courses.json (BAIRO_COURSES_FILE): per category its
+# label, the aliases that name the category, and its courses with their
+# aliases. It is loaded once into a Catalog, which precomputes everything
+# the bots and the web app read from it: the mention regex, the course list
+# shown at the course step, the per-category answers and the /courses JSON
+# response with its ETag. catalog() returns the current one and loads the
+# file again when its modification time changes, checked at most every
+# RELOAD_INTERVAL seconds; a file that fails to load leaves the previous
+# catalog in place.
+#
+# Every course name, alias and category name is compiled into a single
+# alternation, longest alias first, with boundaries that treat "+" and "#"
+# as part of a word. One pass of the regex finds every mention: "C" no
+# longer matches inside other words, "C++" is not read as "C", and "CAM"
+# does not match "came". "IT" only counts as the category when written in
+# capitals or followed by "course(s)", since "it" is usually a pronoun.
+
+COURSES_FILE = os.getenv("BAIRO_COURSES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "courses.json"))
+RELOAD_INTERVAL = 2.0
+# Browsers and proxies may reuse /courses for this long before revalidating
+CACHE_CONTROL = "public, max-age=300"
+
+logger = logging.getLogger(__name__)
+
+_SPACES = re.compile(r"\s+")
+
+
+def _key(text: str) -> str:
+    return _SPACES.sub(" ", text.lower())
+
+
+def _build(categories: Dict):
+    lookup = {}
+    for category, spec in categories.items():
+        for alias in spec.get("aliases", []):
+            lookup[_key(alias)] = (category, None)
+        for course, aliases in spec["courses"].items():
+            for alias in [course] + aliases:
+                lookup[_key(alias)] = (category, course)
+    alternatives = [re.escape(alias).replace(r"\ ", r"\s+") for alias in sorted(lookup, key=len, reverse=True)]
+    # "IT" as a category: capitals, or followed by "course"/"courses"
+    if "it" in categories:
+        alternatives.append(r"(?-i:IT)")
+        alternatives.append(r"it(?=\s+courses?\b)")
+        lookup["it"] = ("it", None)
+    pattern = re.compile(r"(?<![\w+#])(?:" + "|".join(alternatives) + r")(?![\w+#])", re.IGNORECASE)
+    return pattern, lookup
+
+
+class Catalog:
+    """One version of the course catalog, with everything derived from it computed up front."""
+
+    def __init__(self, data: Dict, mtime: Optional[int] = None):
+        self.mtime = mtime
+        self.categories = data["categories"]
+        display_names = data.get("display_names", {})
+        self.labels = {category: spec.get("label", category.capitalize())
+                       for category, spec in self.categories.items()}
+        # Names shown to users where they differ from the tag stored on an inquiry
+        self.courses = {category: [display_names.get(course, course) for course in spec["courses"]]
+                        for category, spec in self.categories.items()}
+        self.pattern, self.lookup = _build(self.categories)
+        self.course_category = {course: category for category, spec in self.categories.items()
+                                for course in spec["courses"]}
+        self.course_category.update({f"{label} Courses": category for category, label in self.labels.items()})
+        self.listing = "\n".join(f"- {self.labels[category]}: {', '.join(courses)}"
+                                 for category, courses in self.courses.items())
+        self.joined = {category: ", ".join(courses) for category, courses in self.courses.items()}
+        body = json.dumps({"categories": [
+            {"id": category, "label": self.labels[category], "courses": courses}
+            for category, courses in self.courses.items()
+        ]}, separators=(",", ":")).encode("utf-8")
+        self.response = CachedResponse(body, "application/json", CACHE_CONTROL,
+                                       last_modified=mtime / 1e9 if mtime is not None else None)
+
+    @classmethod
+    def load(cls, path: str = COURSES_FILE) -> "Catalog":
+        mtime = os.stat(path).st_mtime_ns
+        with open(path, encoding="utf-8") as handle:
+            return cls(json.load(handle), mtime)
+
+
+_catalog = Catalog.load()
+_checked = time.monotonic()
+_seen_mtime = _catalog.mtime
+_reload_lock = threading.Lock()
+
+
+def catalog() -> Catalog:
+    """The current catalog, reloaded if courses.json changed."""
+    global _catalog, _checked, _seen_mtime
+    if time.monotonic() - _checked < RELOAD_INTERVAL:
+        return _catalog
+    with _reload_lock:
+        if time.monotonic() - _checked < RELOAD_INTERVAL:
+            return _catalog
+        _checked = time.monotonic()
+        try:
+            mtime = os.stat(COURSES_FILE).st_mtime_ns
+        except OSError:
+            return _catalog
+        if mtime != _seen_mtime:
+            _seen_mtime = mtime
+            try:
+                _catalog = Catalog.load(COURSES_FILE)
+                logger.info("Reloaded the course catalog from %s", COURSES_FILE)
+            except (OSError, ValueError, KeyError, AttributeError, TypeError) as e:
+                logger.warning("Keeping the previous course catalog, %s failed to load: %s", COURSES_FILE, e)
+    return _catalog
+
+
+def category_label(category: str) -> str:
+    return f"{catalog().labels.get(category, category.capitalize())} Courses"
+
+
+def find_courses(text: str) -> List[str]:
+    """
+    Return the courses mentioned in text, in order of first mention.
+
+    A mentioned category is reported as e.g. "Mechanical Courses" and
+    replaces the individual courses of that category.
+    """
+    current = catalog()
+    categories, courses = [], []
+    for match in current.pattern.finditer(text):
+        category, course = current.lookup[_key(match.group())]
+        if course is None:
+            if category not in categories:
+                categories.append(category)
+        elif (category, course) not in courses:
+            courses.append((category, course))
+    found = [f"{current.labels[category]} Courses" for category in categories]
+    found.extend(course for category, course in courses if category not in categories)
+    return found
+
+
+def find_courses_many(texts: Iterable[str]) -> List[List[str]]:
+    """find_courses for a batch of texts."""
+    return [find_courses(text) for text in texts]
+
+
+def retag(records: Iterable[Dict]) -> Iterator[Dict]:
+    """Yield inquiry records with "courses" re-extracted from their stored course text."""
+    for record in records:
+        text = record.get("course") or ", ".join(record.get("courses", []))
+        record["courses"] = find_courses(text) or ["General Course Inquiry"]
+        yield record
+
+
+def find_category(text: str) -> Optional[str]:
+    """Return the first course category (mechanical, civil or it) named in text, if any."""
+    current = catalog()
+    for match in current.pattern.finditer(text):
+        category, course = current.lookup[_key(match.group())]
+        if course is None:
+            return category
+    return None
+
+
+def course_info(course_category: str) -> str:
+    """List the courses in a category (mechanical, civil, it)."""
+    joined = catalog().joined
+    if course_category.lower() in joined:
+        return f"Courses in {course_category}: {joined[course_category.lower()]}"
+    return f"Category not found. Available categories: {', '.join(joined)}"
+
+
+def course_list() -> str:
+    """One line per category, e.g. "- Civil: Revit, BIM (Building Information Modeling)"."""
+    return catalog().listing
@@ -1,28 +1,300 @@
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-def init_db():
-    conn = sqlite3.connect("enquiry_data.db")
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS enquiries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            mobile TEXT,
-            email TEXT,
-            category TEXT,
-            course TEXT,
-            timestamp TEXT
+from validation import normalize_mobile, normalize_email
+from metrics import STORAGE_WRITE_SECONDS
+
+DB_FILE = "enquiry_data.db"
+
+# WAL lets readers run alongside the single writer, and synchronous=NORMAL
+# only fsyncs at checkpoints instead of on every commit.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS enquiries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        mobile TEXT,
+        email TEXT,
+        category TEXT,
+        course TEXT,
+        timestamp TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_enquiries_mobile ON enquiries (mobile)",
+    "CREATE INDEX IF NOT EXISTS idx_enquiries_email ON enquiries (email)",
+    "CREATE INDEX IF NOT EXISTS idx_enquiries_timestamp ON enquiries (timestamp)",
+)
+
+# Needs the status column, which older databases only get via ALTER TABLE
+STATUS_INDEX = "CREATE INDEX IF NOT EXISTS idx_enquiries_status ON enquiries (status COLLATE NOCASE)"
+
+# Statements are kept as constants so sqlite3's per-connection statement
+# cache hands back the already prepared statement on every call.
+INSERT_SQL = ("INSERT INTO enquiries (name, mobile, email, status, category, course, timestamp) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?)")
+EXISTS_SQL = "SELECT 1 FROM enquiries WHERE mobile = ? OR email = ? LIMIT 1"
+COLUMNS = "id, name, mobile, email, status, category, course, timestamp"
+SELECT_SQL = f"SELECT {COLUMNS} FROM enquiries WHERE id > ? ORDER BY id LIMIT ?"
+VERSION_SQL = "SELECT MAX(id) FROM enquiries"
+# Connections are shared between threads through a small pool rather than
+# opened per thread: Flask serves requests on fresh threads, so a per-thread
+# connection re-ran the pragmas on every request and was never closed.
+POOL_SIZE = 4
+# Seconds to wait for a free connection when all of them are in use
+POOL_TIMEOUT = 5.0
+# Bulk duplicate checks look keys up this many at a time, below SQLite's
+# default limit of 999 bound parameters per statement
+LOOKUP_BATCH = 500
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class EnquiryRepository:
+    """SQLite-backed inquiry store over a bounded pool of shared connections."""
+
+    def __init__(self, path: str = DB_FILE, pool_size: int = POOL_SIZE):
+        self.path = path
+        self.pool_size = pool_size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled connection for the duration of the with block."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, cached_statements=128, check_same_thread=False)
+        try:
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            self._ensure_schema(conn)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            grow = self._opened < self.pool_size
+            if grow:
+                self._opened += 1
+        if grow:
+            try:
+                return self._connect()
+            except BaseException:
+                with self._lock:
+                    self._opened -= 1
+                raise
+        try:
+            return self._idle.get(timeout=POOL_TIMEOUT)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"no free connection to {self.path} after {POOL_TIMEOUT}s") from None
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if not self._closed:
+                self._idle.put(conn)
+                return
+            self._opened -= 1
+        conn.close()
+
+    def _ensure_schema(self, conn: sqlite3.Connection) -> None:
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            with conn:
+                for statement in SCHEMA:
+                    conn.execute(statement)
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(enquiries)")}
+                if "status" not in columns:
+                    conn.execute("ALTER TABLE enquiries ADD COLUMN status TEXT")
+                conn.execute(STATUS_INDEX)
+            self._schema_ready = True
+
+    @staticmethod
+    def _row(record: Dict) -> Tuple:
+        course = record.get("course")
+        if course is None:
+            course = ", ".join(record.get("courses", []))
+        return (
+            record.get("name", ""),
+            normalize_mobile(record.get("mobile", "")),
+            normalize_email(record.get("email", "")),
+            record.get("status", ""),
+            record.get("category", ""),
+            course,
+            record.get("timestamp") or _now(),
         )
-    """)
-    conn.commit()
-    conn.close()
+
+    @staticmethod
+    def _record(row: Tuple) -> Dict:
+        id_, name, mobile, email, status, category, course, timestamp = row
+        return {
+            "id": id_,
+            "name": name,
+            "mobile": mobile,
+            "email": email,
+            "status": status or "",
+            "category": category or "",
+            "courses": [c.strip() for c in (course or "").split(",") if c.strip()],
+            "timestamp": timestamp,
+        }
+
+    def save(self, record: Dict) -> None:
+        """Insert one inquiry."""
+        self.save_many([record])
+
+    def save_many(self, records: Iterable[Dict]) -> int:
+        """Insert inquiries in a single transaction and return how many were written."""
+        rows = [self._row(record) for record in records]
+        if rows:
+            with self.connection() as conn, conn:
+                conn.executemany(INSERT_SQL, rows)
+        return len(rows)
+
+    def exists(self, mobile: str, email: str) -> bool:
+        """Return True if an inquiry already exists for mobile or email."""
+        mobile = normalize_mobile(mobile) or None
+        email = normalize_email(email) or None
+        if mobile is None and email is None:
+            return False
+        with self.connection() as conn:
+            return conn.execute(EXISTS_SQL, (mobile, email)).fetchone() is not None
+
+    def existing(self, mobiles: Iterable[str], emails: Iterable[str]) -> Tuple[Set[str], Set[str]]:
+        """Return the normalised mobiles and emails, out of those given, that are already stored."""
+        found = []
+        with self.connection() as conn:
+            for column, keys in (("mobile", list(mobiles)), ("email", list(emails))):
+                present = set()
+                for start in range(0, len(keys), LOOKUP_BATCH):
+                    batch = keys[start:start + LOOKUP_BATCH]
+                    sql = f"SELECT {column} FROM enquiries WHERE {column} IN ({','.join('?' * len(batch))})"
+                    present.update(row[0] for row in conn.execute(sql, batch))
+                found.append(present)
+        return found[0], found[1]
+
+    def iter_records(self, batch_size: int = 500, after_id: int = 0) -> Iterator[Dict]:
+        """Yield every inquiry with an id above after_id in insertion order, batch_size rows at a time."""
+        last_id = after_id
+        while True:
+            # The connection goes back to the pool between batches, not when the caller stops iterating
+            with self.connection() as conn:
+                rows = conn.execute(SELECT_SQL, (last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._record(row)
+            last_id = rows[-1][0]
+
+    def query(self, start: Optional[str] = None, end: Optional[str] = None,
+              course: Optional[str] = None, status: Optional[str] = None,
+              cursor: Optional[int] = None, limit: int = 50) -> Tuple[List[Dict], Optional[int]]:
+        """
+        Return one page of inquiries, newest first, and the cursor for the next page.
+
+        start and end are "YYYY-MM-DD" dates (inclusive), course matches any part
+        of the course text and status is compared case-insensitively. cursor is
+        the id returned with the previous page; None starts from the newest row.
+        """
+        clauses, params = [], []
+        if start:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            clauses.append("timestamp <= ?")
+            params.append(end + " 23:59:59" if len(end) == 10 else end)
+        if status:
+            clauses.append("status = ? COLLATE NOCASE")
+            params.append(status)
+        if course:
+            clauses.append("course LIKE ?")
+            params.append(f"%{course}%")
+        if cursor is not None:
+            clauses.append("id < ?")
+            params.append(cursor)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT {COLUMNS} FROM enquiries {where} ORDER BY id DESC LIMIT ?"
+        with self.connection() as conn:
+            rows = conn.execute(sql, (*params, limit + 1)).fetchall()
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return [self._record(row) for row in rows[:limit]], next_cursor
+
+    def version(self) -> Optional[int]:
+        """Return the newest row id; rows are never updated, so this changes only on insert."""
+        with self.connection() as conn:
+            return conn.execute(VERSION_SQL).fetchone()[0]
+
+    def close(self) -> None:
+        """Close the idle connections; borrowed ones are closed when they come back."""
+        with self._lock:
+            self._closed = True
+            idle = []
+            while not self._idle.empty():
+                idle.append(self._idle.get_nowait())
+            self._opened -= len(idle)
+        for conn in idle:
+            conn.close()
+
+
+def get_repository() -> EnquiryRepository:
+    """Return the process-wide repository for DB_FILE."""
+    from storage import get_repository as shared_repository
+    return shared_repository("sqlite", DB_FILE)
+
+
+def init_db():
+    with get_repository().connection():
+        pass
+
 
 def save_enquiry(name, mobile, email, category, course):
-    conn = sqlite3.connect("enquiry_data.db")
-    cursor = conn.cursor()
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    cursor.execute("INSERT INTO enquiries (name, mobile, email, category, course, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
-                   (name, mobile, email, category, course, timestamp))
-    conn.commit()
-    conn.close()
+    from storage import get_writer
+    with STORAGE_WRITE_SECONDS.time("save_enquiry"):
+        get_writer("sqlite", DB_FILE).save({
+            "name": name,
+            "mobile": mobile,
+            "email": email,
+            "category": category,
+            "course": course,
+            # Stamped now, not when the background writer gets to it
+            "timestamp": _now(),
+        })
+
+
+def save_enquiries_bulk(enquiries: Iterable[Tuple]) -> int:
+    """Insert many (name, mobile, email, category, course) tuples in one transaction."""
+    return get_repository().save_many(
+        {"name": name, "mobile": mobile, "email": email, "category": category, "course": course}
+        for name, mobile, email, category, course in enquiries
+    )
@@ -0,0 +1,171 @@
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+# Local stand-in for an OpenAI-compatible chat completions API, for load
+# tests and offline runs. Point the bot at it with
+#
+#   OPENAI_API_BASE=http://127.0.0.1:8089/v1 OPENAI_API_KEY=fake python main.py
+#
+# Every request gets the same reply after `latency` seconds, streamed one
+# word every `token_delay` seconds when the client asks for stream=true.
+# `error_rate` makes that share of requests fail with a 500. Connections are
+# kept alive, streams use chunked transfer encoding.
+
+DEFAULT_REPLY = ("I'm Bairo, the CADD Center assistant. We run weekday and weekend batches; "
+                 "please share your details and our team will contact you with the schedule.")
+
+
+def split_tokens(text: str) -> List[str]:
+    """Split text into word-sized chunks that join back to text."""
+    words = text.split(" ")
+    return [words[0]] + [" " + word for word in words[1:]]
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeLLMServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, payload) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            return self.send_json(200, {"object": "list", "data": [
+                {"id": self.server.model, "object": "model", "owned_by": "fake-llm"}]})
+        self.send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self.send_json(400, {"error": {"message": "invalid JSON"}})
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self.send_json(404, {"error": {"message": "not found"}})
+
+        config = self.server
+        config.count_request()
+        time.sleep(config.latency)
+        if config.error_rate and random.random() < config.error_rate:
+            return self.send_json(500, {"error": {"message": "injected failure", "type": "server_error"}})
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = request.get("model") or config.model
+        tokens = split_tokens(config.reply)
+        if not request.get("stream"):
+            time.sleep(config.token_delay * len(tokens))
+            return self.send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": config.reply}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def event(delta, finish_reason=None) -> bytes:
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            return b"data: " + json.dumps(chunk).encode() + b"\n\n"
+
+        self.send_chunk(event({"role": "assistant", "content": ""}))
+        for token in tokens:
+            time.sleep(config.token_delay)
+            self.send_chunk(event({"content": token}))
+        self.send_chunk(event({}, "stop"))
+        self.send_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.05,
+                 token_delay: float = 0.005, error_rate: float = 0.0,
+                 reply: str = DEFAULT_REPLY, model: str = "fake-llm"):
+        super().__init__((host, port), FakeLLMHandler)
+        self.latency = latency
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self.reply = reply
+        self.model = model
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL to use as OPENAI_API_BASE."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def start(self) -> "FakeLLMServer":
+        """Serve from a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="seconds between streamed tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests that fail with 500")
+    parser.add_argument("--reply", default=DEFAULT_REPLY)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(args.host, args.port, args.latency, args.token_delay, args.error_rate, args.reply)
+    print(f"Fake LLM listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,112 @@
+import re
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from courses import course_list
+from validation import clean_email, clean_mobile, validate_email, validate_mobile_number
+from metrics import STEP_SECONDS, VALIDATION_FAILURES
+
+# Declarative intake flow shared by app.py and main.py:
+#
+#   greeting -> name -> mobile -> email -> status -> course -> complete
+#
+# Each step is data: the field the answer is stored in, an optional
+# validator with its error message, the next step and the prompt shown on
+# entering that next step. Steps are looked up in a dict, so a turn costs one
+# dispatch plus the step's own validator. Contact details are first cleaned
+# into the canonical form the duplicate checks use (validation.py), so
+# "+91 98765-43210" is accepted and stored as "9876543210". Prompts are
+# tuples of paragraphs; the web front end joins them with blank lines, the
+# CLI prints each line.
+
+
+GREETING_TRIGGER = re.compile(r"\b(courses?|enquire|enquiry|inquiry|information|hi|hello)\b", re.IGNORECASE)
+
+GREETING_HELP = ("I can help you with course inquiries, fee details, or schedule information. How may I assist you?",)
+RESTART = ("How else can I assist you today?",)
+
+PROMPTS = {
+    "name": ("I'd be happy to help you with course information! Please provide the following details:",
+             "1. Your Name:"),
+    "mobile": ("2. Your Mobile Number:",),
+    "email": ("3. Your Email ID:",),
+    "status": ("4. What's your current status? (Student/Working Professional/Job Seeker/Other)",),
+    "course": ("Which courses are you interested in? We offer:",),
+    "complete": ("Thank you for providing your details! Our team will contact you soon with more information about the courses you're interested in.",
+                 "For immediate assistance or more details, you can visit our center or call us at 7845821665.",
+                 "Thank you for your inquiry! Have a great day!"),
+}
+
+
+def prompt(step: str) -> Tuple[str, ...]:
+    """The prompt shown on entering step; the course list comes from the current catalog."""
+    if step == "course":
+        return PROMPTS["course"] + (course_list(),)
+    return PROMPTS[step]
+
+
+class Step(NamedTuple):
+    field: Optional[str]
+    next: str
+    validator: Optional[Callable[[str], bool]] = None
+    error: Tuple[str, ...] = ()
+    clean: Optional[Callable[[str], str]] = None
+
+
+STEPS = {
+    "name": Step("name", "mobile"),
+    "mobile": Step("mobile", "email", validate_mobile_number,
+                   ("Invalid mobile number. Please enter exactly 10 digits.",), clean_mobile),
+    "email": Step("email", "status", validate_email,
+                  ("Invalid email format. Please enter a valid email address.",), clean_email),
+    "status": Step("status", "course"),
+    "course": Step("course", "complete"),
+}
+
+
+class Turn(NamedTuple):
+    lines: Tuple[str, ...]
+    next_step: str
+    user_data: Dict
+    valid: bool = True
+    # False when the greeting step did not recognise an intake request, so
+    # the front end may answer the message some other way
+    handled: bool = True
+
+    @property
+    def message(self) -> str:
+        return "\n\n".join(self.lines)
+
+
+def advance(step: str, message: str, user_data: Optional[Dict] = None) -> Turn:
+    """Apply one user message to the flow and return the bot's turn."""
+    user_data = {} if user_data is None else user_data
+    spec = STEPS.get(step)
+    if spec is not None:
+        with STEP_SECONDS.time(step):
+            if spec.clean is not None:
+                message = spec.clean(message)
+            if spec.validator is not None and not spec.validator(message):
+                VALIDATION_FAILURES.inc(spec.field)
+                return Turn(spec.error, step, user_data, valid=False)
+            user_data[spec.field] = message
+            return Turn(prompt(spec.next), spec.next, user_data)
+    if step == "greeting":
+        with STEP_SECONDS.time(step):
+            if GREETING_TRIGGER.search(message):
+                return Turn(PROMPTS["name"], "name", user_data)
+            return Turn(GREETING_HELP, "greeting", user_data, handled=False)
+    # After completion (or from an unknown step) start over
+    return Turn(RESTART, "greeting", {})
+
+
+def advance_many(items: Iterable[Tuple]) -> List[Turn]:
+    """
+    Run many independent turns, e.g. to replay logged conversations.
+
+    Each item is (step, message) or (step, message, user_data); user_data is
+    copied, so the inputs are left untouched.
+    """
+    return [
+        advance(item[0], item[1], dict(item[2]) if len(item) > 2 else {})
+        for item in items
+    ]
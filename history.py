@@ -0,0 +1,144 @@
+import json
+import hashlib
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import PROMPT_TOKENS
+
+# Token-budgeted conversation history for agent prompts.
+#
+# The prompt is built from three parts:
+#   - a system message with the structured user details collected so far
+#     and a running summary of older turns
+#   - as many of the most recent turns as fit in max_tokens
+# Turns that fall out of the window are folded into the summary once and
+# then dropped, so both the prompt and the stored history stay bounded.
+#
+# Messages are (role, content) tuples, which LangGraph accepts directly.
+
+Message = Tuple[str, str]
+
+# tiktoken is imported on first use, so loading this module stays cheap;
+# False once it turned out to be unavailable
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except (ImportError, OSError):
+                    _encoding = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if not encoding:  # fall back to the ~4 characters per token rule of thumb
+        return len(text) // 4 + 1
+    return len(encoding.encode(text)) + 4  # per-message framing overhead
+
+
+def extractive_summary(summary: str, turns: List[Message], max_chars: int = 800) -> str:
+    """Append a clipped line per evicted turn to the summary, keeping only the newest max_chars."""
+    lines = [summary] if summary else []
+    for role, content in turns:
+        speaker = "User" if role == "user" else "Bairo"
+        clipped = content if len(content) <= 120 else content[:117] + "..."
+        lines.append(f"{speaker}: {clipped}")
+    text = "\n".join(lines)
+    return text[-max_chars:]
+
+
+class ConversationHistory:
+    __slots__ = ("max_tokens", "summarize", "user_info", "summary", "turns", "_tokens",
+                 "agent_calls", "last_prompt_tokens", "max_prompt_tokens", "total_prompt_tokens")
+
+    def __init__(self, max_tokens: int = 1500,
+                 summarize: Callable[[str, List[Message]], str] = extractive_summary,
+                 user_info: Optional[Dict] = None):
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+        self.user_info = user_info if user_info is not None else {}
+        self.summary = ""
+        self.turns: List[Message] = []
+        self._tokens: List[int] = []
+        # Running prompt size statistics; every prompt is also observed in bairo_prompt_tokens
+        self.agent_calls = 0
+        self.last_prompt_tokens = 0
+        self.max_prompt_tokens = 0
+        self.total_prompt_tokens = 0
+
+    def add(self, role: str, content: str) -> None:
+        self.turns.append((role, content))
+        self._tokens.append(count_tokens(content))
+
+    @property
+    def last_user_message(self) -> str:
+        for role, content in reversed(self.turns):
+            if role == "user":
+                return content
+        return ""
+
+    def system_message(self) -> Optional[Message]:
+        facts = ", ".join(
+            f"{field}: {', '.join(value) if isinstance(value, list) else value}"
+            for field, value in self.user_info.items() if value
+        )
+        parts = []
+        if facts:
+            parts.append(f"Known user details - {facts}.")
+        if self.summary:
+            parts.append(f"Earlier in this conversation:\n{self.summary}")
+        return ("system", "\n".join(parts)) if parts else None
+
+    def fingerprint(self) -> str:
+        """
+        Hash of everything besides the last user message that the next reply
+        depends on: the user details, the summary and the earlier turns.
+        """
+        turns = self.turns[:-1] if self.turns and self.turns[-1][0] == "user" else self.turns
+        encoded = json.dumps([self.system_message(), turns], default=str)
+        return hashlib.sha1(encoded.encode()).hexdigest()[:16]
+
+    def window(self) -> List[Message]:
+        """Return the prompt messages for the next agent call and record its token count."""
+        system = self.system_message()
+        budget = self.max_tokens - (count_tokens(system[1]) if system else 0)
+
+        keep, used = 0, 0
+        for tokens in reversed(self._tokens):
+            if keep and used + tokens > budget:
+                break
+            used += tokens
+            keep += 1
+
+        evicted = len(self.turns) - keep
+        if evicted:
+            self.summary = self.summarize(self.summary, self.turns[:evicted])
+            del self.turns[:evicted]
+            del self._tokens[:evicted]
+            system = self.system_message()
+
+        messages = ([system] if system else []) + list(self.turns)
+        tokens = sum(count_tokens(content) for _, content in messages)
+        self.agent_calls += 1
+        self.last_prompt_tokens = tokens
+        self.max_prompt_tokens = max(self.max_prompt_tokens, tokens)
+        self.total_prompt_tokens += tokens
+        PROMPT_TOKENS.observe(tokens)
+        return messages
+
+    def stats(self) -> Dict:
+        return {
+            "turns": len(self.turns),
+            "agent_calls": self.agent_calls,
+            "last_prompt_tokens": self.last_prompt_tokens,
+            "max_prompt_tokens": self.max_prompt_tokens,
+            "total_prompt_tokens": self.total_prompt_tokens,
+        }
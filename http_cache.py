@@ -0,0 +1,232 @@
+import os
+import gzip
+import time
+import hashlib
+import mimetypes
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from metrics import REGISTRY
+
+# Precomputed HTTP responses with validators and compressed variants.
+#
+# A CachedResponse holds one body in every encoding worth sending: as is,
+# gzip, and brotli when the optional brotli package is installed or a
+# precompressed file is supplied. Each variant has a strong ETag (a hash of
+# the body, plus the encoding), so a client that already has the current
+# version gets an empty 304 Not Modified. respond() picks the variant from
+# the request's Accept-Encoding, If-None-Match and If-Modified-Since headers
+# (the latter only when there is no If-None-Match) and returns
+# (status, headers, body) for the web framework to send; nothing is hashed
+# or compressed per request.
+#
+# StaticFiles serves a directory from CachedResponses. A file is read and
+# compressed the first time it is asked for and again only after its
+# modification time changes, which is checked at most every check_interval
+# seconds. A build step may put foo.js.gz and foo.js.br next to foo.js; those
+# are used as they are instead of compressing at run time. RenderedPage does
+# the same for a template rendered once per change of its source file.
+
+MIN_COMPRESS_SIZE = 256
+ENCODINGS = ("br", "gzip")  # in order of preference
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+TEXT_TYPES = ("application/javascript", "application/json", "image/svg+xml")
+
+CACHED_RESPONSES = REGISTRY.counter("bairo_cached_responses_total", "Precomputed HTTP responses sent",
+                                    ("encoding",))
+
+# brotli is imported on first use; False once it turned out to be unavailable
+_brotli = None
+
+
+def _get_brotli():
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+            _brotli = brotli
+        except ImportError:
+            _brotli = False
+    return _brotli
+
+
+def compress(body: bytes, encoding: str) -> Optional[bytes]:
+    """Compress body for a Content-Encoding, or return None if that encoding is not available."""
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=9, mtime=0)
+    brotli = _get_brotli()
+    if encoding == "br" and brotli:
+        return brotli.compress(body, quality=11)
+    return None
+
+
+def accepted_encodings(header: Optional[str]) -> Set[str]:
+    """The content codings an Accept-Encoding header allows, e.g. {"gzip", "br"}."""
+    accepted, refused = set(), set()
+    for part in (header or "").split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        (accepted if quality > 0 else refused).add(coding)
+    if "*" in accepted:
+        accepted.update(encoding for encoding in ENCODINGS if encoding not in refused)
+    return accepted
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/"x" matches "x"."""
+    for candidate in (if_none_match or "").split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def modified_since(if_modified_since: Optional[str], last_modified: Optional[int]) -> bool:
+    """False when last_modified (epoch seconds) is no later than an If-Modified-Since date."""
+    if not if_modified_since or last_modified is None:
+        return True
+    try:
+        return last_modified > parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return True
+
+
+def content_type(path: str) -> str:
+    guessed = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if guessed.startswith("text/") or guessed in TEXT_TYPES:
+        return f"{guessed}; charset=utf-8"
+    return guessed
+
+
+class CachedResponse:
+    def __init__(self, body: bytes, content_type: str, cache_control: str = "no-cache",
+                 variants: Optional[Dict[str, bytes]] = None, last_modified: Optional[float] = None):
+        self.body = body
+        self.content_type = content_type
+        self.cache_control = cache_control
+        # Whole seconds, the resolution of HTTP dates
+        self.last_modified = int(last_modified) if last_modified is not None else None
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.variants = {"identity": body}
+        for encoding in ENCODINGS:
+            data = (variants or {}).get(encoding)
+            if data is None and len(body) >= MIN_COMPRESS_SIZE:
+                data = compress(body, encoding)
+            # Only worth sending when it is smaller
+            if data is not None and len(data) < len(body):
+                self.variants[encoding] = data
+        self.etags = {encoding: self.etag if encoding == "identity" else f'"{digest}-{encoding}"'
+                      for encoding in self.variants}
+
+    def respond(self, if_none_match: Optional[str] = None, accept_encoding: Optional[str] = None,
+                if_modified_since: Optional[str] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """Return (status, headers, body): the best variant the client accepts, or 304 if it has it."""
+        accepted = accepted_encodings(accept_encoding)
+        encoding = next((encoding for encoding in ENCODINGS if encoding in self.variants and encoding in accepted),
+                        "identity")
+        headers = {"ETag": self.etags[encoding], "Cache-Control": self.cache_control}
+        if len(self.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if self.last_modified is not None:
+            headers["Last-Modified"] = formatdate(self.last_modified, usegmt=True)
+        if (etag_matches(if_none_match, self.etags[encoding]) if if_none_match
+                else not modified_since(if_modified_since, self.last_modified)):
+            CACHED_RESPONSES.inc("not_modified")
+            return 304, headers, b""
+        headers["Content-Type"] = self.content_type
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        CACHED_RESPONSES.inc(encoding)
+        return 200, headers, self.variants[encoding]
+
+
+def load_file(path: str, cache_control: str) -> CachedResponse:
+    """A CachedResponse for a file, using foo.gz/foo.br next to it when they are at least as new."""
+    with open(path, "rb") as handle:
+        body = handle.read()
+    mtime = os.stat(path).st_mtime_ns
+    variants = {}
+    for encoding, suffix in SUFFIXES.items():
+        try:
+            if os.stat(path + suffix).st_mtime_ns >= mtime:
+                with open(path + suffix, "rb") as handle:
+                    variants[encoding] = handle.read()
+        except OSError:
+            pass
+    return CachedResponse(body, content_type(path), cache_control, variants, mtime / 1e9)
+
+
+class StaticFiles:
+    def __init__(self, root: str, cache_control: str = "public, max-age=3600", check_interval: float = 2.0):
+        self.root = os.path.realpath(root)
+        self.cache_control = cache_control
+        self.check_interval = check_interval
+        self._files = {}  # name -> (checked, mtime, CachedResponse)
+        self._lock = threading.Lock()
+
+    def resolve(self, name: str) -> Optional[str]:
+        """The file's path, or None if it does not exist or lies outside the root."""
+        path = os.path.realpath(os.path.join(self.root, name))
+        if not path.startswith(self.root + os.sep) or not os.path.isfile(path):
+            return None
+        return path
+
+    def get(self, name: str) -> Optional[CachedResponse]:
+        now = time.monotonic()
+        entry = self._files.get(name)
+        if entry is not None and now - entry[0] < self.check_interval:
+            return entry[2]
+        path = self.resolve(name)
+        if path is None:
+            with self._lock:
+                self._files.pop(name, None)
+            return None
+        mtime = os.stat(path).st_mtime_ns
+        response = entry[2] if entry is not None and entry[1] == mtime else load_file(path, self.cache_control)
+        with self._lock:
+            self._files[name] = (now, mtime, response)
+        return response
+
+
+class RenderedPage:
+    def __init__(self, path: str, render: Callable[[str], str], cache_control: str = "no-cache",
+                 check_interval: float = 2.0):
+        self.path = path
+        self.render = render
+        self.cache_control = cache_control
+        self.check_interval = check_interval
+        self._entry = None  # (checked, mtime, CachedResponse)
+        self._lock = threading.Lock()
+
+    def get(self) -> CachedResponse:
+        """The rendered page, rendered again if the source file changed."""
+        entry = self._entry
+        if entry is not None and time.monotonic() - entry[0] < self.check_interval:
+            return entry[2]
+        with self._lock:
+            entry = self._entry
+            now = time.monotonic()
+            if entry is not None and now - entry[0] < self.check_interval:
+                return entry[2]
+            mtime = os.stat(self.path).st_mtime_ns
+            if entry is not None and entry[1] == mtime:
+                response = entry[2]
+            else:
+                with open(self.path, encoding="utf-8") as handle:
+                    html = self.render(handle.read())
+                response = CachedResponse(html.encode("utf-8"), "text/html; charset=utf-8", self.cache_control,
+                                          last_modified=mtime / 1e9)
+            self._entry = (now, mtime, response)
+            return response
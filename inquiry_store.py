@@ -0,0 +1,437 @@
+import os
+import re
+import json
+import time
+import uuid
+import atexit
+import weakref
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from validation import normalize_email, normalize_mobile
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+# Append-only inquiry store.
+#
+# Layout on disk (for INQUIRY_DB_FILE = "inquiry_database.json"):
+#   inquiry_database.json        snapshot, same {"inquiries": [...]} format as before
+#   inquiry_database.json.log    journal, a header line followed by one JSON record per line
+#   inquiry_database.json.lock   advisory lock shared by all writer processes
+#
+# A save appends a single line to the journal, so it costs the same no matter
+# how many inquiries exist. Once the journal holds as many records as the
+# snapshot, it is folded back into the snapshot; this keeps compaction cost
+# amortised O(1) per save. An existing inquiry_database.json is simply the
+# initial snapshot, so no separate migration step is needed.
+#
+# Every journal starts with a header naming its generation. A compacted
+# snapshot records the generation it absorbed, so a crash between replacing
+# the snapshot and truncating the journal never replays a record twice.
+
+JOURNAL_SUFFIX = ".log"
+LOCK_SUFFIX = ".lock"
+
+_ARRAY_START = re.compile(r'"inquiries"\s*:\s*\[')
+_ABSORBED = re.compile(r'"absorbed"\s*:\s*"([0-9a-f]+)"')
+_SEPARATORS = " \t\r\n,"
+
+# Stores still open at exit are closed by one atexit hook; holding them
+# weakly lets a store that is dropped be collected.
+_open_stores: "weakref.WeakSet[InquiryStore]" = weakref.WeakSet()
+
+
+@atexit.register
+def _close_open_stores() -> None:
+    for store in list(_open_stores):
+        store.close()
+
+
+class InquiryStore:
+    def __init__(self, path: str, fsync_every: int = 32, fsync_interval: float = 1.0,
+                 min_compact: int = 1000, refresh_interval: Optional[float] = 1.0):
+        self.path = path
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.lock_path = path + LOCK_SUFFIX
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.min_compact = min_compact
+
+        self._lock = threading.RLock()
+        self._journal = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._sync_timer = None
+        self._snapshot_count = None
+        self._journal_count = 0
+        _open_stores.add(self)
+
+        # Duplicate-check indexes, built on first use. Changes made by other
+        # processes are picked up by stat()ing the files at most once per
+        # refresh_interval; None means this process is the only writer.
+        self.refresh_interval = refresh_interval
+        self._mobiles = None
+        self._emails = None
+        self._index_snapshot = None
+        self._index_offset = 0
+        self._index_checked = 0.0
+
+    # ----- locking -----
+
+    def _acquire(self):
+        self._lock.acquire()
+        handle = None
+        if fcntl is not None:
+            handle = open(self.lock_path, "a")
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def _release(self, handle) -> None:
+        if handle is not None:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+        self._lock.release()
+
+    # ----- reading -----
+
+    def _read_snapshot(self) -> Dict:
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    db = json.load(f)
+                if isinstance(db, dict) and isinstance(db.get("inquiries"), list):
+                    return db
+            except json.JSONDecodeError:
+                pass
+        return {"inquiries": []}
+
+    def _scan_journal(self, offset: int = 0) -> Iterator[Tuple[Dict, int]]:
+        """Yield (entry, end_offset) for every complete journal line from offset on."""
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Torn write from a crash mid-append; stop at the last good record
+                    return
+                offset += len(line)
+                try:
+                    yield json.loads(line), offset
+                except json.JSONDecodeError:
+                    continue
+
+    def _journal_records(self, snapshot: Dict) -> Iterator[Dict]:
+        """Yield journal records that are not already part of snapshot."""
+        generation = None
+        for entry, _ in self._scan_journal():
+            if "_journal" in entry:
+                generation = entry["_journal"]
+                continue
+            if generation is not None and generation == snapshot.get("absorbed"):
+                return
+            yield entry
+
+    def _recover(self) -> None:
+        """Drop a partially written trailing line left behind by a crash."""
+        if not os.path.exists(self.journal_path):
+            return
+        good = 0
+        for _, good in self._scan_journal():
+            pass
+        if os.path.getsize(self.journal_path) != good:
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(good)
+
+    def load(self) -> Dict:
+        """Return the full database: snapshot plus replayed journal."""
+        handle = self._acquire()
+        try:
+            self._sync()
+            db = self._read_snapshot()
+            self._snapshot_count = len(db["inquiries"])
+            journal = list(self._journal_records(db))
+            self._journal_count = len(journal)
+            db["inquiries"].extend(journal)
+            db.pop("absorbed", None)
+            return db
+        finally:
+            self._release(handle)
+
+    def _stream_snapshot(self, meta: Dict, chunk_size: int = 64 * 1024) -> Iterator[Dict]:
+        """
+        Yield snapshot inquiries one by one without loading the whole file.
+
+        The journal generation the snapshot absorbed is stored in meta["absorbed"].
+        """
+        if not os.path.exists(self.path):
+            return
+        decoder = json.JSONDecoder()
+        with open(self.path, "r", encoding="utf-8") as f:
+            buf = f.read(chunk_size)
+            start = _ARRAY_START.search(buf)
+            while start is None:
+                more = f.read(chunk_size)
+                if not more:
+                    return
+                buf += more
+                start = _ARRAY_START.search(buf)
+            head, pos = buf[:start.start()], start.end()
+            while True:
+                while pos < len(buf) and buf[pos] in _SEPARATORS:
+                    pos += 1
+                if pos < len(buf) and buf[pos] == "]":
+                    tail = head + buf[pos:] + f.read()
+                    found = _ABSORBED.search(tail)
+                    meta["absorbed"] = found.group(1) if found else None
+                    return
+                try:
+                    record, pos = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    more = f.read(chunk_size)
+                    if not more:
+                        return
+                    buf, pos = buf[pos:] + more, 0
+                    continue
+                yield record
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Stream every inquiry, snapshot first and then the journal, in constant memory."""
+        meta = {}
+        yield from self._stream_snapshot(meta)
+        yield from self._journal_records(meta)
+
+    # ----- writing -----
+
+    def _open_journal(self):
+        if self._journal is None:
+            self._recover()
+            if not os.path.exists(self.journal_path) or os.path.getsize(self.journal_path) == 0:
+                self._new_journal()
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        return self._journal
+
+    def _new_journal(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        with open(self.journal_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"_journal": uuid.uuid4().hex}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _generation(self) -> Optional[str]:
+        for entry, _ in self._scan_journal():
+            return entry.get("_journal")
+        return None
+
+    def _sync(self) -> None:
+        if self._journal is not None and self._unsynced:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def append(self, record: Dict) -> None:
+        """Append one inquiry to the journal."""
+        self.append_many([record])
+
+    def append_many(self, records: List[Dict]) -> None:
+        """Append inquiries to the journal, fsyncing in batches."""
+        if not records:
+            return
+        handle = self._acquire()
+        try:
+            journal = self._open_journal()
+            if self._mobiles is not None:
+                self._refresh_index()
+            journal.write("".join(json.dumps(record) + "\n" for record in records))
+            journal.flush()
+            if self._mobiles is not None:
+                for record in records:
+                    self._index_record(record)
+                self._index_offset = os.fstat(journal.fileno()).st_size
+            self._unsynced += len(records)
+            elapsed = time.monotonic() - self._last_sync
+            if self._unsynced >= self.fsync_every or elapsed >= self.fsync_interval:
+                self._sync()
+            elif self._sync_timer is None:
+                # Bound the time an acknowledged record stays unsynced even if no append follows
+                self._sync_timer = threading.Timer(self.fsync_interval - elapsed, self._timed_sync)
+                self._sync_timer.daemon = True
+                self._sync_timer.start()
+
+            if self._snapshot_count is None:
+                self._snapshot_count = len(self._read_snapshot()["inquiries"])
+            self._journal_count += len(records)
+            if self._journal_count >= max(self.min_compact, self._snapshot_count):
+                self._compact()
+        finally:
+            self._release(handle)
+
+    def _write_snapshot(self, db: Dict) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(db, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _compact(self) -> None:
+        # Caller holds the lock
+        self._sync()
+        db = self._read_snapshot()
+        db["inquiries"].extend(self._journal_records(db))
+        db["absorbed"] = self._generation()
+        self._write_snapshot(db)
+        self._new_journal()
+        self._snapshot_count = len(db["inquiries"])
+        self._journal_count = 0
+        if self._mobiles is not None:
+            self._index_snapshot = self._stat(self.path)
+            self._index_offset = os.path.getsize(self.journal_path)
+
+    def compact(self) -> None:
+        """Fold the journal into the snapshot."""
+        handle = self._acquire()
+        try:
+            self._compact()
+        finally:
+            self._release(handle)
+
+    def replace(self, db: Dict) -> None:
+        """Overwrite the whole database (snapshot and journal) with db."""
+        handle = self._acquire()
+        try:
+            self._sync()
+            self._write_snapshot(dict(db, absorbed=self._generation()))
+            self._new_journal()
+            self._snapshot_count = len(db.get("inquiries", []))
+            self._journal_count = 0
+            self._mobiles = self._emails = None
+        finally:
+            self._release(handle)
+
+    # ----- duplicate-check indexes -----
+
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _index_record(self, record: Dict) -> None:
+        mobile = normalize_mobile(record.get("mobile", ""))
+        email = normalize_email(record.get("email", ""))
+        if mobile:
+            self._mobiles.add(mobile)
+        if email:
+            self._emails.add(email)
+
+    def _build_index(self) -> None:
+        # Caller holds the lock
+        self._sync()
+        self._mobiles, self._emails = set(), set()
+        self._index_snapshot = self._stat(self.path)
+        db = self._read_snapshot()
+        for record in db["inquiries"]:
+            self._index_record(record)
+        self._index_offset = 0
+        generation = None
+        for entry, self._index_offset in self._scan_journal():
+            if "_journal" in entry:
+                generation = entry["_journal"]
+            elif generation is None or generation != db.get("absorbed"):
+                self._index_record(entry)
+        self._index_checked = time.monotonic()
+
+    def _refresh_index(self) -> None:
+        # Caller holds the lock. Another process may have appended to the
+        # journal (read just the new tail) or compacted it (rebuild).
+        self._index_checked = time.monotonic()
+        if self._stat(self.path) != self._index_snapshot:
+            self._build_index()
+            return
+        journal = self._stat(self.journal_path)
+        size = journal[1] if journal else 0
+        if size < self._index_offset:
+            self._build_index()
+        elif size > self._index_offset:
+            for entry, self._index_offset in self._scan_journal(self._index_offset):
+                if "_journal" not in entry:
+                    self._index_record(entry)
+
+    def build_index(self) -> None:
+        """Load the mobile/email indexes so later lookups stay in memory."""
+        handle = self._acquire()
+        try:
+            self._build_index()
+        finally:
+            self._release(handle)
+
+    def _current_index(self) -> None:
+        if self._mobiles is None or (
+                self.refresh_interval is not None
+                and time.monotonic() - self._index_checked >= self.refresh_interval):
+            handle = self._acquire()
+            try:
+                if self._mobiles is None:
+                    self._build_index()
+                else:
+                    self._refresh_index()
+            finally:
+                self._release(handle)
+
+    def contains(self, mobile: str, email: str) -> bool:
+        """Return True if an inquiry already exists for mobile or email."""
+        self._current_index()
+        mobile = normalize_mobile(mobile)
+        email = normalize_email(email)
+        return bool(mobile and mobile in self._mobiles) or bool(email and email in self._emails)
+
+    # ----- repository interface shared with db.EnquiryRepository -----
+
+    def save(self, record: Dict) -> None:
+        self.append_many([record])
+
+    def save_many(self, records: Iterable[Dict]) -> int:
+        records = list(records)
+        self.append_many(records)
+        return len(records)
+
+    def exists(self, mobile: str, email: str) -> bool:
+        return self.contains(mobile, email)
+
+    def existing(self, mobiles: Iterable[str], emails: Iterable[str]) -> Tuple[Set[str], Set[str]]:
+        """Return the normalised mobiles and emails, out of those given, that are already stored."""
+        self._current_index()
+        return self._mobiles.intersection(mobiles), self._emails.intersection(emails)
+
+    def iter_records(self) -> Iterator[Dict]:
+        return iter(self)
+
+    def _timed_sync(self) -> None:
+        with self._lock:
+            self._sync_timer = None
+            self._sync()
+
+    def flush(self) -> None:
+        """Force any batched journal writes to disk."""
+        with self._lock:
+            self._sync()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            self._sync()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+        _open_stores.discard(self)
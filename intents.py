@@ -0,0 +1,60 @@
+import re
+import threading
+from collections import Counter
+from typing import Callable, Dict, Optional
+
+# Keyword intent classifier for questions that have a fixed answer.
+#
+# Patterns are compiled once at import and tried in order, so the more
+# specific intents win (a fee question that mentions a course is a fee
+# question). Anything that matches nothing is left for the LLM agent.
+
+INTENT_PATTERNS = (
+    ("fees", r"\b(fees?|cost|costs|price|pricing|charges?)\b"),
+    ("syllabus", r"\b(syllabus|curriculum|topics|modules)\b"),
+    ("duration", r"\b(duration|time|how long|months?|weeks?)\b"),
+    ("contact", r"\b(contact|phone|call|address|location|where are you|visit)\b"),
+    ("course_list", r"\b(courses?|programs?|categories)\b"),
+    ("greeting", r"^\s*(hi|hello|hey|good (morning|afternoon|evening))\b[\s!.,]*$"),
+)
+
+COMPILED_INTENTS = tuple((name, re.compile(pattern, re.IGNORECASE)) for name, pattern in INTENT_PATTERNS)
+
+
+def classify(text: str) -> Optional[str]:
+    """Return the name of the first intent whose pattern matches text, or None."""
+    for name, pattern in COMPILED_INTENTS:
+        if pattern.search(text):
+            return name
+    return None
+
+
+class IntentRouter:
+    """Answers known intents from handlers and counts hits and misses."""
+
+    def __init__(self, handlers: Dict[str, Callable[[str], str]]):
+        self.handlers = handlers
+        self.hits = Counter()
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def answer(self, text: str) -> Optional[str]:
+        """Return the canned answer for text, or None if it needs the agent."""
+        intent = classify(text)
+        handler = self.handlers.get(intent)
+        with self._lock:
+            if handler is None:
+                self.misses += 1
+            else:
+                self.hits[intent] += 1
+        return handler(text) if handler else None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = sum(self.hits.values())
+            total = hits + self.misses
+            return {
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+            }
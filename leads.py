@@ -0,0 +1,273 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import itertools
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from storage import BACKENDS, get_repository
+from validation import validate_many
+from metrics import STORAGE_WRITE_SECONDS
+
+# Bulk lead import and export.
+#
+#   python leads.py import walk-ins.csv [--backend sqlite] [--rejects FILE]
+#   python leads.py export leads.jsonl  [--backend json]
+#
+# Files are CSV with a header row, or JSON Lines (.jsonl/.ndjson); "-" is
+# stdin/stdout. Both directions stream: an import holds one chunk of rows in
+# memory at a time, an export one repository batch.
+#
+# Per chunk, an import normalises all mobile numbers and emails with one
+# validation.validate_many() call, drops rows that are invalid or whose
+# mobile number or email is already stored (one repository.existing() lookup)
+# or appears earlier in the chunk, and writes the rest with one
+# repository.save_many(), a single transaction. Each chunk is written before
+# the next is checked, so duplicates across chunks are caught as well.
+# Rejected rows go to the reject file with the reason in an "error" column
+# (CSV) or key (JSON Lines).
+
+CHUNK_SIZE = 5000
+
+FIELDS = ("name", "mobile", "email", "status", "courses", "category", "timestamp")
+# Header spellings seen in partner spreadsheets
+ALIASES = {
+    "phone": "mobile", "mobile number": "mobile", "mobile_number": "mobile", "phone number": "mobile",
+    "e-mail": "email", "email address": "email",
+    "course": "courses", "course interest": "courses",
+}
+
+
+def file_format(path: str, default: str = "csv") -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if extension == ".csv":
+        return "csv"
+    return default
+
+
+def _open(path: str, mode: str) -> TextIO:
+    if path == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    return open(path, mode, newline="", encoding="utf-8")
+
+
+def _field(column: str) -> str:
+    column = column.strip().lower()
+    return ALIASES.get(column, column)
+
+
+def read_rows(handle: TextIO, fmt: str) -> Iterator[Tuple[Dict, Optional[str]]]:
+    """Yield (row, error) for each row; error is set when the row cannot be parsed."""
+    if fmt == "csv":
+        reader = csv.reader(handle)
+        header = [_field(column) for column in next(reader, [])]
+        for values in reader:
+            if any(values):
+                yield dict(zip(header, values)), None
+        return
+    for line in handle:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield {"line": line.rstrip("\n")}, "invalid JSON"
+            continue
+        if not isinstance(row, dict):
+            yield {"line": line.rstrip("\n")}, "not a JSON object"
+            continue
+        yield {_field(key): value for key, value in row.items()}, None
+
+
+def _text(value) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def _courses(value) -> List[str]:
+    if isinstance(value, list):
+        return [_text(course) for course in value if _text(course)]
+    return [course.strip() for course in _text(value).replace(";", ",").split(",") if course.strip()]
+
+
+class RejectWriter:
+    """Writes rejected rows and their reasons in the format of the input file."""
+
+    def __init__(self, path: str, fmt: str):
+        self.path = path
+        self.format = fmt
+        self._handle = None
+        self._writer = None
+
+    def write(self, row: Dict, error: str) -> None:
+        if self._handle is None:
+            self._handle = _open(self.path, "w")
+        if self.format == "jsonl":
+            self._handle.write(json.dumps(dict(row, error=error), default=str) + "\n")
+            return
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._handle, fieldnames=[*row, "error"], extrasaction="ignore")
+            self._writer.writeheader()
+        self._writer.writerow(dict(row, error=error))
+
+    def close(self) -> None:
+        if self._handle is not None and self._handle is not sys.stdout:
+            self._handle.close()
+
+
+def _import_chunk(repository, chunk: List[Tuple[Dict, Optional[str]]], rejects: RejectWriter,
+                  stats: Dict, timestamp: str) -> None:
+    parsed = [row for row, error in chunk if error is None]
+    for row, error in chunk:
+        if error is not None:
+            rejects.write(row, error)
+            stats["rejected"][error] = stats["rejected"].get(error, 0) + 1
+    mobiles, emails = validate_many([_text(row.get("mobile")) for row in parsed],
+                                    [_text(row.get("email")) for row in parsed])
+    stored_mobiles, stored_emails = repository.existing(
+        [mobile for mobile in mobiles if mobile], [email for email in emails if email])
+
+    records, seen_mobiles, seen_emails = [], set(), set()
+    for row, mobile, email in zip(parsed, mobiles, emails):
+        name = _text(row.get("name"))
+        if not name:
+            error = "missing name"
+        elif mobile is None:
+            error = "invalid mobile"
+        elif email is None:
+            error = "invalid email"
+        elif mobile in stored_mobiles or email in stored_emails:
+            error = "already registered"
+        elif mobile in seen_mobiles or email in seen_emails:
+            error = "duplicate in file"
+        else:
+            seen_mobiles.add(mobile)
+            seen_emails.add(email)
+            record = {
+                "name": name,
+                "mobile": mobile,
+                "email": email,
+                "status": _text(row.get("status")),
+                "courses": _courses(row.get("courses")),
+                "timestamp": _text(row.get("timestamp")) or timestamp,
+            }
+            if _text(row.get("category")):
+                record["category"] = _text(row.get("category"))
+            records.append(record)
+            continue
+        rejects.write(row, error)
+        stats["rejected"][error] = stats["rejected"].get(error, 0) + 1
+
+    if records:
+        with STORAGE_WRITE_SECONDS.time("import"):
+            repository.save_many(records)
+        stats["imported"] += len(records)
+
+
+def import_leads(path: str, backend: Optional[str] = None, store_path: Optional[str] = None,
+                 rejects_path: Optional[str] = None, fmt: Optional[str] = None,
+                 chunk_size: int = CHUNK_SIZE) -> Dict:
+    """
+    Import leads from a CSV or JSON Lines file into a repository.
+
+    Returns {"rows", "imported", "rejected" (count per reason), "seconds",
+    "rows_per_second", "rejects_path"}; rejects_path is None when no row was
+    rejected.
+    """
+    fmt = fmt or file_format(path)
+    rejects_path = rejects_path or (f"{path}.rejects.{fmt}" if path != "-" else f"rejects.{fmt}")
+    repository = get_repository(backend, store_path)
+    rejects = RejectWriter(rejects_path, fmt)
+    stats = {"rows": 0, "imported": 0, "rejected": {}}
+    # Rows without a timestamp of their own are stamped with the import time
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    started = time.perf_counter()
+    handle = _open(path, "r")
+    try:
+        rows = read_rows(handle, fmt)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            stats["rows"] += len(chunk)
+            _import_chunk(repository, chunk, rejects, stats, timestamp)
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+        rejects.close()
+    if hasattr(repository, "flush"):
+        repository.flush()
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    stats["rows_per_second"] = round(stats["rows"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+    stats["rejects_path"] = rejects_path if stats["rejected"] else None
+    return stats
+
+
+def _export_row(record: Dict) -> Dict:
+    row = {field: record.get(field, "") for field in FIELDS}
+    row["courses"] = record.get("courses") or ([record["course"]] if record.get("course") else [])
+    return row
+
+
+def export_leads(path: str, backend: Optional[str] = None, store_path: Optional[str] = None,
+                 fmt: Optional[str] = None) -> Dict:
+    """Write every stored inquiry to a CSV or JSON Lines file; returns {"rows", "seconds", "rows_per_second"}."""
+    fmt = fmt or file_format(path)
+    repository = get_repository(backend, store_path)
+    count = 0
+    started = time.perf_counter()
+    handle = _open(path, "w")
+    try:
+        if fmt == "csv":
+            writer = csv.DictWriter(handle, fieldnames=FIELDS)
+            writer.writeheader()
+            for record in repository.iter_records():
+                row = _export_row(record)
+                writer.writerow(dict(row, courses=", ".join(row["courses"])))
+                count += 1
+        else:
+            for record in repository.iter_records():
+                handle.write(json.dumps(_export_row(record)) + "\n")
+                count += 1
+    finally:
+        if handle is not sys.stdout:
+            handle.close()
+    seconds = round(time.perf_counter() - started, 3)
+    return {"rows": count, "seconds": seconds, "rows_per_second": round(count / seconds, 1) if seconds else 0.0}
+
+
+def print_report(command: str, stats: Dict, out: TextIO = sys.stderr) -> None:
+    out.write(f"{command}: {stats['rows']} rows in {stats['seconds']} s ({stats['rows_per_second']:,.0f} rows/s)\n")
+    if command == "import":
+        out.write(f"  imported  {stats['imported']}\n")
+        for reason, count in sorted(stats["rejected"].items()):
+            out.write(f"  rejected  {count}  {reason}\n")
+        if stats["rejects_path"]:
+            out.write(f"  rejected rows written to {stats['rejects_path']}\n")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk lead import and export")
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("file", help="CSV or JSON Lines file, or - for stdin/stdout")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="inquiry backend (default: INQUIRY_BACKEND or json)")
+    parser.add_argument("--store", help="path of the inquiry store (default: the backend's usual file)")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="file format (default: from the extension, else csv)")
+    parser.add_argument("--rejects", help="where to write rejected rows (default: <file>.rejects.<format>)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        stats = import_leads(args.file, args.backend, args.store, args.rejects, args.format, args.chunk_size)
+    else:
+        stats = export_leads(args.file, args.backend, args.store, args.format)
+    print_report(args.command, stats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
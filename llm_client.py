@@ -0,0 +1,321 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextlib
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from metrics import REGISTRY, LLM_CIRCUIT_EVENTS, LLM_COALESCED
+
+# Process-wide pieces shared by every model call (the LangChain agent in
+# main.py and chat_server.py).
+#
+#   http_client()        keep-alive httpx clients for ChatOpenAI, one sync
+#   http_async_client()  and one async, reused across calls and sessions
+#                        instead of one connection per request
+#   SingleFlight         identical questions that are in flight at the same
+#                        time share one agent run
+#   CircuitBreaker       watches the latency and outcome of recent calls; when
+#                        p95 latency or the failure rate crosses its threshold
+#                        it opens, and calls fail fast with CircuitOpenError
+#                        (the callers answer with the rule-based replies)
+#                        until a probe call after the cooldown succeeds
+#
+# Every call has a deadline (TIMEOUT) and transient failures are retried
+# RETRIES times with jittered backoff by the OpenAI client ChatOpenAI wraps.
+#
+# Configuration: BAIRO_MODEL, BAIRO_LLM_TIMEOUT, BAIRO_LLM_RETRIES,
+# BAIRO_LLM_POOL_SIZE, BAIRO_LLM_P95_THRESHOLD, BAIRO_LLM_COOLDOWN.
+
+MODEL = os.getenv("BAIRO_MODEL", "gpt-3.5-turbo")
+TIMEOUT = float(os.getenv("BAIRO_LLM_TIMEOUT", "30"))
+RETRIES = int(os.getenv("BAIRO_LLM_RETRIES", "2"))
+POOL_SIZE = int(os.getenv("BAIRO_LLM_POOL_SIZE", "8"))
+P95_THRESHOLD = float(os.getenv("BAIRO_LLM_P95_THRESHOLD", "10"))
+COOLDOWN = float(os.getenv("BAIRO_LLM_COOLDOWN", "30"))
+
+logger = logging.getLogger(__name__)
+
+
+class LLMError(Exception):
+    """The model call failed."""
+
+
+class CircuitOpenError(LLMError):
+    """The circuit breaker is open; the call was not made."""
+
+
+def call_outcome(error: BaseException) -> str:
+    """Classify a failed model call for the bairo_llm_calls_total counter."""
+    if isinstance(error, CircuitOpenError):
+        return "short_circuit"
+    if isinstance(error, TimeoutError) or "Timeout" in type(error).__name__:
+        return "timeout"  # also openai.APITimeoutError and httpx timeouts
+    return "error"
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "wakers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.wakers = []  # callbacks for waiters on event loops, run once done
+
+
+class SingleFlight:
+    """
+    Runs one call per key at a time; callers that arrive meanwhile get its result.
+
+    do() wraps a plain function. A streamed call uses the parts: begin() makes
+    the first caller of a key its leader, which runs the call inside lead()
+    and sets call.result; the others wait() (or, on an event loop,
+    await wait_async()) for that result, for at most wait_timeout seconds. A
+    leader that is abandoned part way (a closed stream) leaves the result
+    None, and waiters then begin() again rather than fail.
+    """
+
+    def __init__(self, wait_timeout: Optional[float] = None):
+        self.wait_timeout = wait_timeout
+        self._calls: Dict[object, _Call] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def begin(self, key):
+        """Return (call, leader): whether this caller runs the call or waits for it."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                LLM_COALESCED.inc()
+                return call, False
+            call = self._calls[key] = _Call()
+            return call, True
+
+    @contextlib.contextmanager
+    def lead(self, key, call: _Call):
+        """Run the block as the key's call; waiters get call.result, or the block's exception."""
+        try:
+            yield call
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                call.done.set()
+                wakers, call.wakers = call.wakers, []
+            for wake in wakers:
+                wake()
+
+    @staticmethod
+    def _outcome(call: _Call):
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def wait(self, call: _Call):
+        if not call.done.wait(self.wait_timeout):
+            raise TimeoutError("the shared call did not finish in time")
+        return self._outcome(call)
+
+    async def wait_async(self, call: _Call):
+        """wait() for a caller on an event loop, without holding a thread."""
+        loop = asyncio.get_running_loop()
+        finished = loop.create_future()
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(lambda: finished.done() or finished.set_result(None))
+            except RuntimeError:
+                pass  # the waiter's loop is closed
+
+        with self._lock:
+            pending = not call.done.is_set()
+            if pending:
+                call.wakers.append(wake)
+        if pending:
+            try:
+                await asyncio.wait_for(finished, self.wait_timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError("the shared call did not finish in time") from None
+            finally:
+                with self._lock:
+                    if wake in call.wakers:
+                        call.wakers.remove(wake)
+        return self._outcome(call)
+
+    def do(self, key, fn: Callable):
+        call, leader = self.begin(key)
+        if not leader:
+            return self.wait(call)
+        with self.lead(key, call):
+            call.result = fn()
+        return call.result
+
+
+class _Upstream:
+    """How long a guarded call has spent on the upstream, leaving out paused() time."""
+    __slots__ = ("started", "paused_for")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.paused_for = 0.0
+
+    @contextlib.contextmanager
+    def paused(self):
+        """Leave the block out of the call's latency, e.g. a yield to the client consuming the stream."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.paused_for += time.perf_counter() - started
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started - self.paused_for
+
+
+class CircuitBreaker:
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, p95_threshold: float = P95_THRESHOLD, failure_rate: float = 0.5,
+                 window: int = 50, min_calls: int = 10, cooldown: float = COOLDOWN):
+        self.p95_threshold = p95_threshold
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._window = deque(maxlen=window)  # (seconds, ok)
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.trips = 0
+        self.rejected = 0
+
+    def _p95(self) -> float:
+        ordered = sorted(seconds for seconds, _ in self._window)
+        return ordered[max(0, -(-95 * len(ordered) // 100) - 1)] if ordered else 0.0
+
+    def _trip(self, reason: str) -> None:
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self.trips += 1
+        LLM_CIRCUIT_EVENTS.inc("trip")
+        logger.warning("Model circuit opened: %s", reason)
+
+    def allow(self) -> bool:
+        """True if a call may go upstream now; after the cooldown, lets one probe call through."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.CLOSED or (self.state == self.HALF_OPEN and not self._probing):
+                self._probing = self.state == self.HALF_OPEN
+                return True
+            self.rejected += 1
+            LLM_CIRCUIT_EVENTS.inc("reject")
+            return False
+
+    def record(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+                if ok and seconds <= self.p95_threshold:
+                    self.state = self.CLOSED
+                    self._window.clear()
+                    LLM_CIRCUIT_EVENTS.inc("close")
+                    logger.info("Model circuit closed")
+                else:
+                    self._trip("probe call failed" if not ok else f"probe call took {seconds:.1f}s")
+                return
+            self._window.append((seconds, ok))
+            if self.state != self.CLOSED or len(self._window) < self.min_calls:
+                return
+            failures = sum(1 for _, call_ok in self._window if not call_ok)
+            p95 = self._p95()
+            if failures >= self.failure_rate * len(self._window):
+                self._trip(f"{failures} of the last {len(self._window)} calls failed")
+            elif p95 > self.p95_threshold:
+                self._trip(f"p95 latency {p95:.1f}s is above {self.p95_threshold}s")
+
+    def cancel(self) -> None:
+        """Forget a call that the caller abandoned; it says nothing about the upstream."""
+        with self._lock:
+            self._probing = False
+
+    @contextlib.contextmanager
+    def guard(self):
+        """
+        Run the block as one upstream call: raise CircuitOpenError if it may
+        not, record its outcome and latency otherwise.
+
+        Streaming callers wrap each yield to their consumer in the guard's
+        paused(), so a slow reader does not count as upstream latency. A
+        call abandoned by the consumer (a closed generator, a cancelled task)
+        says nothing about the upstream and is not recorded.
+        """
+        if not self.allow():
+            raise CircuitOpenError("model circuit is open")
+        upstream = _Upstream()
+        try:
+            yield upstream
+        except (GeneratorExit, asyncio.CancelledError):
+            self.cancel()
+            raise
+        except BaseException:
+            self.record(upstream.elapsed(), False)
+            raise
+        self.record(upstream.elapsed(), True)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            failures = sum(1 for _, ok in self._window if not ok)
+            return {
+                "state": self.state,
+                "p95_seconds": round(self._p95(), 3),
+                "failure_rate": round(failures / len(self._window), 3) if self._window else 0.0,
+                "trips": self.trips,
+                "rejected": self.rejected,
+            }
+
+
+# Shared by every model caller in the process
+BREAKER = CircuitBreaker()
+
+
+_http_client = None
+_http_async_client = None
+_lock = threading.Lock()
+
+
+def http_client():
+    """Process-wide keep-alive httpx client for LangChain's ChatOpenAI (imported on first use)."""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            import httpx
+            _http_client = httpx.Client(
+                timeout=TIMEOUT, limits=httpx.Limits(max_keepalive_connections=POOL_SIZE))
+        return _http_client
+
+
+def http_async_client():
+    """The same for ChatOpenAI's async calls; bound to the event loop that first uses it (chat_server.py has one)."""
+    global _http_async_client
+    with _lock:
+        if _http_async_client is None:
+            import httpx
+            _http_async_client = httpx.AsyncClient(
+                timeout=TIMEOUT, limits=httpx.Limits(max_keepalive_connections=POOL_SIZE))
+        return _http_async_client
+
+
+REGISTRY.gauge("bairo_llm_circuit_open", "1 while the model circuit breaker is open or probing, 0 when closed",
+               lambda: 0 if BREAKER.state == CircuitBreaker.CLOSED else 1)
+REGISTRY.gauge("bairo_llm_p95_seconds", "p95 latency of the recent model calls the circuit breaker watches",
+               lambda: BREAKER.stats()["p95_seconds"])
+REGISTRY.gauge("bairo_llm_failure_rate", "Share of the recent model calls the circuit breaker watches that failed",
+               lambda: BREAKER.stats()["failure_rate"])
@@ -1,50 +1,56 @@
 import os
-import time
+import re
 import json
+import sys
+import logging
+import time
+import argparse
+import threading
+import subprocess
+from collections import defaultdict
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
-# LangChain and LangGraph imports
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_openai import ChatOpenAI
-from langchain.tools import tool
-from langgraph.prebuilt import create_react_agent
+# LangChain, LangGraph and OpenAI are imported on first use of the agent (see
+# agent_stack below), so the rule-based intake path never loads them
 from dotenv import load_dotenv
 
-# Load environment variables
+# Load environment variables before the local modules read their settings
 load_dotenv()
 
+from storage import get_repository, get_writer
+from renderer import Renderer
+from intents import IntentRouter
+from courses import course_info, course_list, find_category, find_courses
+from response_cache import ResponseCache
+from history import ConversationHistory
+from flow import advance
+from llm_client import (BREAKER, MODEL, RETRIES, TIMEOUT, SingleFlight, call_outcome, http_async_client,
+                        http_client)
+from metrics import (REGISTRY, CONVERSIONS, DUPLICATES, LLM_CALLS, MODEL_SECONDS, STORAGE_WRITE_SECONDS,
+                     TOOL_SECONDS, MetricsDumper)
+
+logger = logging.getLogger(__name__)
+
 # Database functions
 INQUIRY_DB_FILE = "inquiry_database.json"
 
+inquiry_store = get_repository("json", INQUIRY_DB_FILE)
+
 def load_inquiry_database() -> Dict:
-    """Load the inquiry database from file."""
-    if os.path.exists(INQUIRY_DB_FILE):
-        try:
-            with open(INQUIRY_DB_FILE, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {"inquiries": []}
-    return {"inquiries": []}
+    """Load the inquiry database (snapshot plus journal)."""
+    return inquiry_store.load()
 
 def save_inquiry_database(db: Dict) -> None:
-    """Save the inquiry database to file."""
-    with open(INQUIRY_DB_FILE, 'w') as f:
-        json.dump(db, f, indent=2)
+    """Replace the whole inquiry database."""
+    inquiry_store.replace(db)
 
 def check_existing_inquiry(mobile: str, email: str) -> bool:
     """Check if user has already made an inquiry with the same mobile or email."""
-    db = load_inquiry_database()
-    
-    for inquiry in db["inquiries"]:
-        if inquiry["mobile"] == mobile or inquiry["email"] == email:
-            return True
-    return False
+    return get_repository().exists(mobile, email)
 
 def save_inquiry(name: str, mobile: str, email: str, status: str, courses: List[str]) -> None:
-    """Save user inquiry to database."""
-    db = load_inquiry_database()
-    
+    """Save user inquiry to the configured inquiry backend (write-behind)."""
     new_inquiry = {
         "name": name,
         "mobile": mobile,
@@ -54,18 +60,22 @@ def save_inquiry(name: str, mobile: str, email: str, status: str, courses: List[
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     }
     
-    db["inquiries"].append(new_inquiry)
-    save_inquiry_database(db)
+    # Queued for the background writer; the reply does not wait for the disk
+    with STORAGE_WRITE_SECONDS.time("save_inquiry"):
+        get_writer().save(new_inquiry)
 
-def simulate_typing(text: str) -> None:
+def simulate_typing(text: str, renderer: Optional[Renderer] = None) -> None:
     """Simulate typing effect for bot responses."""
-    print("Bairo is typing...", end="\r")
-    time.sleep(1)  # Simulate typing delay
-    print(" " * 20, end="\r")  # Clear the typing indicator
-    print(f"Bairo: {text}")
+    if renderer is not None:
+        renderer.say(text)
+        return
+    renderer = Renderer()
+    renderer.say(text)
+    renderer.close()
 
 # ----- Tools for CADD Center Bot ----- 
-@tool
+# Plain functions; build_agent() wraps them as LangChain tools
+@TOOL_SECONDS.timed("collect_user_info")
 def collect_user_info(name: str = "", mobile: str = "", email: str = "", status: str = "") -> str:
     """
     Collects and validates user information.
@@ -88,7 +98,9 @@ def collect_user_info(name: str = "", mobile: str = "", email: str = "", status:
     
     return f"Information collected - Name: {name}, Mobile: {mobile}, Email: {email}, Status: {status}"
 
-@tool
+CONTACT_DETAILS = "For more details, please contact us at 7845821665 or visit our center in person."
+
+@TOOL_SECONDS.timed("get_course_info")
 def get_course_info(course_category: str) -> str:
     """
     Provides information about courses in the specified category.
@@ -99,18 +111,9 @@ def get_course_info(course_category: str) -> str:
     Returns:
         str: List of courses in the category
     """
-    courses = {
-        "mechanical": ["AutoCAD", "CATIA", "SolidWorks", "NX CAD", "Creo", "CAM"],
-        "civil": ["Revit", "BIM (Building Information Modeling)"],
-        "it": ["Python", "Java", "C", "C++", "Web Design"]
-    }
-    
-    if course_category.lower() in courses:
-        return f"Courses in {course_category}: {', '.join(courses[course_category.lower()])}"
-    else:
-        return "Category not found. Available categories: mechanical, civil, it"
+    return course_info(course_category)
 
-@tool
+@TOOL_SECONDS.timed("save_inquiry_info")
 def save_inquiry_info(name: str, mobile: str, email: str, status: str, courses: str) -> str:
     """
     Saves the user inquiry to the database.
@@ -129,48 +132,255 @@ def save_inquiry_info(name: str, mobile: str, email: str, status: str, courses:
     save_inquiry(name, mobile, email, status, course_list)
     return "Your inquiry has been saved. Our team will contact you soon."
 
-@tool
+@TOOL_SECONDS.timed("get_contact_details")
 def get_contact_details() -> str:
     """Returns contact details for the CADD center."""
-    return "For more details, please contact us at 7845821665 or visit our center in person."
+    return CONTACT_DETAILS
 
-@tool
+@TOOL_SECONDS.timed("say_hello")
 def say_hello(name: str = "there") -> str:
     """Greets the user by name."""
     return f"Hello {name}, welcome to CADD Center Assistance! How can I help you today?"
 
-def main():
-    # Setup LangChain components
+# ----- Rule-based answers that skip the agent -----
+def all_courses_answer(text: str) -> str:
+    category = find_category(text)
+    if category:
+        return course_info(category)
+    return "We offer:\n" + course_list()
+
+intent_router = IntentRouter({
+    "course_list": all_courses_answer,
+    "contact": lambda text: CONTACT_DETAILS,
+    "fees": lambda text: "For detailed information about fees structure, we recommend visiting our center in person.",
+    "syllabus": lambda text: "For detailed course syllabus and curriculum, we recommend visiting our center.",
+    "duration": lambda text: "The duration varies based on the course and your learning pace. For specific duration details, please visit our center.",
+    "greeting": lambda text: "Hello, welcome to CADD Center Assistance! How can I help you today?",
+})
+
+# ----- Agent invocation -----
+AGENT_TOOLS = [
+    collect_user_info,
+    get_course_info,
+    save_inquiry_info,
+    get_contact_details,
+    say_hello
+]
+
+def agent_stack():
+    """Import the LangChain and LangGraph pieces the agent needs (slow; done on first use)."""
+    from langchain_openai import ChatOpenAI
+    from langchain.tools import tool
+    from langgraph.prebuilt import create_react_agent
+    return ChatOpenAI, tool, create_react_agent
+
+def build_agent():
+    """Create the ReAct agent with the CADD Center tools."""
+    ChatOpenAI, tool, create_react_agent = agent_stack()
+    
+    # Setup LangChain components; one keep-alive connection pool per process
     model = ChatOpenAI(
+        model=MODEL,
         temperature=0,
         openai_api_key=os.getenv("OPENAI_API_KEY"),
         openai_api_base=os.getenv("OPENAI_API_BASE"),
+        timeout=TIMEOUT,
+        max_retries=RETRIES,
+        http_client=http_client(),
+        http_async_client=http_async_client(),
     )
     
-    # Set up tools for the agent
-    tools = [
-        collect_user_info,
-        get_course_info,
-        save_inquiry_info,
-        get_contact_details,
-        say_hello
-    ]
-    
     # Create the agent with the React framework
-    agent_executor = create_react_agent(model, tools)
+    return create_react_agent(model, [tool(function) for function in AGENT_TOOLS])
+
+class LazyAgent:
+    """Builds the agent on first get(), or ahead of time in a background thread with warm_up()."""
+    
+    def __init__(self, factory=build_agent):
+        self.factory = factory
+        self._agent = None
+        self._lock = threading.Lock()
+    
+    @property
+    def loaded(self) -> bool:
+        return self._agent is not None
+    
+    def get(self):
+        if self._agent is None:
+            with self._lock:
+                if self._agent is None:
+                    self._agent = self.factory()
+        return self._agent
+    
+    def warm_up(self) -> threading.Thread:
+        def build():
+            try:
+                self.get()
+            except Exception:
+                pass  # get() raises again when the agent is actually needed
+        thread = threading.Thread(target=build, name="agent-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+
+RESPONSE_CACHE_FILE = "response_cache.json"
+
+AGENT_FALLBACK = "I'm Bairo, the CADD Center assistant. I can help you with course inquiries. Are you interested in learning about our courses?"
+
+response_cache = ResponseCache(
+    RESPONSE_CACHE_FILE,
+    max_entries=int(os.getenv("BAIRO_CACHE_SIZE", "1000")),
+    ttl=float(os.getenv("BAIRO_CACHE_TTL", str(24 * 3600))),
+    similarity=float(os.getenv("BAIRO_CACHE_SIMILARITY", "0.9")),
+)
+
+def rule_answer(text: str) -> str:
+    """Reply without the model, for when the agent call failed or the model circuit is open."""
+    if find_category(text):
+        return all_courses_answer(text)
+    return AGENT_FALLBACK
+
+def agent_failed(error: Exception) -> None:
+    # Count why, so a slow upstream can be told apart from a broken one
+    LLM_CALLS.inc(call_outcome(error))
+    logger.info("Agent call failed: %r", error)
+
+# Identical questions asked at the same time share one agent run: the first
+# streams it, the others wait and get the whole reply at once. A run may make
+# several model calls (tool use), so waiters give up after two call timeouts
+# and get the rule-based reply.
+agent_flight = SingleFlight(wait_timeout=2 * TIMEOUT)
+
+def cache_context(history: ConversationHistory, context: Optional[Dict]) -> Dict:
+    # A reply may depend on the user's details and the conversation so far, so
+    # only the same question in the same conversation state may share it
+    return dict(context or {}, conversation=history.fingerprint())
+
+def flight_key(question: str, context: Dict) -> Tuple[str, str]:
+    return question, json.dumps(context, sort_keys=True, default=str)
+
+async def astream_agent(agent_executor, history: ConversationHistory, context: Optional[Dict] = None) -> AsyncIterator[str]:
+    """Async version of stream_agent that yields only the reply's tokens."""
+    question = history.last_user_message
+    context = cache_context(history, context)
+    response = response_cache.get(question, context)
+    if response is None:
+        from langchain_core.messages import AIMessageChunk
+        key = flight_key(question, context)
+        call, leader = agent_flight.begin(key)
+        while not leader:
+            response = await agent_flight.wait_async(call)
+            if response is not None:
+                break
+            call, leader = agent_flight.begin(key)
+    if response is None:
+        started = time.perf_counter()
+        parts = []
+        with agent_flight.lead(key, call), BREAKER.guard() as upstream:
+            async for chunk, metadata in agent_executor.astream({"messages": history.window()}, stream_mode="messages"):
+                if metadata.get("langgraph_node") == "agent" and isinstance(chunk, AIMessageChunk) and chunk.content:
+                    parts.append(chunk.content)
+                    with upstream.paused():
+                        yield chunk.content
+            if not parts:
+                raise RuntimeError("Agent returned no reply")
+            call.result = response = "".join(parts)
+        MODEL_SECONDS.observe(time.perf_counter() - started, "stream")
+        LLM_CALLS.inc("ok")
+        response_cache.put(question, context, response, time.perf_counter() - started)
+    else:
+        yield response
+    history.add("assistant", response)
+
+def stream_agent(agent_executor, history: ConversationHistory, context: Optional[Dict] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Yield the agent's reply as events while it is produced: ("token", text)
+    for each chunk of the answer, ("tool", name) when the model calls a tool
+    and ("tool_done", name) when the tool returns.
+
+    Closing the generator early (a cancelled stream) stops the agent run and
+    its model call; the partial reply is neither cached nor added to history.
+    """
+    question = history.last_user_message
+    context = cache_context(history, context)
+    response = response_cache.get(question, context)
+    if response is None:
+        from langchain_core.messages import AIMessageChunk, ToolMessage
+        key = flight_key(question, context)
+        call, leader = agent_flight.begin(key)
+        while not leader:
+            response = agent_flight.wait(call)
+            if response is not None:
+                break
+            call, leader = agent_flight.begin(key)
+    if response is not None:
+        history.add("assistant", response)
+        yield "token", response
+        return
+    started = time.perf_counter()
+    parts = []
+    with agent_flight.lead(key, call), BREAKER.guard() as upstream:
+        stream = agent_executor.stream({"messages": history.window()}, stream_mode="messages")
+        try:
+            for chunk, metadata in stream:
+                node = metadata.get("langgraph_node")
+                # Time spent by the consumer between tokens is not upstream latency
+                with upstream.paused():
+                    if node == "agent" and isinstance(chunk, AIMessageChunk):
+                        for tool_call in chunk.tool_call_chunks:
+                            if tool_call.get("name"):
+                                yield "tool", tool_call["name"]
+                        if chunk.content:
+                            parts.append(chunk.content)
+                            yield "token", chunk.content
+                    elif node == "tools" and isinstance(chunk, ToolMessage):
+                        yield "tool_done", chunk.name
+        finally:
+            stream.close()
+        if not parts:
+            raise RuntimeError("Agent returned no reply")
+        call.result = response = "".join(parts)
+    MODEL_SECONDS.observe(time.perf_counter() - started, "stream")
+    LLM_CALLS.inc("ok")
+    response_cache.put(question, context, response, time.perf_counter() - started)
+    history.add("assistant", response)
+
+REGISTRY.gauge("bairo_response_cache_hit_rate", "Share of agent questions answered from the response cache",
+               lambda: response_cache.stats()["hit_rate"])
+REGISTRY.gauge("bairo_intent_hit_rate", "Share of free-form questions answered by the intent router",
+               lambda: intent_router.stats()["hit_rate"])
+
+# The agent is built in the background right after the greeting; set
+# BAIRO_WARMUP=0 to build it only when a question first needs it
+WARMUP = os.getenv("BAIRO_WARMUP", "1") != "0"
+
+# Set BAIRO_METRICS_FILE to have the CLI write its metrics there every
+# BAIRO_METRICS_INTERVAL seconds and on exit
+METRICS_FILE = os.getenv("BAIRO_METRICS_FILE")
+METRICS_INTERVAL = float(os.getenv("BAIRO_METRICS_INTERVAL", "60"))
+
+FIXED_ANSWER_QUESTION = re.compile(r"\b(fees?|costs?|prices?|syllabus|curriculum|duration|time)\b", re.IGNORECASE)
+
+def main(renderer: Optional[Renderer] = None, input_fn=input, warm_up: bool = WARMUP):
+    # Output goes through the renderer; pass Renderer(typing=False) and a
+    # scripted input_fn to drive conversations without any delays
+    renderer = renderer or Renderer()
+    metrics_dumper = MetricsDumper(METRICS_FILE, METRICS_INTERVAL) if METRICS_FILE else None
+    
+    # Load the duplicate-check indexes once, before the first lookup
+    if get_repository() is inquiry_store:
+        inquiry_store.build_index()
+    
+    agent = LazyAgent()
     
     print("\n" + "="*50)
     print("🤖 CADD Center Assistant Bot - Bairo")
     print("="*50)
     
     # Initial greeting
-    print("Bairo is typing...", end="\r")
-    time.sleep(1)
-    print(" " * 20, end="\r")
-    print("Bairo: Welcome to the CADD Center Assistance! How can I help you today?")
-    
-    # Message history to maintain context
-    messages = [AIMessage(content="Welcome to the CADD Center Assistance! How can I help you today?")]
+    renderer.say("Welcome to the CADD Center Assistance! How can I help you today?")
+    if warm_up:
+        agent.warm_up()
     
     # User information storage
     user_info = {
@@ -181,213 +391,159 @@ def main():
         "courses": []
     }
     
+    # Message history to maintain context; user_info is pinned into the
+    # prompt as a system message and older turns are summarised
+    history = ConversationHistory(
+        max_tokens=int(os.getenv("BAIRO_HISTORY_TOKENS", "1500")),
+        user_info=user_info,
+    )
+    history.add("assistant", "Welcome to the CADD Center Assistance! How can I help you today?")
+    
     # Conversation state
     state = "greeting"
     
-    while True:
-        user_input = input("\nYou: ").strip()
-        messages.append(HumanMessage(content=user_input))
-        
-        # Handle exit commands
-        if user_input.lower() in ["bye", "exit", "quit", "thank you"]:
-            print("Bairo is typing...", end="\r")
-            time.sleep(1)
-            print(" " * 20, end="\r")
-            print("Bairo: Thank you for your inquiry! Have a great day!")
-            break
-        
-        # Simple state machine for guided conversation
-        if state == "greeting" and any(word in user_input.lower() for word in ["enquire", "course", "information", "hi", "hello"]):
-            state = "collect_name"
-            print("Bairo is typing...", end="\r")
-            time.sleep(1)
-            print(" " * 20, end="\r")
-            print("Bairo: I'd be happy to help you with course information! Please provide the following details:")
-            
-            print("Bairo is typing...", end="\r")
-            time.sleep(1)
-            print(" " * 20, end="\r")
-            print("Bairo: 1. Your Name:")
-            continue
-            
-        elif state == "collect_name":
-            user_info["name"] = user_input
-            state = "collect_mobile"
-            
-            print("Bairo is typing...", end="\r")
-            time.sleep(1)
-            print(" " * 20, end="\r")
-            print("Bairo: 2. Your Mobile Number:")
-            continue
-            
-        elif state == "collect_mobile":
-            user_info["mobile"] = user_input
-            state = "collect_email"
-            
-            print("Bairo is typing...", end="\r")
-            time.sleep(1)
-            print(" " * 20, end="\r")
-            print("Bairo: 3. Your Email ID:")
-            continue
-            
-        elif state == "collect_email":
-            user_info["email"] = user_input
-            
-            # Check if user has already made an inquiry
-            if check_existing_inquiry(user_info["mobile"], user_info["email"]):
-                print("Bairo is typing...", end="\r")
-                time.sleep(1)
-                print(" " * 20, end="\r")
-                print("Bairo: I notice you've inquired with us before using this mobile number or email.")
-                print("Bairo is typing...", end="\r")
-                time.sleep(1)
-                print(" " * 20, end="\r")
-                print("Bairo: Our team will contact you soon with more information.")
-                print("Bairo is typing...", end="\r")
-                time.sleep(1)
-                print(" " * 20, end="\r")
-                print("Bairo: Thank you for your interest! Have a great day!")
+    try:
+        while True:
+            renderer.wait()
+            try:
+                user_input = input_fn("\nYou: ").strip()
+            except EOFError:
                 break
-                
-            state = "collect_status"
-            
-            print("Bairo is typing...", end="\r")
-            time.sleep(1)
-            print(" " * 20, end="\r")
-            print("Bairo: 4. What's your current status? (Student/Working Professional/Job Seeker/Other)")
-            continue
-            
-        elif state == "collect_status":
-            user_info["status"] = user_input
-            state = "collect_courses"
-            
-            print("Bairo is typing...", end="\r")
-            time.sleep(1)
-            print(" " * 20, end="\r")
-            print("Bairo: Which courses are you interested in? We offer:")
+            history.add("user", user_input)
             
-            print("Bairo is typing...", end="\r")
-            time.sleep(1)
-            print(" " * 20, end="\r")
-            print("Bairo: - Mechanical: AutoCAD, CATIA, SolidWorks, NX CAD, Creo, CAM")
-            
-            print("Bairo is typing...", end="\r")
-            time.sleep(1)
-            print(" " * 20, end="\r")
-            print("Bairo: - Civil: Revit, BIM (Building Information Modeling)")
-            
-            print("Bairo is typing...", end="\r")
-            time.sleep(1)
-            print(" " * 20, end="\r")
-            print("Bairo: - IT: Python, Java, C, C++, Web Design")
-            continue
-            
-        elif state == "collect_courses":
-            course_interest = user_input.lower()
+            # Handle exit commands
+            if user_input.lower() in ["bye", "exit", "quit", "thank you"]:
+                renderer.say("Thank you for your inquiry! Have a great day!")
+                break
             
-            # Process the input through the LangChain agent for fee/syllabus questions
-            if any(word in course_interest for word in ["fee", "cost", "price", "syllabus", "curriculum", "duration", "time"]):
-                print("Bairo is typing...", end="\r")
-                time.sleep(1)
-                print(" " * 20, end="\r")
-                
-                if any(word in course_interest for word in ["fee", "cost", "price"]):
-                    print("Bairo: For detailed information about fees structure, we recommend visiting our center in person.")
-                elif any(word in course_interest for word in ["syllabus", "curriculum"]):
-                    print("Bairo: For detailed course syllabus and curriculum, we recommend visiting our center.")
-                elif any(word in course_interest for word in ["duration", "time", "long"]):
-                    print("Bairo: The duration varies based on the course and your learning pace. For specific duration details, please visit our center.")
-                
-                # Use the agent for the next response
-                print("Bairo is typing...", end="\r")
-                try:
-                    for chunk in agent_executor.stream({"messages": messages}):
-                        if "agent" in chunk and "messages" in chunk["agent"]:
-                            for message in chunk["agent"]["messages"]:
-                                if isinstance(message, AIMessage):
-                                    messages.append(message)
-                    print(" " * 20, end="\r")
-                    print(f"Bairo: Please contact us at 7845821665 for more details.")
-                except Exception as e:
-                    print(" " * 20, end="\r")
-                    print(f"Bairo: Please contact us at 7845821665 for more details.")
+            # Fee, syllabus and duration questions at the course step get a
+            # fixed answer and finish the inquiry
+            if state == "course" and FIXED_ANSWER_QUESTION.search(user_input):
+                renderer.say(
+                    intent_router.answer(user_input) or intent_router.handlers["duration"](user_input),
+                    "Please contact us at 7845821665 for more details.",
+                )
                 
                 # Save the inquiry
-                courses = []
-                for category in ["mechanical", "civil", "it"]:
-                    if category in course_interest:
-                        courses.append(f"{category.capitalize()} Courses")
-                
-                if not courses:
-                    courses = ["General Course Inquiry"]
+                courses = find_courses(user_input) or ["General Course Inquiry"]
                 
                 save_inquiry(user_info["name"], user_info["mobile"], user_info["email"], user_info["status"], courses)
+                CONVERSIONS.inc("cli")
                 
-                print("Bairo is typing...", end="\r")
-                time.sleep(1)
-                print(" " * 20, end="\r")
-                print("Bairo: Thank you for providing your details! Our team will contact you soon with more information.")
+                renderer.say(
+                    "Thank you for providing your details! Our team will contact you soon with more information.",
+                    "Thank you for your inquiry! Have a great day!",
+                )
+                break
+            
+            # Guided intake: steps, prompts and validation are defined in flow.py
+            turn = advance(state, user_input, user_info)
+            
+            if not turn.handled:
+                # Answer known intents directly; only open-ended input goes to the agent
+                reply = intent_router.answer(user_input)
+                if reply is not None:
+                    history.add("assistant", reply)
+                    renderer.say(reply)
+                    continue
                 
-                print("Bairo is typing...", end="\r")
-                time.sleep(1)
-                print(" " * 20, end="\r")
-                print("Bairo: Thank you for your inquiry! Have a great day!")
+                # Use the LangChain agent for general responses, printing
+                # the reply as the model produces it
+                try:
+                    events = stream_agent(agent.get(), history, {"state": state})
+                    renderer.stream(text for kind, text in events if kind == "token")
+                except Exception as e:
+                    agent_failed(e)
+                    renderer.say(rule_answer(user_input))
+                continue
+            
+            # Check if user has already made an inquiry
+            if turn.next_step == "status" and check_existing_inquiry(user_info["mobile"], user_info["email"]):
+                DUPLICATES.inc()
+                renderer.say(
+                    "I notice you've inquired with us before using this mobile number or email.",
+                    "Our team will contact you soon with more information.",
+                    "Thank you for your interest! Have a great day!",
+                )
                 break
-            else:
+            
+            state = turn.next_step
+            lines = [line for paragraph in turn.lines for line in paragraph.split("\n")]
+            
+            if state == "complete":
                 # Identify courses mentioned
-                courses = []
-                all_courses = {
-                    "mechanical": ["AutoCAD", "CATIA", "SolidWorks", "NX CAD", "Creo", "CAM"],
-                    "civil": ["Revit", "BIM"],
-                    "it": ["Python", "Java", "C", "C++", "Web Design"]
-                }
+                courses = find_courses(user_info.pop("course")) or ["General Course Inquiry"]
+                user_info["courses"] = courses
                 
-                for category, course_list in all_courses.items():
-                    if category in course_interest:
-                        courses.append(f"{category.capitalize()} Courses")
-                    else:
-                        for course in course_list:
-                            if course.lower() in course_interest.lower():
-                                courses.append(course)
-                
-                if not courses:
-                    courses = ["General Course Inquiry"]
-                
-                # Save the inquiry
+                # Show the closing message while the inquiry is being saved
+                renderer.say(*lines)
                 save_inquiry(user_info["name"], user_info["mobile"], user_info["email"], user_info["status"], courses)
-                
-                # Use the agent for the final response
-                print("Bairo is typing...", end="\r")
-                time.sleep(1)
-                print(" " * 20, end="\r")
-                print("Bairo: Thank you for providing your details! Our team will contact you soon with more information about the courses you're interested in.")
-                
-                print("Bairo is typing...", end="\r")
-                time.sleep(1)
-                print(" " * 20, end="\r")
-                print("Bairo: For immediate assistance or more details, you can visit our center or call us at 7845821665.")
-                
-                print("Bairo is typing...", end="\r")
-                time.sleep(1)
-                print(" " * 20, end="\r")
-                print("Bairo: Thank you for your inquiry! Have a great day!")
+                CONVERSIONS.inc("cli")
                 break
-        else:
-            # Use the LangChain agent for general responses
-            print("Bairo is typing...", end="\r")
             
-            try:
-                for chunk in agent_executor.stream({"messages": messages}):
-                    if "agent" in chunk and "messages" in chunk["agent"]:
-                        for message in chunk["agent"]["messages"]:
-                            if isinstance(message, AIMessage):
-                                messages.append(message)
-                                response = message.content
-                print(" " * 20, end="\r")
-                print(f"Bairo: {response}")
-            except Exception as e:
-                print(" " * 20, end="\r")
-                print(f"Bairo: I'm Bairo, the CADD Center assistant. I can help you with course inquiries. Are you interested in learning about our courses?")
+            renderer.say(*lines)
+    finally:
+        renderer.close()
+        if metrics_dumper is not None:
+            metrics_dumper.close()
+
+# ----- Start-up profiling -----
+STARTUP_PROBE = """
+import sys, time
+print("@start", file=sys.stderr)
+started = time.perf_counter()
+import main
+print("@phase rule-based path (import main)", time.perf_counter() - started, file=sys.stderr)
+try:
+    started = time.perf_counter()
+    main.agent_stack()
+    print("@phase agent stack (first agent use)", time.perf_counter() - started, file=sys.stderr)
+    started = time.perf_counter()
+    main.build_agent()
+    print("@phase build_agent()", time.perf_counter() - started, file=sys.stderr)
+except Exception as e:
+    print("@error", e, file=sys.stderr)
+"""
+
+def profile_startup(top: int = 8) -> None:
+    """Print how long each start-up phase takes and which imports dominate it."""
+    env = dict(os.environ, OPENAI_API_KEY=os.getenv("OPENAI_API_KEY") or "profile")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_PROBE],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        capture_output=True, text=True,
+    )
+    # -X importtime writes "import time: self | cumulative | name" per module,
+    # the name indented two spaces per nesting level. Imports made by main.py
+    # itself sit one level down; later phases import from the top level.
+    print("Start-up profile")
+    imports, depth = defaultdict(int), 1
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:"):
+            fields = line.split("|")
+            if len(fields) == 3 and fields[1].strip().isdigit():
+                name = fields[2].rstrip()
+                if (len(name) - len(name.lstrip()) - 1) // 2 == depth:
+                    imports[name.strip()] += int(fields[1])
+        elif line.startswith("@start"):
+            imports.clear()
+        elif line.startswith("@phase"):
+            phase, seconds = line[len("@phase "):].rsplit(" ", 1)
+            print(f"  {phase:<40}{float(seconds) * 1000:>10.1f} ms")
+            for module, micros in sorted(imports.items(), key=lambda item: -item[1])[:top]:
+                print(f"      {module:<36}{micros / 1000:>10.1f} ms")
+            imports, depth = defaultdict(int), 0
+        elif line.startswith("@error"):
+            print(f"  stopped: {line[len('@error '):]}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="CADD Center Assistant Bot - Bairo")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="report import and agent start-up times, then exit")
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="build the agent only when a question first needs it")
+    args = parser.parse_args()
+    if args.profile_startup:
+        profile_startup()
+    else:
+        main(warm_up=WARMUP and not args.no_warmup)
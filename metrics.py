@@ -0,0 +1,235 @@
+import os
+import time
+import bisect
+import functools
+import threading
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+# In-process request-path metrics in the Prometheus text format.
+#
+# Counters and histograms keep one series per tuple of label values, updated
+# under a per-metric lock. An observation is a bisect into fixed buckets and
+# two additions, so timing a call costs a couple of microseconds. Gauges are read
+# from a callback when the metrics are rendered. app.py serves render() at
+# /metrics; the CLI can dump it to a file periodically with MetricsDumper.
+
+# Seconds, from sub-millisecond validation up to slow model calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _label_text(self, values: Tuple, extra: str = "") -> str:
+        pairs = [f'{label}="{_escape(value)}"' for label, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Iterator[str]:
+        return iter(())
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values = {}
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, count in items:
+            yield f"{self.name}{self._label_text(values)} {_number(count)}"
+
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "started")
+
+    def __init__(self, histogram: "Histogram", label_values: Tuple):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+        return False
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket..., count above the last bucket, sum]
+        self._series = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *label_values) -> _Timer:
+        """Context manager that observes the duration of its block."""
+        return _Timer(self, label_values)
+
+    def timed(self, *label_values) -> Callable:
+        """Decorator that observes the duration of every call."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Timer(self, label_values):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, *label_values) -> int:
+        series = self._series.get(label_values)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted((values, list(series)) for values, series in self._series.items())
+        for values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                yield f"{self.name}_bucket{self._label_text(values, le)} {cumulative}"
+            yield f"{self.name}_sum{self._label_text(values)} {_number(series[-1])}"
+            yield f"{self.name}_count{self._label_text(values)} {cumulative}"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        super().__init__(name, help)
+        self.read = read
+
+    def samples(self) -> Iterator[str]:
+        yield f"{self.name} {_number(self.read())}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]) -> Gauge:
+        return self.register(Gauge(name, help, read))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+# Shared by app.py, main.py and flow.py
+STEP_SECONDS = REGISTRY.histogram(
+    "bairo_step_seconds", "Time to process one intake step, including validation", ("step",))
+VALIDATION_FAILURES = REGISTRY.counter(
+    "bairo_validation_failures_total", "Answers rejected by a step validator", ("field",))
+TOOL_SECONDS = REGISTRY.histogram(
+    "bairo_tool_seconds", "Agent tool call duration", ("tool",))
+MODEL_SECONDS = REGISTRY.histogram(
+    "bairo_model_seconds", "Agent call duration for replies not served from the cache", ("mode",))
+STORAGE_WRITE_SECONDS = REGISTRY.histogram(
+    "bairo_storage_write_seconds", "Inquiry write duration", ("operation",))
+CONVERSIONS = REGISTRY.counter(
+    "bairo_conversions_total", "Completed and saved inquiries", ("frontend",))
+WRITE_BATCH_SECONDS = REGISTRY.histogram(
+    "bairo_write_batch_seconds", "Duration of one write-behind batch write", ("store",))
+WRITE_BACKPRESSURE = REGISTRY.counter(
+    "bairo_write_backpressure_total", "Saves that waited for room in a full write-behind queue", ("store",))
+LLM_CALLS = REGISTRY.counter(
+    "bairo_llm_calls_total", "Agent model calls by outcome: ok, error, timeout or short_circuit", ("outcome",))
+LLM_COALESCED = REGISTRY.counter(
+    "bairo_llm_coalesced_total", "Agent replies taken from an identical question's run already in flight")
+LLM_CIRCUIT_EVENTS = REGISTRY.counter(
+    "bairo_llm_circuit_events_total",
+    "Model circuit breaker events: trip (opened), close (probe succeeded) or reject (call not made)", ("event",))
+PROMPT_TOKENS = REGISTRY.histogram(
+    "bairo_prompt_tokens", "Tokens in the prompt sent for one agent call",
+    buckets=(100, 250, 500, 750, 1000, 1250, 1500, 2000, 3000, 4000))
+DUPLICATES = REGISTRY.counter(
+    "bairo_duplicates_total", "Intakes stopped because the mobile number or email was already registered")
+
+
+class MetricsDumper:
+    """Writes the registry to path every interval seconds, and once more on close()."""
+
+    def __init__(self, path: str, interval: float = 60.0, registry: Registry = REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-dumper", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.dump()
+
+    def dump(self) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.registry.render())
+        os.replace(tmp_path, self.path)
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.dump()
@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+import queue
+import threading
+from typing import Iterable, Optional, TextIO
+
+# Presentation layer for the command-line bot.
+#
+# The conversation logic hands finished lines to Renderer.say() and carries
+# on; a background thread plays the "Bairo is typing..." effect and prints
+# them. The typing pause is scaled to the length of the message (capped), and
+# is skipped entirely when typing is off: BAIRO_TYPING=0, or whenever stdin or
+# stdout is not a terminal (piped input, automation, load tests).
+#
+# Model replies go through Renderer.stream() instead, which prints tokens as
+# they arrive; the typing indicator is shown only until the first one.
+
+TYPING_INDICATOR = "Bairo is typing..."
+
+
+def typing_enabled() -> bool:
+    setting = os.getenv("BAIRO_TYPING")
+    if setting is not None:
+        return setting.strip().lower() not in ("0", "false", "no", "off", "")
+    return sys.stdin.isatty() and sys.stdout.isatty()
+
+
+class Renderer:
+    def __init__(self, typing: Optional[bool] = None, per_char: float = 0.015,
+                 min_delay: float = 0.2, max_delay: float = 1.0,
+                 out: Optional[TextIO] = None, prefix: str = "Bairo: "):
+        self.typing = typing_enabled() if typing is None else typing
+        self.per_char = per_char
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.out = out or sys.stdout
+        self.prefix = prefix
+        self._queue = queue.Queue()
+        self._worker = None
+
+    def delay_for(self, text: str) -> float:
+        """Typing pause for text: proportional to its length, clamped to [min_delay, max_delay]."""
+        return min(self.max_delay, max(self.min_delay, len(text) * self.per_char))
+
+    def _write(self, lines) -> None:
+        for line in lines:
+            self.out.write(f"{self.prefix}{line}\n")
+        self.out.flush()
+
+    def _run(self) -> None:
+        while True:
+            lines = self._queue.get()
+            try:
+                if lines is None:
+                    return
+                self.out.write(TYPING_INDICATOR + "\r")
+                self.out.flush()
+                time.sleep(self.delay_for("".join(lines)))
+                self.out.write(" " * len(TYPING_INDICATOR) + "\r")
+                self._write(lines)
+            finally:
+                self._queue.task_done()
+
+    def say(self, *lines: str) -> None:
+        """Show one bot turn made of one or more lines without blocking the caller."""
+        if not self.typing:
+            self._write(lines)
+            return
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="bairo-renderer", daemon=True)
+            self._worker.start()
+        self._queue.put(lines)
+
+    def stream(self, tokens: Iterable[str]) -> str:
+        """Show one bot turn token by token as tokens yields them; returns the full text."""
+        self.wait()
+        if self.typing:
+            self.out.write(TYPING_INDICATOR + "\r")
+            self.out.flush()
+        parts = []
+        try:
+            for token in tokens:
+                if not token:
+                    continue
+                if not parts:
+                    if self.typing:
+                        self.out.write(" " * len(TYPING_INDICATOR) + "\r")
+                    self.out.write(self.prefix)
+                parts.append(token)
+                self.out.write(token)
+                self.out.flush()
+        finally:
+            if parts:
+                self.out.write("\n")
+            elif self.typing:
+                self.out.write(" " * len(TYPING_INDICATOR) + "\r")
+            self.out.flush()
+        return "".join(parts)
+
+    def wait(self) -> None:
+        """Block until everything passed to say() has been shown."""
+        if self._worker is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        if self._worker is not None:
+            self.wait()
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
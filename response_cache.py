@@ -0,0 +1,235 @@
+import os
+import re
+import json
+import math
+import time
+import atexit
+import hashlib
+import logging
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+
+# Cache of agent replies keyed on the normalised question plus a hash of the
+# conversation context it was asked in.
+#
+# Lookups try an exact key match first. If similarity is set (0 < s <= 1),
+# a miss falls back to the closest cached question in the same context by
+# TF-IDF cosine similarity, computed locally. Only cached questions that
+# share a word with the query are scored (found through an inverted index of
+# words to keys), and the scoring runs outside the lock. Entries expire after
+# ttl seconds, and the least recently used entry is evicted once max_entries
+# is reached. After every save_every new entries a background thread writes
+# the cache to path, so it survives restarts and no request waits for the
+# write.
+
+_PUNCTUATION = re.compile(r"[^\w\s+#]")
+_WHITESPACE = re.compile(r"\s+")
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_question(text: str) -> str:
+    text = _PUNCTUATION.sub(" ", text.lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def context_hash(context: Optional[Dict]) -> str:
+    encoded = json.dumps(context or {}, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode()).hexdigest()[:16]
+
+
+class ResponseCache:
+    def __init__(self, path: Optional[str] = None, max_entries: int = 1000,
+                 ttl: float = 24 * 3600, similarity: float = 0.0, save_every: int = 20):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.save_every = save_every
+
+        self._entries = OrderedDict()
+        self._postings = {}  # word -> keys of the entries whose question has it
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self._save_wanted = threading.Event()
+        self._saver = None
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+        if path:
+            self.load()
+            atexit.register(self._save_on_exit)
+
+    # ----- entries -----
+
+    def _add(self, key: str, entry: Dict) -> None:
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        for token in set(entry["tokens"]):
+            self._postings.setdefault(token, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        for token in set(entry["tokens"]):
+            keys = self._postings[token]
+            keys.discard(key)
+            if not keys:
+                del self._postings[token]
+
+    def _expired(self, entry: Dict, now: float) -> bool:
+        return now - entry["created"] > self.ttl
+
+    # ----- similarity -----
+
+    @staticmethod
+    def _vector(tokens: List[str], doc_freq: Dict[str, int], total: int) -> Dict[str, float]:
+        vector = {
+            token: count * (math.log(total / (doc_freq.get(token, 0) + 1)) + 1)
+            for token, count in Counter(tokens).items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {token: weight / norm for token, weight in vector.items()}
+
+    def _candidates(self, tokens: List[str], context: str, now: float):
+        """Under the lock: the live entries in context that share a word with tokens, and the counts to score them."""
+        keys = set()
+        for token in set(tokens):
+            keys.update(self._postings.get(token, ()))
+        candidates = []
+        for key in keys:
+            entry = self._entries[key]
+            if entry["context"] == context and not self._expired(entry, now):
+                candidates.append((key, entry["tokens"]))
+        words = set(tokens).union(*(entry_tokens for _, entry_tokens in candidates))
+        doc_freq = {token: len(self._postings.get(token, ())) for token in words}
+        return candidates, doc_freq, len(self._entries) + 1
+
+    def _most_similar(self, tokens: List[str], candidates, doc_freq: Dict[str, int], total: int) -> Optional[str]:
+        query = self._vector(tokens, doc_freq, total)
+        best_key, best_score = None, self.similarity
+        for key, entry_tokens in candidates:
+            candidate = self._vector(entry_tokens, doc_freq, total)
+            score = sum(weight * candidate.get(token, 0.0) for token, weight in query.items())
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    # ----- public API -----
+
+    def get(self, question: str, context: Optional[Dict] = None) -> Optional[str]:
+        """Return the cached reply for question in context, or None."""
+        normalized = normalize_question(question)
+        ctx = context_hash(context)
+        key = f"{ctx}:{normalized}"
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                return self._hit(key, entry)
+            if self.similarity <= 0 or not normalized:
+                self.misses += 1
+                return None
+            tokens = normalized.split()
+            candidates, doc_freq, total = self._candidates(tokens, ctx, now)
+        similar = self._most_similar(tokens, candidates, doc_freq, total)
+        with self._lock:
+            # Evicted while it was being scored: a miss after all
+            entry = self._entries.get(similar) if similar is not None else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.similar_hits += 1
+            return self._hit(similar, entry)
+
+    def _hit(self, key: str, entry: Dict) -> str:
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.latency_saved += entry["latency"]
+        return entry["response"]
+
+    def put(self, question: str, context: Optional[Dict], response: str, latency: float = 0.0) -> None:
+        """Cache response for question in context; latency is what producing it cost."""
+        normalized = normalize_question(question)
+        ctx = context_hash(context)
+        with self._lock:
+            self._add(f"{ctx}:{normalized}", {
+                "response": response,
+                "context": ctx,
+                "tokens": normalized.split(),
+                "created": time.time(),
+                "latency": latency,
+            })
+            self._dirty += 1
+            if self.path and self._dirty >= self.save_every:
+                self._request_save()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "latency_saved_seconds": round(self.latency_saved, 3),
+            }
+
+    # ----- persistence -----
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        now = time.time()
+        with self._lock:
+            for key, entry in entries.items():
+                if not self._expired(entry, now):
+                    self._add(key, entry)
+
+    def _request_save(self) -> None:
+        # Called under the lock; the saver thread starts on the first request
+        if self._saver is None:
+            self._saver = threading.Thread(target=self._save_loop, name="response-cache-saver", daemon=True)
+            self._saver.start()
+        self._save_wanted.set()
+
+    def _save_loop(self) -> None:
+        while True:
+            self._save_wanted.wait()
+            self._save_wanted.clear()
+            try:
+                self.save()
+            except OSError as e:
+                logger.warning("Could not save the response cache to %s: %s", self.path, e)
+
+    def _save_on_exit(self) -> None:
+        if self._dirty:
+            try:
+                self.save()
+            except OSError:
+                pass
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            entries = dict(self._entries)
+            self._dirty = 0
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,169 @@
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from courses import catalog
+
+# Compact per-conversation state for the web front end.
+#
+# A web session used to be {"step": ..., "userData": {...}, "history":
+# [[role, text], ...]}: two dicts and a list per session, plus a list per
+# agent turn, several hundred bytes before any of the text. ChatState is one
+# slotted object instead:
+#
+#   code     the step as an index into STEPS; small ints are shared, so the
+#            field costs nothing beyond its slot
+#   name, mobile, email, status, course
+#            the intake answers, None until given; a status from STATUSES or
+#            a course named in the catalog is interned, so all sessions share
+#            one copy of "Student" (anything else the user typed is kept as
+#            is: interned strings are never freed)
+#   roles    the roles of the agent history turns, one byte each (b"uaua")
+#   texts    the texts of those turns, as a tuple
+#
+# to_bytes() is the serialized form for sessions kept on disk (idle sessions
+# spilled by sessions.SpillingSessionStore, and SQLiteSessionStore): a
+# version byte, the step byte, the number of history turns, then every
+# string as a varint length and its UTF-8 bytes, about a third of the JSON
+# size for a typical session.
+
+STEPS = ("greeting", "name", "mobile", "email", "status", "course", "complete")
+STEP_CODES = {step: code for code, step in enumerate(STEPS)}
+FIELDS = ("name", "mobile", "email", "status", "course")
+STATUSES = frozenset(("Student", "Working Professional", "Job Seeker", "Other"))
+ROLE_CODES = {"user": ord("u"), "assistant": ord("a")}
+ROLE_NAMES = {code: role for role, code in ROLE_CODES.items()}
+MAX_HISTORY = 255
+VERSION = 1
+
+
+def _shared(field: str, value: Optional[str]) -> Optional[str]:
+    """value interned if it is one of the known answers for field, else value itself."""
+    if value is None:
+        return None
+    if (field == "status" and value in STATUSES) or (field == "course" and value in catalog().course_category):
+        return sys.intern(value)
+    return value
+
+
+def _write_string(parts: List[bytes], text: Optional[str]) -> None:
+    # Length + 1 as a varint, 0 for None
+    if text is None:
+        parts.append(b"\x00")
+        return
+    data = text.encode("utf-8")
+    length = len(data) + 1
+    while length > 0x7F:
+        parts.append(bytes((length & 0x7F | 0x80,)))
+        length >>= 7
+    parts.append(bytes((length,)))
+    parts.append(data)
+
+
+def _read_string(data: bytes, offset: int) -> Tuple[Optional[str], int]:
+    length, shift = 0, 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        length |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            break
+        shift += 7
+    if length == 0:
+        return None, offset
+    end = offset + length - 1
+    return data[offset:end].decode("utf-8"), end
+
+
+class ChatState:
+    __slots__ = ("code", "name", "mobile", "email", "status", "course", "roles", "texts")
+
+    def __init__(self, step: str = "greeting"):
+        self.code = STEP_CODES[step]
+        self.name = self.mobile = self.email = self.status = self.course = None
+        self.roles = b""
+        self.texts = ()
+
+    @property
+    def step(self) -> str:
+        return STEPS[self.code]
+
+    @step.setter
+    def step(self, step: str) -> None:
+        self.code = STEP_CODES[step]
+
+    def user_data(self) -> Dict:
+        """The intake answers given so far, as the dict flow.advance() works on."""
+        return {field: getattr(self, field) for field in FIELDS if getattr(self, field) is not None}
+
+    def set_user_data(self, user_data: Dict) -> None:
+        for field in FIELDS:
+            setattr(self, field, _shared(field, user_data.get(field)))
+
+    @property
+    def history(self) -> List[Tuple[str, str]]:
+        """The agent conversation as (role, text) turns."""
+        return [(ROLE_NAMES[role], text) for role, text in zip(self.roles, self.texts)]
+
+    def set_history(self, turns: Iterable[Tuple[str, str]], limit: int = MAX_HISTORY) -> None:
+        """Keep the last limit (at most MAX_HISTORY) user and assistant turns."""
+        turns = [(role, text) for role, text in turns if role in ROLE_CODES][-min(limit, MAX_HISTORY):]
+        self.roles = bytes(ROLE_CODES[role] for role, _ in turns)
+        self.texts = tuple(text for _, text in turns)
+
+    def to_bytes(self) -> bytes:
+        parts = [bytes((VERSION, self.code, len(self.texts)))]
+        for field in FIELDS:
+            _write_string(parts, getattr(self, field))
+        parts.append(self.roles)
+        for text in self.texts:
+            _write_string(parts, text)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ChatState":
+        if not data or data[0] != VERSION:
+            raise ValueError("not a serialized ChatState")
+        state = cls.__new__(cls)
+        state.code, count = data[1], data[2]
+        offset = 3
+        user_data = {}
+        for field in FIELDS:
+            user_data[field], offset = _read_string(data, offset)
+        state.set_user_data(user_data)
+        state.roles = bytes(data[offset:offset + count])
+        offset += count
+        texts = []
+        for _ in range(count):
+            text, offset = _read_string(data, offset)
+            texts.append(text)
+        state.texts = tuple(texts)
+        return state
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ChatState) and all(
+            getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"ChatState(step={self.step!r}, user_data={self.user_data()!r}, turns={len(self.texts)})"
+
+
+def footprint(obj, seen: Optional[set] = None) -> int:
+    """
+    Bytes used by obj and everything it references, counting each object once.
+
+    Pass the same seen set across calls to size several objects that share
+    parts (interned strings, for instance) without counting those twice.
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(footprint(key, seen) + footprint(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(footprint(item, seen) for item in obj)
+    elif type(obj).__dict__.get("__slots__"):
+        # Records like ChatState; other objects are counted without their attributes
+        size += sum(footprint(getattr(obj, slot), seen) for slot in obj.__slots__ if hasattr(obj, slot))
+    return size
@@ -0,0 +1,283 @@
+import sys
+import hmac
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from session_state import footprint
+
+# Session stores with idle expiry and a size cap.
+#
+# SessionStore keeps sessions in memory. Sessions are plain objects created
+# by a factory; the store only tracks when each one was last touched. get()
+# refreshes a session, purge() drops sessions idle for longer than ttl
+# seconds, and creating a session beyond max_sessions evicts the least
+# recently used one.
+#
+# SQLiteSessionStore has the same interface but keeps JSON-serialisable
+# sessions in a shared SQLite file, so several worker processes can serve
+# the same session. get() returns a copy: call put() after changing it.
+#
+# Both take an optional codec, a class with to_bytes() and from_bytes() such
+# as session_state.ChatState, for storing sessions in a compact binary form.
+# SpillingSessionStore uses it to keep only recently active sessions in
+# memory: purge() moves sessions idle for spill_after seconds to a SQLite
+# file, and get() brings them back. footprint() reports the memory (or disk)
+# the sessions take.
+
+
+def sign_session_id(session_id: str, secret: str) -> str:
+    """Return session_id with an HMAC signature appended, for handing to clients."""
+    signature = hmac.new(secret.encode(), session_id.encode(), hashlib.sha256).hexdigest()[:32]
+    return f"{session_id}.{signature}"
+
+
+def unsign_session_id(token: str, secret: str) -> Optional[str]:
+    """Return the session id from a signed token, or None if the signature does not match."""
+    session_id, _, signature = (token or "").partition(".")
+    if not session_id or not signature:
+        return None
+    expected = sign_session_id(session_id, secret).partition(".")[2]
+    return session_id if hmac.compare_digest(signature, expected) else None
+
+
+class SessionStore:
+    def __init__(self, factory: Callable[[], Any] = dict, ttl: float = 30 * 60,
+                 max_sessions: int = 10000):
+        self.factory = factory
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self) -> str:
+        """Start a new session and return its id."""
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._sessions[session_id] = (time.monotonic(), self.factory())
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session_id
+
+    def get(self, session_id: str) -> Optional[Any]:
+        """Return the session and mark it as used, or None if it is unknown or expired."""
+        now = time.monotonic()
+        with self._lock:
+            item = self._sessions.get(session_id)
+            if item is None:
+                return None
+            if now - item[0] > self.ttl:
+                del self._sessions[session_id]
+                return None
+            self._sessions[session_id] = (now, item[1])
+            self._sessions.move_to_end(session_id)
+            return item[1]
+
+    def put(self, session_id: str, session: Any) -> None:
+        with self._lock:
+            self._sessions[session_id] = (time.monotonic(), session)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def purge(self) -> int:
+        """Drop idle sessions and return how many were removed."""
+        cutoff = time.monotonic() - self.ttl
+        removed = 0
+        with self._lock:
+            # Oldest first, so stop at the first session that is still live
+            while self._sessions:
+                session_id, (touched, _) = next(iter(self._sessions.items()))
+                if touched > cutoff:
+                    break
+                del self._sessions[session_id]
+                removed += 1
+        return removed
+
+    def stats(self) -> Dict:
+        return {"sessions": len(self._sessions), "max_sessions": self.max_sessions, "ttl": self.ttl}
+
+    def footprint(self) -> Dict:
+        """Resident bytes of all sessions, including their ids and the store's own bookkeeping."""
+        with self._lock:
+            items = list(self._sessions.items())
+            resident = sys.getsizeof(self._sessions)
+        seen = set()
+        resident += sum(footprint(key, seen) + footprint(item, seen) for key, item in items)
+        return {
+            "sessions": len(items),
+            "resident_bytes": resident,
+            "bytes_per_session": round(resident / len(items)) if items else 0,
+        }
+
+
+class SQLiteSessionStore:
+    def __init__(self, path: str, factory: Callable[[], Dict] = dict, ttl: float = 30 * 60,
+                 max_sessions: int = 100000, codec=None):
+        self.path = path
+        self.factory = factory
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.codec = codec
+        self._local = threading.local()
+
+    def _dump(self, session):
+        if self.codec is not None:
+            return session.to_bytes()
+        return json.dumps(session, separators=(",", ":"))
+
+    def _load(self, data):
+        if self.codec is None:
+            return json.loads(data)
+        if not isinstance(data, bytes):
+            return None  # written before the codec was configured; start over
+        return self.codec.from_bytes(data)
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS sessions "
+                             "(id TEXT PRIMARY KEY, data TEXT NOT NULL, touched REAL NOT NULL)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_touched ON sessions (touched)")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self) -> int:
+        return self.connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def create(self) -> str:
+        session_id = uuid.uuid4().hex
+        self.put(session_id, self.factory())
+        return session_id
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        row = self.connection().execute(
+            "SELECT data, touched FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        if time.time() - row[1] > self.ttl:
+            self.delete(session_id)
+            return None
+        return self._load(row[0])
+
+    def put(self, session_id: str, session: Dict) -> None:
+        conn = self.connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO sessions (id, data, touched) VALUES (?, ?, ?)",
+                         (session_id, self._dump(session), time.time()))
+
+    def delete(self, session_id: str) -> None:
+        conn = self.connection()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def purge(self) -> int:
+        """Drop idle sessions, then the least recently used ones over max_sessions."""
+        conn = self.connection()
+        with conn:
+            removed = conn.execute("DELETE FROM sessions WHERE touched < ?",
+                                   (time.time() - self.ttl,)).rowcount
+            removed += conn.execute(
+                "DELETE FROM sessions WHERE id IN (SELECT id FROM sessions ORDER BY touched DESC "
+                "LIMIT -1 OFFSET ?)", (self.max_sessions,)).rowcount
+        return removed
+
+    def stats(self) -> Dict:
+        return {"sessions": len(self), "max_sessions": self.max_sessions, "ttl": self.ttl}
+
+    def footprint(self) -> Dict:
+        """Sessions live on disk here: report their stored size instead."""
+        count, stored = self.connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM sessions").fetchone()
+        return {
+            "sessions": count,
+            "resident_bytes": 0,
+            "stored_bytes": stored,
+            "bytes_per_session": round(stored / count) if count else 0,
+        }
+
+
+class SpillingSessionStore(SessionStore):
+    """A SessionStore that keeps sessions idle for spill_after seconds in a SQLite file."""
+
+    def __init__(self, path: str, codec, factory: Optional[Callable[[], Any]] = None, ttl: float = 30 * 60,
+                 max_sessions: int = 10000, spill_after: float = 5 * 60):
+        super().__init__(factory or codec, ttl, max_sessions)
+        self.spill_after = spill_after
+        self.spilled = SQLiteSessionStore(path, self.factory, ttl, codec=codec)
+        self.spills = 0
+        self.restores = 0
+
+    def __len__(self) -> int:
+        return super().__len__() + len(self.spilled)
+
+    def get(self, session_id: str) -> Optional[Any]:
+        session = super().get(session_id)
+        if session is None:
+            session = self.spilled.get(session_id)
+            if session is not None:
+                self.spilled.delete(session_id)
+                self.put(session_id, session)
+                self.restores += 1
+        return session
+
+    def delete(self, session_id: str) -> None:
+        super().delete(session_id)
+        self.spilled.delete(session_id)
+
+    def purge(self) -> int:
+        """Drop expired sessions, in memory and spilled, and spill idle ones; return how many were dropped."""
+        removed = super().purge() + self.spilled.purge()
+        cutoff = time.monotonic() - self.spill_after
+        idle = []
+        with self._lock:
+            for session_id, item in self._sessions.items():
+                if item[0] > cutoff:
+                    break
+                idle.append((session_id, item))
+        # Write first and drop from memory after, so a session is never missing from both;
+        # the spilled copy keeps the time the session was last used, as wall-clock time
+        offset = time.time() - time.monotonic()
+        conn = self.spilled.connection()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO sessions (id, data, touched) VALUES (?, ?, ?)",
+                             [(session_id, session.to_bytes(), touched + offset)
+                              for session_id, (touched, session) in idle])
+        busy = []
+        with self._lock:
+            for session_id, item in idle:
+                if self._sessions.get(session_id) is item:
+                    del self._sessions[session_id]
+                else:
+                    busy.append((session_id,))
+        if busy:
+            # Used again while being written out: keep the one in memory
+            with conn:
+                conn.executemany("DELETE FROM sessions WHERE id = ?", busy)
+        self.spills += len(idle) - len(busy)
+        return removed
+
+    def stats(self) -> Dict:
+        return dict(super().stats(), sessions=len(self), spilled=len(self.spilled),
+                    spills=self.spills, restores=self.restores)
+
+    def footprint(self) -> Dict:
+        resident = super().footprint()
+        spilled = self.spilled.footprint()
+        return dict(resident, spilled_sessions=spilled["sessions"], spilled_bytes=spilled["stored_bytes"])
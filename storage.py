@@ -0,0 +1,95 @@
+import os
+import threading
+from typing import Dict, Optional
+
+from inquiry_store import InquiryStore
+from db import EnquiryRepository
+from write_behind import WriteBehindQueue
+
+# Single storage interface for main.py and app.py.
+#
+# Every backend exposes the same methods on plain inquiry dicts
+# ({"name", "mobile", "email", "status", "courses", "timestamp"}):
+#   save(record), save_many(records), exists(mobile, email), iter_records(),
+#   existing(mobiles, emails) for bulk duplicate checks
+#
+#   json    append-only journal over inquiry_database.json (inquiry_store.py)
+#   sqlite  WAL-mode SQLite database enquiry_data.db (db.py)
+#
+# The default backend is taken from the INQUIRY_BACKEND environment variable.
+#
+# New inquiries are saved through get_writer(), which puts a write-behind
+# queue (write_behind.py) in front of the repository so the reply does not
+# wait for the disk. INQUIRY_WRITE_BEHIND=0 writes synchronously instead.
+
+DEFAULT_BACKEND = "json"
+
+BACKENDS = {
+    "json": (InquiryStore, "inquiry_database.json"),
+    "sqlite": (EnquiryRepository, "enquiry_data.db"),
+}
+
+_repositories: Dict[tuple, object] = {}
+_writers: Dict[tuple, WriteBehindQueue] = {}
+_lock = threading.Lock()
+
+
+def _resolve(backend: Optional[str], path: Optional[str]) -> tuple:
+    backend = backend or os.getenv("INQUIRY_BACKEND", DEFAULT_BACKEND)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inquiry backend: {backend!r} (expected one of {', '.join(BACKENDS)})")
+    return backend, os.path.abspath(path or BACKENDS[backend][1])
+
+
+def get_repository(backend: Optional[str] = None, path: Optional[str] = None):
+    """Return the process-wide repository for backend, creating it on first use."""
+    key = _resolve(backend, path)
+    with _lock:
+        if key not in _repositories:
+            factory, default_path = BACKENDS[key[0]]
+            _repositories[key] = factory(path or default_path)
+        return _repositories[key]
+
+
+def get_writer(backend: Optional[str] = None, path: Optional[str] = None):
+    """
+    Return the process-wide write-behind queue for a repository.
+
+    It has the repository's save() and save_many(). With
+    INQUIRY_WRITE_BEHIND=0 the repository itself is returned.
+    """
+    repository = get_repository(backend, path)
+    if os.getenv("INQUIRY_WRITE_BEHIND", "1") == "0":
+        return repository
+    key = _resolve(backend, path)
+    with _lock:
+        if key not in _writers:
+            _writers[key] = WriteBehindQueue(repository, key[1])
+        return _writers[key]
+
+
+def flush_writers(timeout: Optional[float] = None) -> None:
+    """Wait until every queued inquiry has been written."""
+    with _lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.flush(timeout)
+
+
+def close_writers() -> None:
+    """Drain and stop all write-behind queues (they also close at exit)."""
+    with _lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+def reset() -> None:
+    """Close and forget every writer and repository, so the next get_repository() opens afresh."""
+    close_writers()
+    with _lock:
+        repositories = list(_repositories.values())
+        _repositories.clear()
+    for repository in repositories:
+        repository.close()
@@ -0,0 +1,89 @@
+import os
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from admission import (ConcurrencyLimiter, Overloaded, SQLiteConcurrencyLimiter,
+                       SQLiteTokenBucketLimiter, TokenBucketLimiter)
+
+
+class TestTokenBucketLimiter(unittest.TestCase):
+    def test_burst_then_refill(self):
+        limiter = TokenBucketLimiter(rate=2, burst=3)
+        with mock.patch('admission.time.monotonic', return_value=100.0):
+            self.assertEqual([limiter.take('a') for _ in range(3)], [0.0, 0.0, 0.0])
+            self.assertAlmostEqual(limiter.take('a'), 0.5)
+            self.assertEqual(limiter.take('b'), 0.0)
+        with mock.patch('admission.time.monotonic', return_value=100.5):
+            self.assertEqual(limiter.take('a'), 0.0)
+
+    def test_check_raises_429_with_retry_after(self):
+        limiter = TokenBucketLimiter(rate=0.5, burst=1)
+        limiter.check('a')
+        with self.assertRaises(Overloaded) as raised:
+            limiter.check('a')
+        self.assertEqual(raised.exception.status, 429)
+        self.assertEqual(raised.exception.retry_after_header, '2')
+
+    def test_sqlite_buckets_are_shared(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'admission.db')
+        first = SQLiteTokenBucketLimiter(path, rate=0.01, burst=2)
+        second = SQLiteTokenBucketLimiter(path, rate=0.01, burst=2)
+        self.assertEqual(first.take('a'), 0.0)
+        self.assertEqual(second.take('a'), 0.0)
+        self.assertGreater(first.take('a'), 0)
+
+
+class TestConcurrencyLimiter(unittest.TestCase):
+    def test_queue_is_bounded_and_waits_time_out(self):
+        limiter = ConcurrencyLimiter(limit=1, max_queue=1, queue_timeout=0.2)
+        slot = limiter.acquire()
+        errors = []
+
+        def waiter():
+            try:
+                limiter.acquire()
+            except Overloaded as e:
+                errors.append(e)
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        time.sleep(0.05)
+        # The queue is full: refused at once
+        started = time.perf_counter()
+        with self.assertRaises(Overloaded) as raised:
+            limiter.acquire()
+        self.assertLess(time.perf_counter() - started, 0.05)
+        self.assertEqual(raised.exception.status, 503)
+        thread.join()
+        self.assertEqual(len(errors), 1)
+        limiter.release(slot)
+        self.assertEqual(limiter.stats()['active'], 0)
+
+    def test_waiter_gets_a_released_slot(self):
+        limiter = ConcurrencyLimiter(limit=1, max_queue=1, queue_timeout=1)
+        slot = limiter.acquire()
+        threading.Timer(0.05, limiter.release, (slot,)).start()
+        with limiter.slot():
+            self.assertEqual(limiter.stats()['active'], 1)
+
+    def test_sqlite_slots_are_shared(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'admission.db')
+        first = SQLiteConcurrencyLimiter(path, limit=1)
+        second = SQLiteConcurrencyLimiter(path, limit=1)
+        slot = first.acquire()
+        with self.assertRaises(Overloaded):
+            second.acquire()
+        first.release(slot)
+        with second.slot():
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
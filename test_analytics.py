@@ -0,0 +1,77 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from analytics import parse_inquiry_text, run
+from db import EnquiryRepository
+from inquiry_store import InquiryStore
+
+TEXT_INQUIRY = """CADD Center Course Inquiry
+==============================
+Date: 2025-05-20 11:00:00
+
+Name: Ravi
+Mobile: 9876543210
+Email: ravi@example.com
+Status: Student
+Course Interest: I came for CAM and Python
+"""
+
+class TestAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.json_path = os.path.join(self.tmpdir, 'inquiry_database.json')
+        self.sqlite_path = os.path.join(self.tmpdir, 'enquiry_data.db')
+        self.text_dir = os.path.join(self.tmpdir, 'user_data')
+        self.out_dir = os.path.join(self.tmpdir, 'out')
+        self.checkpoint = os.path.join(self.tmpdir, 'checkpoint.json')
+        os.makedirs(self.text_dir)
+        with open(os.path.join(self.text_dir, 'inquiry_20250520_110000.txt'), 'w') as f:
+            f.write(TEXT_INQUIRY)
+        store = InquiryStore(self.json_path)
+        store.append({'status': 'job seeker', 'courses': ['SolidWorks'], 'timestamp': '2025-05-20 12:00:00'})
+        store.close()
+        repo = EnquiryRepository(self.sqlite_path)
+        repo.save({'status': 'Student', 'course': 'mechanical', 'timestamp': '2025-05-21 09:00:00'})
+        repo.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def run_job(self, **kwargs):
+        return run(self.json_path, self.sqlite_path, self.text_dir, self.out_dir, self.checkpoint, **kwargs)
+
+    def test_parse_inquiry_text(self):
+        record = parse_inquiry_text(TEXT_INQUIRY)
+        self.assertEqual(record['course'], 'I came for CAM and Python')
+        self.assertEqual(record['timestamp'], '2025-05-20 11:00:00')
+
+    def test_counts_and_columns(self):
+        state = self.run_job()
+        self.assertEqual(state['inquiries'], 3)
+        counts = state['counts']
+        self.assertEqual(counts['course'], {'SolidWorks': 1, 'CAM': 1, 'Python': 1, 'Mechanical Courses': 1})
+        self.assertEqual(counts['category'], {'mechanical': 3, 'it': 1})
+        self.assertEqual(counts['status'], {'Student': 2, 'Job Seeker': 1})
+        self.assertEqual(counts['day'], {'2025-05-20': 2, '2025-05-21': 1})
+        with open(os.path.join(self.out_dir, 'day.json')) as f:
+            self.assertEqual(json.load(f), {'key': ['2025-05-20', '2025-05-21'], 'count': [2, 1]})
+
+    def test_resume_only_counts_new_records(self):
+        self.run_job()
+        repo = EnquiryRepository(self.sqlite_path)
+        repo.save({'status': 'Student', 'course': 'Revit', 'timestamp': '2025-05-22 09:00:00'})
+        repo.close()
+        state = self.run_job()
+        self.assertEqual(state['inquiries'], 4)
+        self.assertEqual(state['counts']['course']['Revit'], 1)
+        self.assertEqual(state['counts']['course']['SolidWorks'], 1)
+
+    def test_process_pool_matches_inline(self):
+        inline = self.run_job(full=True, chunk_size=1)['counts']
+        pooled = self.run_job(full=True, chunk_size=1, workers=2)['counts']
+        self.assertEqual(inline, pooled)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,12 @@
+import os
+import shutil
+import tempfile
 import unittest
+from unittest import mock
+
+import app
 from app import validate_mobile_number, validate_email
+from db import EnquiryRepository
 
 class TestValidationFunctions(unittest.TestCase):
     def test_mobile_validation(self):
@@ -27,5 +34,54 @@ class TestValidationFunctions(unittest.TestCase):
         self.assertFalse(validate_email('@example.com'))  # No username
         self.assertFalse(validate_email(''))  # Empty
 
+class TestAdminInquiriesAPI(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.repository = EnquiryRepository(os.path.join(tmpdir, 'enquiry_data.db'))
+        self.addCleanup(self.repository.close)
+        patch = mock.patch.object(app, 'repository', self.repository)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.client = app.app.test_client()
+        self.add('Asha')
+
+    def add(self, name, timestamp='2026-01-01 10:00:00'):
+        self.repository.save({'name': name, 'mobile': '9876543210', 'email': f'{name.lower()}@example.com',
+                              'status': 'Student', 'courses': ['AutoCAD'], 'timestamp': timestamp})
+
+    def test_revalidation_with_the_etag(self):
+        first = self.client.get('/admin/api/inquiries')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([inquiry['name'] for inquiry in first.get_json()['inquiries']], ['Asha'])
+        self.assertIsNone(first.last_modified)
+        etag = first.headers['ETag']
+
+        again = self.client.get('/admin/api/inquiries', headers={'If-None-Match': etag})
+        self.assertEqual(again.status_code, 304)
+
+        # Same second, and an import with an older timestamp: both must show up
+        self.add('Ravi')
+        self.add('Imported', timestamp='2020-01-01 00:00:00')
+        changed = self.client.get('/admin/api/inquiries', headers={'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(len(changed.get_json()['inquiries']), 3)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+
+    def test_if_modified_since_alone_is_not_a_validator(self):
+        response = self.client.get('/admin/api/inquiries',
+                                   headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_pages_have_their_own_etag(self):
+        self.add('Ravi')
+        first = self.client.get('/admin/api/inquiries?limit=1')
+        self.assertEqual([inquiry['name'] for inquiry in first.get_json()['inquiries']], ['Ravi'])
+        cursor = first.get_json()['next_cursor']
+        second = self.client.get(f'/admin/api/inquiries?limit=1&cursor={cursor}',
+                                 headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual([inquiry['name'] for inquiry in second.get_json()['inquiries']], ['Asha'])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
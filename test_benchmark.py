@@ -0,0 +1,59 @@
+import unittest
+from unittest import mock
+import benchmark
+from benchmark import compare, main, percentile
+
+class TestBenchmark(unittest.TestCase):
+    def test_percentile(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 95), 95)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'web': {'concurrency': 4, 'p95_ms': 10.0, 'rps': 100.0}}
+        self.assertEqual(compare({'web': {'concurrency': 4, 'p95_ms': 11.0, 'rps': 95.0}}, baseline, 0.25), [])
+        regressions = compare({'web': {'concurrency': 4, 'p95_ms': 20.0, 'rps': 50.0}}, baseline, 0.25)
+        self.assertEqual(len(regressions), 2)
+        # Different concurrency is not comparable
+        self.assertEqual(compare({'web': {'concurrency': 8, 'p95_ms': 20.0, 'rps': 50.0}}, baseline, 0.25), [])
+
+    def test_flow_scenario_runs_offline(self):
+        self.assertEqual(main(['flow', '-n', '5', '-c', '2', '--baseline', '/nonexistent/baseline.json']), 0)
+
+    def test_second_run_gets_fresh_stores(self):
+        import storage
+        options = mock.Mock(scenarios=['storage-json', 'storage-sqlite'], conversations=3, concurrency=2)
+        with mock.patch('benchmark.print_report'):
+            for _ in range(2):
+                results = benchmark.run(options)
+                self.assertEqual([result.get('error') for result in results.values()], [None, None])
+                self.assertEqual(storage._repositories, {})
+                self.assertEqual(storage._writers, {})
+
+    def test_failing_scenario_does_not_stop_the_others(self):
+        seen = []
+
+        def broken(options):
+            def conversation(index):
+                raise RuntimeError('boom')
+            return conversation
+
+        def recording(options):
+            def conversation(index):
+                seen.append(index)
+                return [0.001]
+            return conversation
+
+        scenarios = {'broken': broken, 'recording': recording}
+        with mock.patch.dict(benchmark.SCENARIOS, scenarios), mock.patch('benchmark.print_report'):
+            self.assertEqual(main(['broken', 'recording', '-n', '3', '--baseline', '/nonexistent/baseline.json']), 1)
+            results = benchmark.run(mock.Mock(scenarios=['broken', 'recording'], conversations=3, concurrency=1))
+        self.assertTrue(results['broken']['failed'])
+        self.assertEqual(results['recording']['requests'], 3)
+        # The second scenario uses indexes of its own
+        self.assertEqual(sorted(seen[-4:]), [4, 5, 6, 7])
+
+if __name__ == '__main__':
+    unittest.main()
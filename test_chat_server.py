@@ -0,0 +1,150 @@
+import json
+import time
+import asyncio
+import unittest
+from unittest import mock
+
+from langchain_core.messages import AIMessageChunk
+
+import main as bot
+from admission import TokenBucketLimiter
+from chat_server import ChatServer
+from response_cache import ResponseCache
+
+
+class FakeAgent:
+    """Streams a fixed reply a token at a time, like the agent's astream(stream_mode="messages")."""
+
+    def __init__(self, tokens=("Yes, ", "on ", "Saturdays."), delay=0.01):
+        self.tokens = tokens
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+
+    async def astream(self, inputs, stream_mode=None):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            for token in self.tokens:
+                await asyncio.sleep(self.delay)
+                yield AIMessageChunk(content=token), {"langgraph_node": "agent"}
+        finally:
+            self.active -= 1
+
+
+def chunks(payload: bytes):
+    """The NDJSON events in a chunked body, and whether it ended with the last chunk."""
+    events = []
+    while payload:
+        size, _, payload = payload.partition(b"\r\n")
+        size = int(size, 16)
+        if size == 0:
+            return events, payload == b"\r\n"
+        events.append(json.loads(payload[:size]))
+        payload = payload[size + 2:]
+    return events, False
+
+
+class TestChatServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        cache = mock.patch.object(bot, "response_cache", ResponseCache())
+        cache.start()
+        self.addCleanup(cache.stop)
+        self.agent = FakeAgent()
+        self.server = ChatServer(agent=self.agent, spill_after=0)
+        self.tcp = await asyncio.start_server(self.server.serve_connection, "127.0.0.1", 0)
+        self.address = self.tcp.sockets[0].getsockname()[:2]
+
+    async def asyncTearDown(self):
+        self.tcp.close()
+        await self.tcp.wait_closed()
+
+    def raw_request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        return (f"{method} {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n"
+                f"Content-Length: {len(data)}\r\n\r\n").encode() + data
+
+    async def send(self, raw: bytes):
+        reader, writer = await asyncio.open_connection(*self.address)
+        writer.write(raw)
+        response = await reader.read()
+        writer.close()
+        head, _, payload = response.partition(b"\r\n\r\n")
+        return int(head.split(b" ")[1]), head.decode("latin-1"), payload
+
+    async def request(self, method, path, body=None):
+        return await self.send(self.raw_request(method, path, body))
+
+    async def create_session(self) -> str:
+        status, _, payload = await self.request("POST", "/sessions")
+        self.assertEqual(status, 201)
+        return json.loads(payload)["session_id"]
+
+    async def test_session_create_message_and_delete(self):
+        session_id = await self.create_session()
+        self.assertIsNotNone(self.server.sessions.get(session_id))
+
+        status, head, payload = await self.request("POST", f"/sessions/{session_id}/messages",
+                                                   {"message": "Do you have weekend batches?"})
+        self.assertEqual(status, 200)
+        self.assertIn("Transfer-Encoding: chunked", head)
+        self.assertTrue(payload.endswith(b'{"done": true}\n\r\n0\r\n\r\n'))
+        events, complete = chunks(payload)
+        self.assertTrue(complete)
+        self.assertEqual(events[-1], {"done": True})
+        self.assertEqual("".join(event["token"] for event in events[:-1]), "Yes, on Saturdays.")
+        self.assertEqual(self.server.sessions.get(session_id).history,
+                         [("user", "Do you have weekend batches?"), ("assistant", "Yes, on Saturdays.")])
+
+        status, _, _ = await self.request("DELETE", f"/sessions/{session_id}")
+        self.assertEqual(status, 204)
+        self.assertIsNone(self.server.sessions.get(session_id))
+
+    async def test_unknown_session_is_404(self):
+        status, _, _ = await self.request("POST", f"/sessions/{'0' * 32}/messages", {"message": "Hello"})
+        self.assertEqual(status, 404)
+
+    async def test_fast_sender_gets_429(self):
+        self.server.message_limiter = TokenBucketLimiter(0.001, 1)
+        session_id = await self.create_session()
+        status, _, _ = await self.request("POST", f"/sessions/{session_id}/messages", {"message": "What is the fee?"})
+        self.assertEqual(status, 200)
+        status, head, _ = await self.request("POST", f"/sessions/{session_id}/messages", {"message": "What is the fee?"})
+        self.assertEqual(status, 429)
+        self.assertIn("Retry-After:", head)
+
+    async def test_malformed_and_oversized_requests(self):
+        status, _, _ = await self.send(b"GARBAGE\r\n\r\n")
+        self.assertEqual(status, 400)
+        status, _, _ = await self.send(b"POST /sessions HTTP/1.1\r\nContent-Length: ten\r\n\r\n")
+        self.assertEqual(status, 400)
+        status, _, _ = await self.send(b"POST /sessions HTTP/1.1\r\nContent-Length: 10000000\r\n\r\n")
+        self.assertEqual(status, 413)
+
+    async def test_messages_on_one_session_run_one_at_a_time(self):
+        session_id = await self.create_session()
+        path = f"/sessions/{session_id}/messages"
+        results = await asyncio.gather(self.request("POST", path, {"message": "Do you have weekend batches?"}),
+                                       self.request("POST", path, {"message": "And weekday ones?"}))
+        self.assertEqual([status for status, _, _ in results], [200, 200])
+        self.assertEqual(self.agent.max_active, 1)
+        roles = [role for role, _ in self.server.sessions.get(session_id).history]
+        self.assertEqual(roles, ["user", "assistant", "user", "assistant"])
+
+    async def test_client_gone_mid_stream_keeps_the_turns(self):
+        self.agent.tokens = ("token ",) * 200
+        session_id = await self.create_session()
+        reader, writer = await asyncio.open_connection(*self.address)
+        writer.write(self.raw_request("POST", f"/sessions/{session_id}/messages", {"message": "Tell me a story"}))
+        await reader.readuntil(b'{"token"')
+        writer.transport.abort()
+
+        deadline = time.monotonic() + 5
+        while not self.server.sessions.get(session_id).history and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        # The question is kept; the partial reply is not
+        self.assertEqual(self.server.sessions.get(session_id).history, [("user", "Tell me a story")])
+
+
+if __name__ == "__main__":
+    unittest.main()
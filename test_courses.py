@@ -0,0 +1,76 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import courses
+from courses import course_info, course_list, find_category, find_courses, find_courses_many, retag
+
+class TestCourseExtraction(unittest.TestCase):
+    def test_word_boundaries(self):
+        self.assertEqual(find_courses('I came here yesterday'), [])
+        self.assertEqual(find_courses('Can I learn CAM?'), ['CAM'])
+        self.assertEqual(find_courses('C and C++ please'), ['C', 'C++'])
+        self.assertEqual(find_courses('C++ only'), ['C++'])
+        self.assertEqual(find_courses('Is C# taught?'), [])
+
+    def test_aliases_and_order(self):
+        self.assertEqual(find_courses('solid works, auto cad and BIM'), ['SolidWorks', 'AutoCAD', 'BIM'])
+        self.assertEqual(find_courses('building information modelling'), ['BIM'])
+        self.assertEqual(find_courses('python python'), ['Python'])
+
+    def test_categories(self):
+        self.assertEqual(find_courses('mechanical, CATIA and Java'), ['Mechanical Courses', 'Java'])
+        self.assertEqual(find_courses('IT'), ['IT Courses'])
+        self.assertEqual(find_courses('it courses'), ['IT Courses'])
+        self.assertEqual(find_courses('is it worth it'), [])
+        self.assertEqual(find_category('show me civil options'), 'civil')
+        self.assertIsNone(find_category('is it available'))
+
+    def test_batch_and_retag(self):
+        self.assertEqual(find_courses_many(['Revit', 'nothing']), [['Revit'], []])
+        records = list(retag([{'course': 'came for Creo'}, {'courses': ['C']}, {'course': 'hello'}]))
+        self.assertEqual([r['courses'] for r in records], [['Creo'], ['C'], ['General Course Inquiry']])
+
+    def test_course_info(self):
+        self.assertEqual(course_info('civil'), 'Courses in civil: Revit, BIM (Building Information Modeling)')
+        self.assertTrue(course_info('arts').startswith('Category not found'))
+
+class TestCatalogReload(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'courses.json')
+        with open(courses.COURSES_FILE) as handle:
+            self.data = json.load(handle)
+        self.write(self.data, mtime=1000)
+        for name, value in [('COURSES_FILE', self.path), ('RELOAD_INTERVAL', 0), ('_catalog', courses.catalog()),
+                            ('_seen_mtime', courses.catalog().mtime)]:
+            patcher = mock.patch.object(courses, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write(self, data, mtime):
+        with open(self.path, 'w') as handle:
+            handle.write(data if isinstance(data, str) else json.dumps(data))
+        os.utime(self.path, (mtime, mtime))
+
+    def test_edits_are_picked_up(self):
+        self.data['categories']['civil']['courses']['STAAD Pro'] = ['staad']
+        self.write(self.data, mtime=2000)
+        self.assertEqual(find_courses('staad and revit'), ['STAAD Pro', 'Revit'])
+        self.assertIn('- Civil: Revit, BIM (Building Information Modeling), STAAD Pro', course_list())
+        body = json.loads(courses.catalog().response.body)
+        self.assertEqual(body['categories'][1]['courses'][-1], 'STAAD Pro')
+
+    def test_broken_file_keeps_the_previous_catalog(self):
+        before = courses.catalog()
+        self.write('{"categories": ', mtime=2000)
+        with self.assertLogs('courses', 'WARNING'):
+            self.assertIs(courses.catalog(), before)
+        self.assertIs(courses.catalog(), before)
+        self.assertEqual(find_courses('revit'), ['Revit'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from db import EnquiryRepository
+
+class TestEnquiryRepository(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.repo = EnquiryRepository(os.path.join(self.tmpdir, 'enquiry_data.db'))
+
+    def tearDown(self):
+        self.repo.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_wal_mode(self):
+        with self.repo.connection() as conn:
+            mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+
+    def test_bulk_insert_and_iterate(self):
+        records = [{'name': f'user{i}', 'mobile': f'98765{i:05d}', 'email': f'u{i}@x.co',
+                    'status': 'Student', 'courses': ['Python', 'Java']} for i in range(1200)]
+        self.assertEqual(self.repo.save_many(records), 1200)
+        stored = list(self.repo.iter_records(batch_size=500))
+        self.assertEqual(len(stored), 1200)
+        self.assertEqual(stored[0]['courses'], ['Python', 'Java'])
+        self.assertEqual(stored[-1]['name'], 'user1199')
+
+    def test_exists_uses_normalized_contacts(self):
+        self.repo.save({'name': 'a', 'mobile': '+91 98765 43210', 'email': 'A@X.co'})
+        self.assertTrue(self.repo.exists('9876543210', ''))
+        self.assertTrue(self.repo.exists('', 'a@x.co'))
+        self.assertFalse(self.repo.exists('1234567890', 'b@x.co'))
+        self.assertFalse(self.repo.exists('', ''))
+
+    def test_connections_are_shared_between_threads(self):
+        def borrow():
+            with self.repo.connection() as conn:
+                connections.append(conn)
+                self.assertEqual(conn.execute('SELECT 1').fetchone(), (1,))
+
+        connections = []
+        for _ in range(3):
+            thread = threading.Thread(target=borrow)
+            thread.start()
+            thread.join()
+        self.assertEqual(len({id(conn) for conn in connections}), 1)
+
+    def test_pool_is_bounded_and_closed(self):
+        repo = EnquiryRepository(os.path.join(self.tmpdir, 'pool.db'), pool_size=2)
+        with repo.connection() as first, repo.connection() as second:
+            self.assertIsNot(first, second)
+            waited = []
+            thread = threading.Thread(target=lambda: waited.append(repo.exists('9876543210', '')))
+            thread.start()
+            thread.join(0.1)
+            # Both connections are borrowed, so the third caller waits
+            self.assertTrue(thread.is_alive())
+        thread.join()
+        self.assertEqual(waited, [False])
+        repo.close()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            first.execute('SELECT 1')
+
+    def test_indexes_exist(self):
+        with self.repo.connection() as conn:
+            names = {row[1] for row in conn.execute('PRAGMA index_list(enquiries)')}
+        self.assertTrue({'idx_enquiries_mobile', 'idx_enquiries_email', 'idx_enquiries_timestamp'} <= names)
+
+    def test_query_pagination_and_filters(self):
+        self.repo.save_many([
+            {'name': f'user{i}', 'mobile': f'98765{i:05d}', 'email': f'u{i}@x.co',
+             'status': 'Student' if i % 2 else 'Job Seeker',
+             'course': 'Python' if i % 3 else 'Revit',
+             'timestamp': f'2025-05-{i % 28 + 1:02d} 10:00:00'}
+            for i in range(100)
+        ])
+        seen, cursor = [], None
+        while True:
+            page, cursor = self.repo.query(cursor=cursor, limit=30)
+            seen.extend(inquiry['id'] for inquiry in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, sorted(seen, reverse=True))
+        self.assertEqual(len(set(seen)), 100)
+
+        page, _ = self.repo.query(status='student', course='revit', limit=100)
+        self.assertTrue(page)
+        self.assertTrue(all(i['status'] == 'Student' and i['courses'] == ['Revit'] for i in page))
+
+        page, _ = self.repo.query(start='2025-05-01', end='2025-05-01', limit=100)
+        self.assertTrue(all(i['timestamp'].startswith('2025-05-01') for i in page))
+        self.assertEqual(len(page), 4)
+
+        self.assertEqual(self.repo.version(), 100)
+
+if __name__ == '__main__':
+    unittest.main()
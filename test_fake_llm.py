@@ -0,0 +1,37 @@
+import json
+import unittest
+import urllib.error
+import urllib.request
+from fake_llm import FakeLLMServer
+
+def post(url, payload):
+    request = urllib.request.Request(url + '/chat/completions', data=json.dumps(payload).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    return urllib.request.urlopen(request, timeout=5)
+
+class TestFakeLLM(unittest.TestCase):
+    def test_completion(self):
+        with FakeLLMServer(latency=0, token_delay=0, reply='Hello there') as server:
+            with post(server.url, {'messages': [{'role': 'user', 'content': 'hi'}]}) as response:
+                body = json.load(response)
+            self.assertEqual(body['choices'][0]['message']['content'], 'Hello there')
+            self.assertEqual(server.requests, 1)
+
+    def test_streamed_tokens_join_to_reply(self):
+        with FakeLLMServer(latency=0, token_delay=0, reply='We run weekend batches') as server:
+            with post(server.url, {'messages': [], 'stream': True}) as response:
+                lines = [line.decode().strip() for line in response]
+        events = [line[len('data: '):] for line in lines if line.startswith('data: ')]
+        self.assertEqual(events[-1], '[DONE]')
+        tokens = [json.loads(event)['choices'][0]['delta'].get('content', '') for event in events[:-1]]
+        self.assertEqual(''.join(tokens), 'We run weekend batches')
+        self.assertGreater(len(tokens), 3)
+
+    def test_injected_errors(self):
+        with FakeLLMServer(latency=0, error_rate=1.0) as server:
+            with self.assertRaises(urllib.error.HTTPError) as raised:
+                post(server.url, {'messages': []})
+            self.assertEqual(raised.exception.code, 500)
+
+if __name__ == '__main__':
+    unittest.main()
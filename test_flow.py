@@ -0,0 +1,94 @@
+import io
+import unittest
+from unittest import mock
+
+import main
+from flow import PROMPTS, advance, advance_many
+
+class TestFlow(unittest.TestCase):
+    def test_full_intake(self):
+        user_data = {}
+        step = 'greeting'
+        for message in ['I want course information', 'Asha', '9876543210', 'asha@example.com',
+                        'Student', 'AutoCAD']:
+            turn = advance(step, message, user_data)
+            self.assertTrue(turn.valid)
+            step = turn.next_step
+        self.assertEqual(step, 'complete')
+        self.assertEqual(turn.lines, PROMPTS['complete'])
+        self.assertEqual(user_data, {'name': 'Asha', 'mobile': '9876543210', 'email': 'asha@example.com',
+                                     'status': 'Student', 'course': 'AutoCAD'})
+
+    def test_validation_keeps_step(self):
+        turn = advance('mobile', '12345', {})
+        self.assertFalse(turn.valid)
+        self.assertEqual(turn.next_step, 'mobile')
+        self.assertNotIn('mobile', turn.user_data)
+        self.assertFalse(advance('email', 'not-an-email', {}).valid)
+
+    def test_contact_details_are_cleaned(self):
+        data = {}
+        self.assertEqual(advance('mobile', '+91 98765-43210', data).next_step, 'email')
+        self.assertEqual(advance('email', ' Asha@Example.com ', data).next_step, 'status')
+        self.assertEqual(data, {'mobile': '9876543210', 'email': 'asha@example.com'})
+        self.assertFalse(advance('mobile', '98765abc43', {}).valid)
+
+    def test_greeting(self):
+        self.assertEqual(advance('greeting', 'Hello there').next_step, 'name')
+        turn = advance('greeting', 'what is the weather')
+        self.assertFalse(turn.handled)
+        self.assertEqual(turn.next_step, 'greeting')
+
+    def test_restart_after_complete(self):
+        turn = advance('complete', 'anything else?', {'name': 'Asha'})
+        self.assertEqual((turn.next_step, turn.user_data), ('greeting', {}))
+
+    def test_course_prompt_matches_web_message(self):
+        self.assertEqual(advance('status', 'Student').message,
+                         "Which courses are you interested in? We offer:\n\n"
+                         "- Mechanical: AutoCAD, CATIA, SolidWorks, NX CAD, Creo, CAM\n"
+                         "- Civil: Revit, BIM (Building Information Modeling)\n"
+                         "- IT: Python, Java, C, C++, Web Design")
+
+    def test_advance_many_does_not_mutate_inputs(self):
+        data = {'name': 'Asha'}
+        turns = advance_many([('mobile', '9876543210', data), ('mobile', 'bad', data), ('greeting', 'hi')])
+        self.assertEqual([t.next_step for t in turns], ['email', 'mobile', 'name'])
+        self.assertEqual(data, {'name': 'Asha'})
+
+class TestCliCourseStep(unittest.TestCase):
+    def run_intake(self, course_reply):
+        """Run main.main() through the intake, answering the course prompt with course_reply."""
+        messages = iter(['I want course information', 'Asha', '9876543210', 'asha@example.com',
+                         'Student', course_reply])
+        out = io.StringIO()
+        saved = []
+
+        def input_fn(prompt=''):
+            try:
+                return next(messages)
+            except StopIteration:
+                raise EOFError
+
+        with mock.patch.object(main, 'get_repository'), \
+                mock.patch.object(main, 'check_existing_inquiry', return_value=False), \
+                mock.patch.object(main, 'save_inquiry', side_effect=lambda *args: saved.append(args[-1])):
+            main.main(main.Renderer(typing=False, out=out), input_fn, warm_up=False)
+        return out.getvalue(), saved
+
+    def test_words_containing_a_keyword_finish_the_intake_normally(self):
+        for reply in ['AutoCAD, I can join anytime', 'Revit, a lifetime goal', 'Python and costume design']:
+            with self.subTest(reply=reply):
+                output, saved = self.run_intake(reply)
+                self.assertNotIn('Please contact us at 7845821665 for more details.', output)
+                self.assertIn(PROMPTS['complete'][0], output)
+                self.assertEqual(len(saved), 1)
+
+    def test_fee_question_gets_the_fixed_answer(self):
+        output, saved = self.run_intake('What is the fee for AutoCAD?')
+        self.assertIn('Please contact us at 7845821665 for more details.', output)
+        self.assertEqual(saved, [['AutoCAD']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from history import ConversationHistory, count_tokens
+from metrics import PROMPT_TOKENS
+
+class TestConversationHistory(unittest.TestCase):
+    def test_window_stays_within_budget(self):
+        history = ConversationHistory(max_tokens=200)
+        for i in range(50):
+            history.add('user', f'question number {i} about AutoCAD and Revit batches')
+            history.add('assistant', f'answer number {i} with some detail about timings')
+            history.window()
+        self.assertLessEqual(history.max_prompt_tokens, 200 + count_tokens(history.summary) + 50)
+        self.assertEqual(history.stats()['agent_calls'], 50)
+        self.assertLess(len(history.turns), 20)
+        self.assertIn('answer number 49', history.turns[-1][1])
+
+    def test_prompt_sizes_are_exported(self):
+        before = PROMPT_TOKENS.render()
+        history = ConversationHistory()
+        history.add('user', 'hello')
+        history.window()
+        self.assertNotEqual(PROMPT_TOKENS.render(), before)
+        self.assertEqual(history.total_prompt_tokens, history.last_prompt_tokens)
+
+    def test_evicted_turns_are_summarized(self):
+        history = ConversationHistory(max_tokens=30)
+        history.add('user', 'I am interested in CATIA')
+        history.add('assistant', 'Great choice')
+        history.add('user', 'x ' * 40)
+        messages = history.window()
+        self.assertEqual(messages[0][0], 'system')
+        self.assertIn('CATIA', messages[0][1])
+        self.assertEqual(messages[-1], ('user', 'x ' * 40))
+
+    def test_user_info_is_pinned(self):
+        user_info = {'name': 'Asha', 'mobile': '', 'courses': ['Revit', 'BIM']}
+        history = ConversationHistory(user_info=user_info)
+        history.add('user', 'what next?')
+        system = history.window()[0]
+        self.assertEqual(system[0], 'system')
+        self.assertIn('name: Asha', system[1])
+        self.assertIn('courses: Revit, BIM', system[1])
+        self.assertNotIn('mobile', system[1])
+
+    def test_fingerprint_covers_everything_but_the_question(self):
+        fresh = ConversationHistory()
+        fresh.add('user', 'Do you have weekend batches?')
+        other = ConversationHistory()
+        other.add('user', 'Any batches on Sunday?')
+        self.assertEqual(fresh.fingerprint(), other.fingerprint())
+
+        follow_up = ConversationHistory()
+        follow_up.add('user', 'Tell me about CATIA')
+        follow_up.add('assistant', 'CATIA is a design tool.')
+        follow_up.add('user', 'Do you have weekend batches?')
+        known = ConversationHistory(user_info={'name': 'Asha'})
+        known.add('user', 'Do you have weekend batches?')
+        self.assertEqual(len({fresh.fingerprint(), follow_up.fingerprint(), known.fingerprint()}), 3)
+
+if __name__ == '__main__':
+    unittest.main()
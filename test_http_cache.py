@@ -0,0 +1,109 @@
+import os
+import gzip
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from http_cache import CachedResponse, RenderedPage, StaticFiles, accepted_encodings
+
+BODY = b'{"courses": ["AutoCAD", "CATIA", "SolidWorks"]}' * 20
+
+
+class TestCachedResponse(unittest.TestCase):
+    def test_picks_the_best_accepted_encoding(self):
+        cached = CachedResponse(BODY, 'application/json')
+        status, headers, body = cached.respond(None, 'gzip, deflate')
+        self.assertEqual((status, headers['Content-Encoding'], headers['Vary']), (200, 'gzip', 'Accept-Encoding'))
+        self.assertEqual(gzip.decompress(body), BODY)
+        status, headers, body = cached.respond(None, 'gzip;q=0, identity')
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(body, BODY)
+
+    def test_matching_etag_gets_not_modified(self):
+        cached = CachedResponse(BODY, 'application/json', 'public, max-age=300')
+        _, headers, _ = cached.respond(None, 'gzip')
+        status, not_modified, body = cached.respond(headers['ETag'], 'gzip')
+        self.assertEqual((status, body), (304, b''))
+        self.assertEqual(not_modified['ETag'], headers['ETag'])
+        self.assertEqual(not_modified['Cache-Control'], 'public, max-age=300')
+        # The gzip variant's ETag does not validate the uncompressed one
+        self.assertEqual(cached.respond(headers['ETag'], '')[0], 200)
+        self.assertEqual(cached.respond(f'"other", W/{cached.etag}', '')[0], 304)
+
+    def test_if_modified_since_is_honoured_without_if_none_match(self):
+        cached = CachedResponse(BODY, 'application/json', last_modified=1_700_000_000.7)
+        _, headers, _ = cached.respond()
+        self.assertEqual(headers['Last-Modified'], 'Tue, 14 Nov 2023 22:13:20 GMT')
+        self.assertEqual(cached.respond(None, '', headers['Last-Modified'])[0], 304)
+        self.assertEqual(cached.respond(None, '', 'Tue, 14 Nov 2023 22:13:19 GMT')[0], 200)
+        self.assertEqual(cached.respond(None, '', 'not a date')[0], 200)
+        # A non-matching ETag wins over a matching date
+        self.assertEqual(cached.respond('"other"', '', headers['Last-Modified'])[0], 200)
+
+    def test_small_bodies_are_not_compressed(self):
+        cached = CachedResponse(b'{}', 'application/json')
+        self.assertEqual(list(cached.variants), ['identity'])
+        self.assertNotIn('Vary', cached.respond(None, 'gzip')[1])
+
+    def test_accept_encoding_parsing(self):
+        self.assertEqual(accepted_encodings('br;q=0.9, GZIP'), {'br', 'gzip'})
+        self.assertEqual(accepted_encodings('*, br;q=0'), {'*', 'gzip'})
+        self.assertEqual(accepted_encodings(None), set())
+
+
+class TestStaticFiles(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.write('app.js', BODY)
+
+    def write(self, name, data, mtime=None):
+        path = os.path.join(self.root, name)
+        with open(path, 'wb') as handle:
+            handle.write(data)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def test_serves_precompressed_files_and_reloads_on_change(self):
+        self.write('app.js', BODY, mtime=1000)
+        self.write('app.js.br', b'brotli bytes', mtime=1000)
+        files = StaticFiles(self.root, check_interval=0)
+        status, headers, body = files.get('app.js').respond(None, 'gzip, br')
+        self.assertEqual((headers['Content-Encoding'], body), ('br', b'brotli bytes'))
+        self.assertEqual(headers['Content-Type'], 'text/javascript; charset=utf-8')
+        self.assertIs(files.get('app.js'), files.get('app.js'))
+
+        # A newer original makes the stale .br file unusable
+        self.write('app.js', BODY + b' ', mtime=2000)
+        cached = files.get('app.js')
+        self.assertEqual(cached.body, BODY + b' ')
+        self.assertNotIn('br', cached.variants)
+
+    def test_missing_files_and_paths_outside_the_root(self):
+        files = StaticFiles(os.path.join(self.root, 'static'))
+        os.mkdir(files.root)
+        self.assertIsNone(files.get('missing.css'))
+        self.assertIsNone(files.get('../app.js'))
+
+
+class TestRenderedPage(unittest.TestCase):
+    def test_renders_once_per_change(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'index.html')
+        with open(path, 'w') as handle:
+            handle.write('<h1>Bairo</h1>')
+        render = mock.Mock(side_effect=str.upper)
+        page = RenderedPage(path, render, check_interval=0)
+        self.assertEqual(page.get().body, b'<H1>BAIRO</H1>')
+        page.get()
+        self.assertEqual(render.call_count, 1)
+        with open(path, 'w') as handle:
+            handle.write('<h1>Welcome</h1>')
+        os.utime(path, (3000, 3000))
+        self.assertEqual(page.get().body, b'<H1>WELCOME</H1>')
+
+
+if __name__ == '__main__':
+    unittest.main()
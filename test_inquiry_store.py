@@ -0,0 +1,136 @@
+import gc
+import os
+import json
+import shutil
+import time
+import tempfile
+import unittest
+import weakref
+from unittest import mock
+from inquiry_store import InquiryStore
+
+class TestInquiryStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'inquiry_database.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def make_store(self, **kwargs):
+        store = InquiryStore(self.path, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_existing_json_is_migrated(self):
+        with open(self.path, 'w') as f:
+            json.dump({'inquiries': [{'name': 'old', 'mobile': '1', 'email': 'a@b.co'}]}, f)
+        store = self.make_store()
+        store.append({'name': 'new', 'mobile': '2', 'email': 'c@d.co'})
+        names = [inquiry['name'] for inquiry in store.load()['inquiries']]
+        self.assertEqual(names, ['old', 'new'])
+
+    def test_append_does_not_rewrite_snapshot(self):
+        store = self.make_store()
+        store.append({'name': 'first'})
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(len(store.load()['inquiries']), 1)
+
+    def test_compaction_folds_journal_into_snapshot(self):
+        store = self.make_store(min_compact=3)
+        for i in range(3):
+            store.append({'name': str(i)})
+        with open(self.path) as f:
+            self.assertEqual(len(json.load(f)['inquiries']), 3)
+        self.assertEqual([i['name'] for i in store.load()['inquiries']], ['0', '1', '2'])
+
+    def test_idle_store_syncs_within_the_interval(self):
+        store = self.make_store(fsync_every=100, fsync_interval=0.05)
+        with mock.patch('inquiry_store.os.fsync', wraps=os.fsync) as fsync:
+            store.append({'name': 'first'})
+            store.append({'name': 'second'})
+            self.assertEqual(fsync.call_count, 1)  # the new journal's header
+            deadline = time.monotonic() + 5
+            while fsync.call_count < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(fsync.call_count, 2)
+        self.assertEqual(store._unsynced, 0)
+
+    def test_closed_store_can_be_collected(self):
+        store = InquiryStore(self.path)
+        store.append({'name': 'one'})
+        store.close()
+        collected = weakref.ref(store)
+        del store
+        gc.collect()
+        self.assertIsNone(collected())
+
+    def test_torn_journal_line_is_ignored(self):
+        store = self.make_store()
+        store.append({'name': 'good'})
+        store.close()
+        with open(self.path + '.log', 'a') as f:
+            f.write('{"name": "to')
+        store = self.make_store()
+        store.append({'name': 'after'})
+        self.assertEqual([i['name'] for i in store.load()['inquiries']], ['good', 'after'])
+
+    def test_crash_before_journal_truncate_does_not_duplicate(self):
+        store = self.make_store()
+        store.append({'name': 'one'})
+        store.flush()
+        with open(self.path + '.log') as f:
+            journal = f.read()
+        store.compact()
+        # Simulate a crash after the snapshot was replaced but before truncation
+        with open(self.path + '.log', 'w') as f:
+            f.write(journal)
+        self.assertEqual([i['name'] for i in self.make_store().load()['inquiries']], ['one'])
+
+    def test_replace(self):
+        store = self.make_store()
+        store.append({'name': 'gone'})
+        store.replace({'inquiries': [{'name': 'kept'}]})
+        self.assertEqual(store.load(), {'inquiries': [{'name': 'kept'}]})
+
+class TestDuplicateIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'inquiry_database.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def make_store(self, **kwargs):
+        store = InquiryStore(self.path, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_normalized_lookup(self):
+        store = self.make_store()
+        store.append({'mobile': '98765 43210', 'email': 'User@Example.com'})
+        self.assertTrue(store.contains('+91-9876543210', ''))
+        self.assertTrue(store.contains('', 'user@example.com '))
+        self.assertFalse(store.contains('1234567890', 'other@example.com'))
+        self.assertFalse(store.contains('', ''))
+
+    def test_index_follows_own_saves_and_compaction(self):
+        store = self.make_store(min_compact=2, refresh_interval=None)
+        store.build_index()
+        store.append({'mobile': '1111111111', 'email': 'a@x.co'})
+        store.append({'mobile': '2222222222', 'email': 'b@x.co'})
+        store.append({'mobile': '3333333333', 'email': 'c@x.co'})
+        for mobile in ('1111111111', '2222222222', '3333333333'):
+            self.assertTrue(store.contains(mobile, ''))
+
+    def test_index_sees_other_writers(self):
+        reader = self.make_store(refresh_interval=0)
+        self.assertFalse(reader.contains('1111111111', ''))
+        writer = self.make_store(min_compact=1)
+        writer.append({'mobile': '1111111111', 'email': 'a@x.co'})
+        writer.append({'mobile': '2222222222', 'email': 'b@x.co'})
+        self.assertTrue(reader.contains('1111111111', ''))
+        self.assertTrue(reader.contains('', 'b@x.co'))
+
+if __name__ == '__main__':
+    unittest.main()
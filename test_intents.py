@@ -0,0 +1,25 @@
+import unittest
+from intents import IntentRouter, classify
+
+class TestIntentClassifier(unittest.TestCase):
+    def test_classify(self):
+        self.assertEqual(classify('What are the fees for AutoCAD?'), 'fees')
+        self.assertEqual(classify('Can I see the syllabus'), 'syllabus')
+        self.assertEqual(classify('How long does Python take?'), 'duration')
+        self.assertEqual(classify('What is your phone number'), 'contact')
+        self.assertEqual(classify('Which programs do you run?'), 'course_list')
+        self.assertEqual(classify('Good morning!'), 'greeting')
+        self.assertIsNone(classify('Hello, do you have placement support for graduates?'))
+        self.assertIsNone(classify('Is the lab open to alumni?'))
+
+    def test_router_counts_hits_and_misses(self):
+        router = IntentRouter({'fees': lambda text: 'visit us'})
+        self.assertEqual(router.answer('fee?'), 'visit us')
+        self.assertIsNone(router.answer('tell me a story'))
+        self.assertIsNone(router.answer('hello'))
+        stats = router.stats()
+        self.assertEqual(stats['hits'], {'fees': 1})
+        self.assertEqual(stats['misses'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
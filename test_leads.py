@@ -0,0 +1,71 @@
+import os
+import csv
+import json
+import shutil
+import tempfile
+import unittest
+
+from leads import export_leads, import_leads
+from storage import get_repository
+
+CSV_ROWS = (
+    "Name,Phone,Email,Status,Course\n"
+    "Asha,+91 98765 43210,Asha@Example.com,Student,Python; AutoCAD\n"
+    "Ravi,12345,ravi@example.com,Student,Python\n"
+    "Meena,9876500000,meena@,Working Professional,Revit\n"
+    "Asha again,098765-43210,asha2@example.com,Student,Python\n"
+    ",9123456780,noname@example.com,Student,Python\n"
+    "Kiran,9123456789,kiran@example.com,Working Professional,\n"
+)
+
+
+class TestLeads(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.source = os.path.join(self.dir, "leads.csv")
+        with open(self.source, "w") as f:
+            f.write(CSV_ROWS)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def test_import_validates_normalises_and_rejects(self):
+        store = self.path("leads.db")
+        stats = import_leads(self.source, "sqlite", store, chunk_size=2)
+        self.assertEqual(stats["rows"], 6)
+        self.assertEqual(stats["imported"], 2)
+        self.assertEqual(stats["rejected"], {"invalid mobile": 1, "invalid email": 1,
+                                             "already registered": 1, "missing name": 1})
+        records = list(get_repository("sqlite", store).iter_records())
+        self.assertEqual([(r["mobile"], r["email"], r["courses"]) for r in records],
+                         [("9876543210", "asha@example.com", ["Python", "AutoCAD"]),
+                          ("9123456789", "kiran@example.com", [])])
+        with open(stats["rejects_path"], newline="") as f:
+            rejects = list(csv.DictReader(f))
+        self.assertEqual([row["error"] for row in rejects],
+                         ["invalid mobile", "invalid email", "already registered", "missing name"])
+        self.assertEqual(rejects[0]["name"], "Ravi")
+
+    def test_import_skips_leads_already_stored(self):
+        store = self.path("inquiries.json")
+        get_repository("json", store).save({"name": "Kiran", "mobile": "9123456789", "email": "old@example.com",
+                                            "status": "", "courses": [], "timestamp": "2024-01-01 10:00:00"})
+        stats = import_leads(self.source, "json", store)
+        self.assertEqual(stats["imported"], 1)
+        self.assertEqual(stats["rejected"]["already registered"], 1)
+        self.assertEqual(stats["rejected"]["duplicate in file"], 1)
+
+    def test_export_round_trips_through_jsonl(self):
+        store, copy = self.path("leads.db"), self.path("copy.db")
+        import_leads(self.source, "sqlite", store)
+        exported = export_leads(self.path("leads.jsonl"), "sqlite", store)
+        self.assertEqual(exported["rows"], 2)
+        with open(self.path("leads.jsonl")) as f:
+            self.assertEqual(json.loads(f.readline())["courses"], ["Python", "AutoCAD"])
+        stats = import_leads(self.path("leads.jsonl"), "sqlite", copy)
+        self.assertEqual((stats["imported"], stats["rejects_path"]), (2, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,214 @@
+import os
+import time
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+import main
+from fake_llm import FakeLLMServer
+from history import ConversationHistory
+from llm_client import CircuitBreaker, CircuitOpenError, SingleFlight, call_outcome
+from metrics import LLM_CIRCUIT_EVENTS, LLM_COALESCED
+from response_cache import ResponseCache
+
+
+class TestSingleFlight(unittest.TestCase):
+    def run_threads(self, target, count=5):
+        threads = [threading.Thread(target=target) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_identical_calls_in_flight_share_one_run(self):
+        flight = SingleFlight()
+        runs, results = [], []
+
+        def slow():
+            runs.append(1)
+            time.sleep(0.2)
+            return "Yes, on Saturdays."
+
+        self.run_threads(lambda: results.append(flight.do("weekend", slow)))
+        self.assertEqual(results, ["Yes, on Saturdays."] * 5)
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(flight.coalesced, 4)
+
+    def test_waiters_get_the_leaders_error(self):
+        flight = SingleFlight()
+        call, leader = flight.begin("key")
+        self.assertTrue(leader)
+        waiter, leader = flight.begin("key")
+        self.assertFalse(leader)
+        with self.assertRaises(ValueError):
+            with flight.lead("key", call):
+                raise ValueError("upstream failed")
+        with self.assertRaises(ValueError):
+            flight.wait(waiter)
+
+    def test_abandoned_leader_lets_a_waiter_run_the_call(self):
+        flight = SingleFlight()
+
+        def stream():
+            call, leader = flight.begin("key")
+            with flight.lead("key", call):
+                yield "Yes"
+                call.result = "Yes, on Saturdays."
+
+        first = stream()
+        next(first)
+        waiter, leader = flight.begin("key")
+        self.assertFalse(leader)
+        first.close()
+        self.assertIsNone(flight.wait(waiter))
+        call, leader = flight.begin("key")
+        self.assertTrue(leader)
+
+    def test_async_waiter_holds_no_thread_and_is_bounded(self):
+        flight = SingleFlight(wait_timeout=0.1)
+        call, _ = flight.begin("key")
+        waiter, _ = flight.begin("key")
+
+        async def finish_later():
+            await asyncio.sleep(0.05)
+            with flight.lead("key", call):
+                call.result = "Yes"
+
+        async def scenario():
+            threads = threading.active_count()
+            results = await asyncio.gather(flight.wait_async(waiter), finish_later())
+            self.assertEqual(threading.active_count(), threads)
+            return results[0]
+
+        self.assertEqual(asyncio.run(scenario()), "Yes")
+
+        stuck, _ = flight.begin("stuck")
+        waiter, _ = flight.begin("stuck")
+        with self.assertRaises(TimeoutError):
+            asyncio.run(flight.wait_async(waiter))
+        self.assertEqual(stuck.wakers, [])
+        with self.assertRaises(TimeoutError):
+            flight.wait(waiter)
+
+    def test_coalesced_calls_are_counted(self):
+        before = LLM_COALESCED.value()
+        flight = SingleFlight()
+        flight.begin("key")
+        flight.begin("key")
+        self.assertEqual(LLM_COALESCED.value(), before + 1)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def call(self, breaker, seconds=0.0, fail=False):
+        with breaker.guard():
+            time.sleep(seconds)
+            if fail:
+                raise ConnectionError("upstream failed")
+
+    def test_breaker_opens_on_slow_p95_and_recovers_after_a_probe(self):
+        breaker = CircuitBreaker(p95_threshold=0.02, min_calls=3, cooldown=0.2)
+        for _ in range(3):
+            self.call(breaker, 0.05)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError) as raised:
+            self.call(breaker)
+        self.assertEqual(call_outcome(raised.exception), "short_circuit")
+
+        time.sleep(0.25)
+        self.call(breaker)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_breaker_opens_when_half_the_calls_fail(self):
+        breaker = CircuitBreaker(min_calls=4, cooldown=60)
+        for index in range(4):
+            try:
+                self.call(breaker, fail=index % 2 == 0)
+            except ConnectionError:
+                pass
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(breaker.stats()["failure_rate"], 0.5)
+
+    def test_abandoned_call_is_not_counted(self):
+        breaker = CircuitBreaker(min_calls=1)
+
+        def stream():
+            with breaker.guard():
+                yield "token"
+
+        events = stream()
+        next(events)
+        events.close()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.stats()["failure_rate"], 0.0)
+
+    def test_paused_time_is_not_upstream_latency(self):
+        breaker = CircuitBreaker(p95_threshold=0.05, min_calls=1)
+        for _ in range(3):
+            with breaker.guard() as upstream:
+                with upstream.paused():
+                    time.sleep(0.1)  # a slow reader
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertLess(breaker.stats()["p95_seconds"], 0.05)
+
+    def test_cancelled_task_is_not_a_failure(self):
+        breaker = CircuitBreaker(min_calls=1)
+
+        async def call():
+            with breaker.guard():
+                await asyncio.sleep(1)
+
+        async def scenario():
+            task = asyncio.create_task(call())
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(scenario())
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.stats()["failure_rate"], 0.0)
+
+
+class TestAgentAgainstFakeLLM(unittest.TestCase):
+    """stream_agent with the real agent, against fake_llm.py instead of the OpenAI API."""
+
+    def setUp(self):
+        self.server = FakeLLMServer(latency=0, token_delay=0, error_rate=1.0).start()
+        self.addCleanup(self.server.stop)
+        self.breaker = CircuitBreaker(min_calls=3, cooldown=0.2)
+        for patch in (mock.patch.dict(os.environ, {"OPENAI_API_BASE": self.server.url, "OPENAI_API_KEY": "fake"}),
+                      mock.patch.object(main, "RETRIES", 0),
+                      mock.patch.object(main, "BREAKER", self.breaker),
+                      mock.patch.object(main, "response_cache", ResponseCache())):
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.agent = main.build_agent()
+
+    def ask(self, question):
+        history = ConversationHistory()
+        history.add("user", question)
+        return "".join(text for kind, text in main.stream_agent(self.agent, history) if kind == "token")
+
+    def test_breaker_opens_on_upstream_errors_and_closes_after_a_probe(self):
+        trips = LLM_CIRCUIT_EVENTS.value("trip")
+        for index in range(3):
+            with self.assertRaises(Exception) as raised:
+                self.ask(f"Question {index}?")
+            self.assertEqual(call_outcome(raised.exception), "error")
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(LLM_CIRCUIT_EVENTS.value("trip"), trips + 1)
+
+        requests = self.server.requests
+        with self.assertRaises(CircuitOpenError):
+            self.ask("Question 3?")
+        self.assertEqual(self.server.requests, requests)
+
+        self.server.error_rate = 0
+        time.sleep(0.25)
+        self.assertTrue(self.ask("Do you have weekend batches?"))
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import unittest
+from metrics import Registry, MetricsDumper
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_render(self):
+        counter = self.registry.counter('test_total', 'Test counter', ('field',))
+        counter.inc('mobile')
+        counter.inc('mobile')
+        counter.inc('email', amount=3)
+        self.assertEqual(counter.value('mobile'), 2)
+        text = self.registry.render()
+        self.assertIn('# TYPE test_total counter', text)
+        self.assertIn('test_total{field="mobile"} 2', text)
+        self.assertIn('test_total{field="email"} 3', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.registry.histogram('test_seconds', 'Test histogram', ('step',), buckets=(0.1, 1))
+        histogram.observe(0.05, 'name')
+        histogram.observe(0.1, 'name')
+        histogram.observe(5, 'name')
+        with histogram.time('email'):
+            pass
+        self.assertEqual(histogram.count('name'), 3)
+        self.assertEqual(histogram.count('email'), 1)
+        text = self.registry.render()
+        self.assertIn('test_seconds_bucket{step="name",le="0.1"} 2', text)
+        self.assertIn('test_seconds_bucket{step="name",le="1"} 2', text)
+        self.assertIn('test_seconds_bucket{step="name",le="+Inf"} 3', text)
+        self.assertIn('test_seconds_count{step="name"} 3', text)
+
+    def test_timed_decorator_keeps_function_metadata(self):
+        histogram = self.registry.histogram('test_tool_seconds', 'Test tool', ('tool',))
+
+        @histogram.timed('double')
+        def double(x):
+            """Doubles x."""
+            return x * 2
+
+        self.assertEqual(double(4), 8)
+        self.assertEqual(double.__doc__, 'Doubles x.')
+        self.assertEqual(histogram.count('double'), 1)
+
+    def test_duplicate_names_are_rejected(self):
+        self.registry.counter('test_total', 'Test counter')
+        with self.assertRaises(ValueError):
+            self.registry.counter('test_total', 'Test counter')
+
+    def test_gauge_and_dumper(self):
+        self.registry.gauge('test_sessions', 'Test gauge', lambda: 7)
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'metrics.prom')
+            dumper = MetricsDumper(path, interval=3600, registry=self.registry)
+            dumper.close()
+            with open(path) as f:
+                self.assertIn('test_sessions 7', f.read())
+        finally:
+            shutil.rmtree(tmpdir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import io
+import time
+import unittest
+from renderer import Renderer
+
+class TestRenderer(unittest.TestCase):
+    def test_zero_delay_mode_writes_immediately(self):
+        out = io.StringIO()
+        renderer = Renderer(typing=False, out=out)
+        renderer.say('first', 'second')
+        self.assertEqual(out.getvalue(), 'Bairo: first\nBairo: second\n')
+
+    def test_typing_runs_in_background(self):
+        out = io.StringIO()
+        renderer = Renderer(typing=True, out=out, per_char=0, min_delay=0.2, max_delay=0.2)
+        started = time.perf_counter()
+        renderer.say('hello')
+        self.assertLess(time.perf_counter() - started, 0.1)
+        renderer.close()
+        self.assertIn('Bairo: hello\n', out.getvalue())
+
+    def test_delay_scales_with_length(self):
+        renderer = Renderer(typing=True, per_char=0.01, min_delay=0.1, max_delay=1.0)
+        self.assertEqual(renderer.delay_for('hi'), 0.1)
+        self.assertAlmostEqual(renderer.delay_for('x' * 50), 0.5)
+        self.assertEqual(renderer.delay_for('x' * 500), 1.0)
+
+    def test_stream_writes_tokens_as_they_arrive(self):
+        out = io.StringIO()
+        renderer = Renderer(typing=False, out=out)
+        seen = []
+        def tokens():
+            yield 'Hel'
+            seen.append(out.getvalue())
+            yield 'lo'
+        self.assertEqual(renderer.stream(tokens()), 'Hello')
+        self.assertEqual(seen, ['Bairo: Hel'])
+        self.assertEqual(out.getvalue(), 'Bairo: Hello\n')
+
+if __name__ == '__main__':
+    unittest.main()
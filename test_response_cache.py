@@ -0,0 +1,74 @@
+import os
+import time
+import threading
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from response_cache import ResponseCache
+
+class TestResponseCache(unittest.TestCase):
+    def test_exact_match_ignores_case_and_punctuation(self):
+        cache = ResponseCache()
+        cache.put('Do you offer weekend batches?', {'state': 'greeting'}, 'Yes', latency=2.0)
+        self.assertEqual(cache.get('do you offer weekend batches', {'state': 'greeting'}), 'Yes')
+        self.assertIsNone(cache.get('do you offer weekend batches', {'state': 'other'}))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['latency_saved_seconds'], 2.0)
+
+    def test_similar_match(self):
+        cache = ResponseCache(similarity=0.7)
+        cache.put('do you offer weekend batches for autocad', None, 'Yes')
+        cache.put('where is the nearest center', None, 'Chennai')
+        self.assertEqual(cache.get('do you offer weekend batches for autocad please', None), 'Yes')
+        self.assertIsNone(cache.get('what is the meaning of life', None))
+
+    def test_lru_and_ttl(self):
+        cache = ResponseCache(max_entries=2, ttl=10)
+        cache.put('a', None, '1')
+        cache.put('b', None, '2')
+        cache.get('a', None)
+        cache.put('c', None, '3')
+        self.assertIsNone(cache.get('b', None))
+        self.assertEqual(cache.get('a', None), '1')
+        with mock.patch('response_cache.time.time', return_value=10 ** 12):
+            self.assertIsNone(cache.get('a', None))
+
+    def test_persistence(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'cache.json')
+        cache = ResponseCache(path)
+        cache.put('hours', None, '9 to 6')
+        cache.save()
+        self.assertEqual(ResponseCache(path).get('hours', None), '9 to 6')
+
+    def test_similarity_scores_only_questions_sharing_a_word(self):
+        cache = ResponseCache(similarity=0.7)
+        for index in range(50):
+            cache.put(f'unrelated question number{index}', None, str(index))
+        cache.put('do you offer weekend batches for autocad', None, 'Yes')
+        with mock.patch.object(ResponseCache, '_vector', wraps=ResponseCache._vector) as vector:
+            self.assertEqual(cache.get('do you offer weekend batches for autocad please', None), 'Yes')
+        # The query and the one cached question that shares its words
+        self.assertEqual(vector.call_count, 2)
+
+    def test_saves_in_the_background(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'cache.json')
+        cache = ResponseCache(path, save_every=2)
+        saved_by = []
+        save = cache.save
+        cache.save = lambda: (saved_by.append(threading.current_thread()), save())
+        cache.put('hours', None, '9 to 6')
+        cache.put('address', None, 'Chennai')
+        deadline = time.monotonic() + 5
+        while not os.path.exists(path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertNotIn(threading.current_thread(), saved_by)
+        self.assertEqual(ResponseCache(path).get('address', None), 'Chennai')
+
+if __name__ == '__main__':
+    unittest.main()
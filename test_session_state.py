@@ -0,0 +1,77 @@
+import sys
+import json
+import unittest
+
+from sessions import SessionStore
+from session_state import ChatState, footprint
+
+
+def sample_state():
+    state = ChatState('course')
+    state.set_user_data({'name': 'Asha Raman', 'mobile': '9876543210',
+                         'email': 'asha@example.com', 'status': 'Student'})
+    state.set_history([('user', 'Do you have weekend batches?'),
+                       ('assistant', 'Yes, AutoCAD runs on Saturdays and Sundays.'),
+                       ('tool', 'ignored')])
+    return state
+
+
+class TestChatState(unittest.TestCase):
+    def test_round_trip(self):
+        state = sample_state()
+        restored = ChatState.from_bytes(state.to_bytes())
+        self.assertEqual(restored, state)
+        self.assertEqual(restored.step, 'course')
+        self.assertEqual(restored.history, [('user', 'Do you have weekend batches?'),
+                                            ('assistant', 'Yes, AutoCAD runs on Saturdays and Sundays.')])
+        self.assertEqual(ChatState.from_bytes(ChatState().to_bytes()), ChatState())
+
+    def test_long_and_non_ascii_text_round_trips(self):
+        state = ChatState()
+        state.set_history([('user', 'ñ' * 300), ('assistant', '')])
+        self.assertEqual(ChatState.from_bytes(state.to_bytes()).history, [('user', 'ñ' * 300), ('assistant', '')])
+
+    def test_history_is_bounded(self):
+        state = ChatState()
+        state.set_history([('user', str(index)) for index in range(20)], limit=4)
+        self.assertEqual([text for _, text in state.history], ['16', '17', '18', '19'])
+
+    def test_serialized_form_is_smaller_than_json(self):
+        state = sample_state()
+        as_json = json.dumps({'step': state.step, 'userData': state.user_data(),
+                              'history': [list(turn) for turn in state.history]}, separators=(',', ':'))
+        self.assertLess(len(state.to_bytes()), len(as_json.encode()))
+
+    def test_only_known_answers_are_interned(self):
+        known, typed = ChatState(), ChatState()
+        known.set_user_data({'status': ''.join(['Stu', 'dent']), 'course': ''.join(['Auto', 'CAD'])})
+        typed.set_user_data({'status': ''.join(['student', ' and intern']), 'course': ''.join(['some', 'thing'])})
+        self.assertIs(known.status, sys.intern('Student'))
+        self.assertIs(known.course, sys.intern('AutoCAD'))
+        self.assertIsNot(typed.status, sys.intern('student and intern'))
+        self.assertIsNot(typed.course, sys.intern('something'))
+
+    def test_rejects_other_data(self):
+        with self.assertRaises(ValueError):
+            ChatState.from_bytes(b'{"step": "greeting"}')
+
+
+class TestFootprint(unittest.TestCase):
+    def test_record_is_smaller_than_the_dict_it_replaces(self):
+        state = sample_state()
+        as_dict = {'step': state.step, 'userData': state.user_data(),
+                   'history': [list(turn) for turn in state.history]}
+        self.assertLess(footprint(state), footprint(as_dict))
+
+    def test_store_reports_bytes_per_session(self):
+        store = SessionStore(ChatState)
+        self.assertEqual(store.footprint()['bytes_per_session'], 0)
+        for _ in range(10):
+            store.get(store.create()).set_user_data({'status': 'Student'})
+        report = store.footprint()
+        self.assertEqual(report['sessions'], 10)
+        self.assertEqual(report['bytes_per_session'], round(report['resident_bytes'] / 10))
+        self.assertLess(report['bytes_per_session'], 500)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from sessions import SessionStore, SQLiteSessionStore, SpillingSessionStore, sign_session_id, unsign_session_id
+from session_state import ChatState
+
+class TestSessionStore(unittest.TestCase):
+    def test_create_and_get(self):
+        store = SessionStore()
+        session_id = store.create()
+        store.get(session_id)['step'] = 'name'
+        self.assertEqual(store.get(session_id), {'step': 'name'})
+        self.assertIsNone(store.get('missing'))
+
+    def test_idle_sessions_expire(self):
+        store = SessionStore(ttl=10)
+        with mock.patch('sessions.time.monotonic', return_value=0):
+            old = store.create()
+        with mock.patch('sessions.time.monotonic', return_value=8):
+            fresh = store.create()
+        with mock.patch('sessions.time.monotonic', return_value=15):
+            self.assertEqual(store.purge(), 1)
+            self.assertIsNone(store.get(old))
+            self.assertIsNotNone(store.get(fresh))
+
+    def test_lru_cap(self):
+        store = SessionStore(max_sessions=2)
+        first, second = store.create(), store.create()
+        store.get(first)
+        store.create()
+        self.assertIsNotNone(store.get(first))
+        self.assertIsNone(store.get(second))
+
+class TestSQLiteSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'sessions.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_sessions_are_shared_between_stores(self):
+        worker_a = SQLiteSessionStore(self.path, lambda: {'step': 'greeting'})
+        worker_b = SQLiteSessionStore(self.path)
+        session_id = worker_a.create()
+        session = worker_b.get(session_id)
+        session['step'] = 'name'
+        worker_b.put(session_id, session)
+        self.assertEqual(worker_a.get(session_id), {'step': 'name'})
+
+    def test_purge(self):
+        store = SQLiteSessionStore(self.path, ttl=10, max_sessions=1)
+        with mock.patch('sessions.time.time', return_value=0):
+            expired = store.create()
+        with mock.patch('sessions.time.time', return_value=100):
+            older, newer = store.create(), None
+        with mock.patch('sessions.time.time', return_value=101):
+            newer = store.create()
+            self.assertEqual(store.purge(), 2)
+            self.assertIsNone(store.get(expired))
+            self.assertIsNone(store.get(older))
+            self.assertIsNotNone(store.get(newer))
+
+class TestSpillingSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = SpillingSessionStore(os.path.join(self.tmpdir, 'spill.db'), ChatState, ttl=100, spill_after=10)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_idle_sessions_are_spilled_and_restored(self):
+        with mock.patch('sessions.time.monotonic', return_value=0):
+            idle = self.store.create()
+            self.store.get(idle).set_user_data({'name': 'Asha', 'status': 'Student'})
+        with mock.patch('sessions.time.monotonic', return_value=8):
+            active = self.store.create()
+        with mock.patch('sessions.time.monotonic', return_value=15):
+            self.assertEqual(self.store.purge(), 0)
+            self.assertEqual(self.store.footprint()['sessions'], 1)
+            self.assertEqual(self.store.stats()['spilled'], 1)
+            self.assertEqual(len(self.store), 2)
+            self.assertEqual(self.store.get(idle).user_data(), {'name': 'Asha', 'status': 'Student'})
+            self.assertIsNotNone(self.store.get(active))
+        self.assertEqual(self.store.stats()['spilled'], 0)
+        self.assertEqual(self.store.stats()['restores'], 1)
+
+    def test_delete_removes_spilled_session(self):
+        with mock.patch('sessions.time.monotonic', return_value=0):
+            session_id = self.store.create()
+        with mock.patch('sessions.time.monotonic', return_value=15):
+            self.store.purge()
+            self.store.delete(session_id)
+            self.assertIsNone(self.store.get(session_id))
+
+class TestSessionSigning(unittest.TestCase):
+    def test_round_trip_and_tampering(self):
+        token = sign_session_id('abc123', 'secret')
+        self.assertEqual(unsign_session_id(token, 'secret'), 'abc123')
+        self.assertIsNone(unsign_session_id(token, 'other-secret'))
+        self.assertIsNone(unsign_session_id('abd123' + token[6:], 'secret'))
+        self.assertIsNone(unsign_session_id('abc123', 'secret'))
+        self.assertIsNone(unsign_session_id('', 'secret'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from validation import (canonical_email, canonical_mobile, clean_mobile, normalize_mobile,
+                        validate_many, validate_mobile_number)
+
+class TestValidation(unittest.TestCase):
+    def test_strict_validators_are_unchanged(self):
+        self.assertTrue(validate_mobile_number('9876543210'))
+        self.assertFalse(validate_mobile_number('123-456-7890'))
+        self.assertFalse(validate_mobile_number('+91 98765 43210'))
+
+    def test_canonical_mobile(self):
+        for typed in ['9876543210', '+91 98765 43210', '(+91) 98765-43210', '098765 43210', ' 98765.43210 ']:
+            self.assertEqual(canonical_mobile(typed), '9876543210', typed)
+        for typed in ['12345', '98765abc43210', '98765 +43210', '1 9876543210', '']:
+            self.assertIsNone(canonical_mobile(typed), typed)
+        # The canonical form is the duplicate-check key
+        self.assertEqual(canonical_mobile('+91 98765 43210'), normalize_mobile('+91 98765 43210'))
+        self.assertEqual(clean_mobile(' 98765abc43 '), '98765abc43')
+
+    def test_canonical_email(self):
+        self.assertEqual(canonical_email(' Asha@Example.COM '), 'asha@example.com')
+        self.assertIsNone(canonical_email('asha@example'))
+        self.assertIsNone(canonical_email('a sha@example.com'))
+
+    def test_validate_many_matches_single_calls(self):
+        mobiles = ['9876543210', '+91 98765 43210', '12345', '', '91+9876543210', '0919876543210',
+                   '9198765432', '98765\n43210', '(987) 654-3210', '+ 9876543210']
+        emails = ['a@b.co', ' B@C.CO ', 'bad@', '', 'x y@z.co', 'ok@example.com', '\tq@w.io',
+                  'line\nbreak@x.co', 'A.B@c.in', '@x.co']
+        valid_mobiles, valid_emails = validate_many(mobiles, emails)
+        self.assertEqual(valid_mobiles, [canonical_mobile(m) for m in mobiles])
+        self.assertEqual(valid_emails, [canonical_email(e) for e in emails])
+        self.assertEqual(validate_many([], []), ([], []))
+        with self.assertRaises(ValueError):
+            validate_many(['9876543210'], [])
+
+if __name__ == '__main__':
+    unittest.main()
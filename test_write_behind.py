@@ -0,0 +1,118 @@
+import os
+import json
+import glob
+import shutil
+import tempfile
+import threading
+import unittest
+from write_behind import WriteBehindQueue, recover_spill_files
+
+class ListRepository:
+    def __init__(self, gate=None):
+        self.records = []
+        self.batches = []
+        self.gate = gate
+
+    def save(self, record):
+        self.save_many([record])
+
+    def save_many(self, records):
+        if self.gate is not None:
+            self.gate.wait()
+        records = list(records)
+        self.batches.append(len(records))
+        self.records.extend(records)
+        return len(records)
+
+class TestWriteBehindQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.spill_base = os.path.join(self.tmpdir, 'inquiries')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_saves_are_batched_and_flushed(self):
+        repository = ListRepository()
+        writer = WriteBehindQueue(repository, self.spill_base, batch_interval=0.2)
+        for i in range(50):
+            writer.save({'name': f'User {i}'})
+        self.assertTrue(writer.flush(timeout=5))
+        self.assertEqual([record['name'] for record in repository.records], [f'User {i}' for i in range(50)])
+        self.assertLess(len(repository.batches), 50)
+        self.assertEqual(writer.stats()['pending'], 0)
+        # Everything saved, so the spill file is empty
+        self.assertEqual(os.path.getsize(writer.spill_path), 0)
+        writer.close()
+
+    def test_close_drains_queue_and_removes_spill_file(self):
+        repository = ListRepository()
+        writer = WriteBehindQueue(repository, self.spill_base, batch_interval=10)
+        writer.save({'name': 'Asha'})
+        writer.close()
+        self.assertEqual(len(repository.records), 1)
+        self.assertFalse(os.path.exists(writer.spill_path))
+        # After close, saves are written directly
+        writer.save({'name': 'Ravi'})
+        self.assertEqual(len(repository.records), 2)
+
+    def test_backpressure_when_queue_is_full(self):
+        gate = threading.Event()
+        repository = ListRepository(gate)
+        writer = WriteBehindQueue(repository, self.spill_base, max_pending=2, batch_size=1, batch_interval=0)
+        producer = threading.Thread(target=lambda: [writer.save({'n': i}) for i in range(6)])
+        producer.start()
+        producer.join(timeout=0.5)
+        self.assertTrue(producer.is_alive())
+        gate.set()
+        producer.join(timeout=5)
+        self.assertTrue(writer.flush(timeout=5))
+        self.assertEqual([record['n'] for record in repository.records], list(range(6)))
+        self.assertGreater(writer.stats()['backpressure_waits'], 0)
+        writer.close()
+
+    def test_spill_file_keeps_only_failed_records_after_later_batches(self):
+        repository = ListRepository()
+        failing = [True]
+
+        def save_many(records):
+            if failing[0]:
+                raise OSError('disk full')
+            return ListRepository.save_many(repository, records)
+        repository.save_many = save_many
+        writer = WriteBehindQueue(repository, self.spill_base, batch_interval=0, retries=0)
+        writer.save({'n': 1})
+        self.assertTrue(writer.flush(timeout=5))
+        failing[0] = False
+        for n in range(2, 20):
+            writer.save({'n': n})
+        self.assertTrue(writer.flush(timeout=5))
+        with open(writer.spill_path) as f:
+            self.assertEqual([json.loads(line) for line in f], [{'seq': 1, 'record': {'n': 1}}])
+        writer.close()
+        # The failed record is replayed by the next process
+        self.assertEqual(recover_spill_files(ListRepository(), self.spill_base), 1)
+
+    def test_recovers_unsaved_records_from_dead_process(self):
+        with open(self.spill_base + '.deadbeef.spill', 'w') as f:
+            for seq in (1, 2, 3):
+                f.write(json.dumps({'seq': seq, 'record': {'n': seq}}) + '\n')
+            f.write(json.dumps({'saved': [1]}) + '\n')
+            f.write('{"seq": 4, "rec')  # torn by the crash
+        repository = ListRepository()
+        writer = WriteBehindQueue(repository, self.spill_base)
+        self.assertEqual(repository.records, [{'n': 2}, {'n': 3}])
+        self.assertEqual(glob.glob(self.spill_base + '.*.spill'), [writer.spill_path])
+        writer.close()
+
+    def test_live_spill_files_are_not_recovered(self):
+        live = WriteBehindQueue(ListRepository(threading.Event()), self.spill_base)
+        live.save({'n': 1})
+        other = ListRepository()
+        self.assertEqual(recover_spill_files(other, self.spill_base), 0)
+        self.assertTrue(os.path.exists(live.spill_path))
+        live.repository.gate.set()
+        live.close()
+
+if __name__ == '__main__':
+    unittest.main()
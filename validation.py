@@ -0,0 +1,154 @@
+import re
+import sys
+import timeit
+import argparse
+from typing import List, Optional, Sequence, Tuple
+
+# Contact validation and normalisation shared by the front ends, the
+# storage backends and bulk imports.
+#
+# Every pattern is compiled once at import. Two kinds of functions:
+#
+#   validate_mobile_number / validate_email
+#       strict checks of the canonical form: exactly 10 digits, and a
+#       plain address
+#   normalize_mobile / normalize_email
+#       the keys duplicate checks and the stores use: digits only, with a
+#       +91/91/0 prefix dropped; a trimmed, lower-cased address
+#
+# clean_mobile() and clean_email() map what people actually type
+# ("+91 98765-43210", " Asha@Example.com ") onto the canonical form, so the
+# strict checks can run on the result. validate_many() does the same for
+# whole columns of a lead spreadsheet, using one regex pass per column
+# instead of one per cell.
+
+MOBILE_PATTERN = re.compile(r'^\d{10}$')
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+_NON_DIGITS = re.compile(r'\D')
+
+# A typed mobile number may use spaces, brackets, dots and dashes as
+# separators, and start with "+"
+_MOBILE_SEPARATORS = str.maketrans("", "", "().-" + "".join(
+    c for c in map(chr, range(0x3001)) if c.isspace()))
+_COMPACT_MOBILE = re.compile(r'\+?\d+')
+
+# Column-wise versions run over all cells joined with newlines, so the
+# newline is kept; then one findall yields one match per cell, with the
+# canonical value in group 1 (empty when the cell is invalid)
+_COLUMN_SEPARATORS = {char: None for char in _MOBILE_SEPARATORS if char != ord("\n")}
+_MOBILE_CELL = re.compile(r'^\+?(?:(?=91|0)\d+)?(\d{10})$|^.*$', re.MULTILINE)
+_EMAIL_CELL = re.compile(r'^[^\S\n]*(' + EMAIL_PATTERN.pattern[1:-1] + r')[^\S\n]*$|^.*$', re.MULTILINE)
+
+def validate_mobile_number(mobile):
+    # Check if it's exactly 10 digits and contains only numbers
+    return MOBILE_PATTERN.match(mobile) is not None
+
+
+def validate_email(email):
+    # Basic email validation pattern
+    return EMAIL_PATTERN.match(email) is not None
+
+
+def normalize_mobile(mobile: str) -> str:
+    """Reduce a mobile number to its bare 10-digit form for duplicate checks."""
+    digits = _NON_DIGITS.sub("", mobile or "")
+    if len(digits) > 10 and digits.startswith(("91", "0")):
+        digits = digits[-10:]
+    return digits
+
+
+def normalize_email(email: str) -> str:
+    """Case-fold an email address for duplicate checks."""
+    return (email or "").strip().lower()
+
+
+def clean_mobile(text: str) -> str:
+    """Canonical form of a typed mobile number, or the trimmed text if it has other characters."""
+    compact = text.translate(_MOBILE_SEPARATORS)
+    if _COMPACT_MOBILE.fullmatch(compact):
+        return normalize_mobile(compact)
+    return text.strip()
+
+
+def clean_email(text: str) -> str:
+    return normalize_email(text)
+
+
+def canonical_mobile(text: str) -> Optional[str]:
+    """The duplicate-check key for a typed mobile number, or None if it is not valid."""
+    mobile = clean_mobile(text)
+    return mobile if MOBILE_PATTERN.match(mobile) else None
+
+
+def canonical_email(text: str) -> Optional[str]:
+    email = clean_email(text)
+    return email if EMAIL_PATTERN.match(email) else None
+
+
+def _mobile_column(mobiles: Sequence[str]) -> List[Optional[str]]:
+    text = "\n".join(mobiles)
+    if text.count("\n") != len(mobiles) - 1:
+        return [canonical_mobile(mobile) for mobile in mobiles]  # a cell holds a newline
+    return [mobile or None for mobile in _MOBILE_CELL.findall(text.translate(_COLUMN_SEPARATORS))]
+
+
+def _email_column(emails: Sequence[str]) -> List[Optional[str]]:
+    text = "\n".join(emails)
+    if text.count("\n") != len(emails) - 1:
+        return [canonical_email(email) for email in emails]
+    return [email or None for email in _EMAIL_CELL.findall(text.lower())]
+
+
+def validate_many(mobiles: Sequence[str], emails: Sequence[str]) -> Tuple[List[Optional[str]], List[Optional[str]]]:
+    """
+    Validate and normalise two columns of a lead sheet in bulk.
+
+    Returns (mobiles, emails): the canonical value for each cell, or None
+    where the cell is not valid. The results match canonical_mobile() and
+    canonical_email() cell by cell.
+    """
+    if len(mobiles) != len(emails):
+        raise ValueError("mobiles and emails must have the same length")
+    if not mobiles:
+        return [], []
+    return _mobile_column(mobiles), _email_column(emails)
+
+
+# ----- micro-benchmark -----
+
+SAMPLE_MOBILES = ("9876543210", "+91 98765 43210", "098765-43210", "12345", "98765abc43", "(987) 654-3210")
+SAMPLE_EMAILS = ("asha@example.com", " Ravi@Example.COM ", "bad@", "user.name@domain.co.in", "", "x@y.z")
+
+
+def benchmark(rows: int = 100000, repeat: int = 3) -> List[Tuple[str, float]]:
+    """Return (case, calls per second) for single-call and batch validation."""
+    mobiles = [SAMPLE_MOBILES[i % len(SAMPLE_MOBILES)] for i in range(rows)]
+    emails = [SAMPLE_EMAILS[i % len(SAMPLE_EMAILS)] for i in range(rows)]
+    mobile_pattern, email_pattern = MOBILE_PATTERN.pattern, EMAIL_PATTERN.pattern
+
+    cases = [
+        ("re.match with pattern strings (old)",
+         lambda: [(re.match(mobile_pattern, m), re.match(email_pattern, e)) for m, e in zip(mobiles, emails)]),
+        ("validate_mobile_number + validate_email",
+         lambda: [(validate_mobile_number(m), validate_email(e)) for m, e in zip(mobiles, emails)]),
+        ("canonical_mobile + canonical_email",
+         lambda: [(canonical_mobile(m), canonical_email(e)) for m, e in zip(mobiles, emails)]),
+        ("validate_many", lambda: validate_many(mobiles, emails)),
+    ]
+    return [(name, rows / min(timeit.repeat(case, number=1, repeat=repeat))) for name, case in cases]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Validation micro-benchmark")
+    parser.add_argument("-n", "--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    print(f"{args.rows} (mobile, email) pairs, best of {args.repeat}")
+    for name, rate in benchmark(args.rows, args.repeat):
+        print(f"  {name:<42}{rate:>14,.0f} pairs/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+import os
+import glob
+import json
+import time
+import uuid
+import queue
+import atexit
+import logging
+import threading
+from typing import Dict, Iterable, List
+
+try:
+    import fcntl
+except ImportError:  # Windows: lock a byte of the file with msvcrt instead
+    fcntl = None
+    import msvcrt
+
+from metrics import WRITE_BACKPRESSURE, WRITE_BATCH_SECONDS
+
+# Write-behind queue in front of an inquiry repository.
+#
+# save() appends the record to a spill file (one write, no fsync) and puts
+# it on a bounded queue, then returns; the user's reply does not wait for
+# the repository. A worker thread takes records off the queue in batches of
+# up to batch_size, waiting at most batch_interval for a batch to fill, and
+# writes each batch with one repository.save_many() call. When the queue is
+# full, save() blocks until the worker has made room.
+#
+# The spill file makes queued records survive a crash of the process. It
+# holds {"seq": n, "record": {...}} lines plus {"saved": [n, ...]} markers
+# written after each batch. Whenever nothing is queued it is rewritten to
+# hold only records whose batch failed to save (usually nothing). Each
+# process spills to its own <spill_base>.<id>.spill file and holds a lock on
+# it (flock, or an msvcrt byte lock on Windows); on start-up, unlocked spill
+# files left by dead processes are replayed into the repository and removed.
+# A crash between saving a batch and writing its marker replays that batch
+# once more.
+#
+# Spill writes are flushed to the operating system but not fsynced, to keep
+# save() cheap: queued records survive the process crashing, not the
+# machine losing power. Records the repository has saved are as durable as
+# the repository makes them.
+#
+# close() (also run at exit) drains the queue and stops the worker.
+
+SPILL_SUFFIX = ".spill"
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+# msvcrt locks are mandatory, so lock a byte far past the data, not the data itself
+_MSVCRT_LOCK_OFFSET = 2 ** 30
+
+
+def _lock_file(handle) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        fd = handle.fileno()
+        position = os.lseek(fd, 0, os.SEEK_CUR)
+        os.lseek(fd, _MSVCRT_LOCK_OFFSET, os.SEEK_SET)
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        finally:
+            os.lseek(fd, position, os.SEEK_SET)
+        return True
+    except OSError:
+        return False
+
+
+def recover_spill_files(repository, spill_base: str) -> int:
+    """Replay unsaved records from spill files of dead processes; return how many were saved."""
+    recovered = 0
+    for path in glob.glob(glob.escape(spill_base) + ".*" + SPILL_SUFFIX):
+        try:
+            handle = open(path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            continue
+        with handle:
+            if not _lock_file(handle):
+                continue  # a live process owns it
+            pending, saved = {}, set()
+            for line in handle:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line
+                if "saved" in entry:
+                    saved.update(entry["saved"])
+                else:
+                    pending[entry["seq"]] = entry["record"]
+            records = [record for seq, record in sorted(pending.items()) if seq not in saved]
+            if records:
+                repository.save_many(records)
+                logger.info("Recovered %d queued inquiries from %s", len(records), path)
+                recovered += len(records)
+            os.remove(path)
+    return recovered
+
+
+class WriteBehindQueue:
+    def __init__(self, repository, spill_base: str, max_pending: int = 1000,
+                 batch_size: int = 100, batch_interval: float = 0.05, retries: int = 3):
+        self.repository = repository
+        self.spill_base = spill_base
+        self.name = os.path.basename(spill_base)
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.retries = retries
+
+        self._queue = queue.Queue(max_pending)
+        self._put_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._seq = 0
+        self._outstanding = 0
+        self._closed = False
+        self.submitted = 0
+        self.saved = 0
+        self.batches = 0
+        self.failed = 0
+        self.waits = 0
+        self._unsaved = {}  # seq -> record, for batches that failed to save
+
+        recover_spill_files(repository, spill_base)
+        self._spill = self._open_spill()
+        self._worker = threading.Thread(target=self._run, name=f"write-behind-{self.name}", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def _open_spill(self):
+        # Lock under a temporary name, then rename, so recovery in another
+        # process never sees this file unlocked
+        self.spill_path = f"{self.spill_base}.{uuid.uuid4().hex[:12]}{SPILL_SUFFIX}"
+        tmp_path = self.spill_path + ".tmp"
+        handle = open(tmp_path, "a", encoding="utf-8")
+        _lock_file(handle)
+        os.replace(tmp_path, self.spill_path)
+        return handle
+
+    def _write_spill(self, entry: Dict) -> None:
+        self._spill.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._spill.flush()
+
+    # ----- producer side -----
+
+    def save(self, record: Dict) -> None:
+        """Queue record for writing; blocks only while the queue is full."""
+        # Producers hold _put_lock until their record is on the queue, so
+        # close() cannot slip its stop marker in ahead of it
+        with self._put_lock:
+            if self._closed:
+                self.repository.save(record)
+                return
+            with self._lock:
+                self._seq += 1
+                seq = self._seq
+                self._write_spill({"seq": seq, "record": record})
+                self._outstanding += 1
+                self.submitted += 1
+            try:
+                self._queue.put_nowait((seq, record))
+            except queue.Full:
+                with self._lock:
+                    self.waits += 1
+                WRITE_BACKPRESSURE.inc(self.name)
+                self._queue.put((seq, record))
+
+    def save_many(self, records: Iterable[Dict]) -> int:
+        count = 0
+        for record in records:
+            self.save(record)
+            count += 1
+        return count
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until every queued record has been written; False on timeout."""
+        with self._drained:
+            return self._drained.wait_for(lambda: self._outstanding == 0, timeout)
+
+    # ----- worker -----
+
+    def _next_batch(self) -> List:
+        batch = [self._queue.get()]
+        if batch[0] is _STOP:
+            return batch
+        deadline = time.monotonic() + self.batch_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is _STOP:
+                break
+        return batch
+
+    def _write_batch(self, items: List) -> bool:
+        records = [record for _, record in items]
+        for attempt in range(self.retries + 1):
+            try:
+                with WRITE_BATCH_SECONDS.time(self.name):
+                    self.repository.save_many(records)
+                return True
+            except Exception:
+                logger.exception("Writing %d queued inquiries failed (attempt %d)", len(records), attempt + 1)
+                if attempt < self.retries:
+                    time.sleep(0.1 * 2 ** attempt)
+        return False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = self._next_batch()
+            stopping = batch[-1] is _STOP
+            items = [item for item in batch if item is not _STOP]
+            if not items:
+                continue
+            ok = self._write_batch(items)
+            with self._drained:
+                if ok:
+                    self._write_spill({"saved": [seq for seq, _ in items]})
+                    self.saved += len(items)
+                    self.batches += 1
+                else:
+                    # Kept in the spill file for the next start-up
+                    self.failed += len(items)
+                    self._unsaved.update(items)
+                self._outstanding -= len(items)
+                if self._outstanding == 0:
+                    self._compact_spill()
+                self._drained.notify_all()
+
+    def _compact_spill(self) -> None:
+        # Caller holds _lock; nothing is queued, so only failed records need keeping
+        self._spill.seek(0)
+        self._spill.truncate()
+        for seq, record in self._unsaved.items():
+            self._write_spill({"seq": seq, "record": record})
+
+    # ----- lifecycle -----
+
+    def close(self) -> None:
+        """Write everything still queued, stop the worker and remove the spill file."""
+        with self._put_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._worker.join()
+        with self._lock:
+            self._spill.close()
+            if not self._unsaved:
+                try:
+                    os.remove(self.spill_path)
+                except OSError:
+                    pass
+        if hasattr(self.repository, "flush"):
+            self.repository.flush()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "pending": self._outstanding,
+                "submitted": self.submitted,
+                "saved": self.saved,
+                "batches": self.batches,
+                "failed": self.failed,
+                "backpressure_waits": self.waits,
+            }